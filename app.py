@@ -1,31 +1,136 @@
-import random
+import os
+import re
+import json
+import queue
+import asyncio
 import logging
+import logging.handlers
+import time
+import random
 import secrets
-import threading
-from typing import Dict, Optional
-from fastapi import FastAPI, HTTPException, Cookie, Response
+from contextlib import asynccontextmanager
+from urllib.parse import unquote
+from typing import Dict, Optional, Set
+from fastapi import FastAPI, HTTPException, Cookie, Header, Request, Response, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
-from silnik_gry import Mecz, FazaGry, Karta, Kontrakt, Rozdanie
+from silnik_gry import Mecz, FazaGry, Karta, Kontrakt, Rozdanie, Akcja, AKCJE_LICYTACJI, KARTY, KARTY_PO_NAZWIE, KARTY_DO_WYSWIETLENIA
+from boty import Bot, BotPIMC, BotTabelaSily
+from sesje import Sesja, MagazynSesji
+from poczekalnia import Poczekalnia, KOLEJNOSC_MIEJSC
+from zapis_binarny import ruchy_meczu
+from metryki import Histogram, Wskaznik, Profiler, tekst_prometheusa, zajmij
 
-# --- Konfiguracja Logowania (bez zmian) ---
+# --- Konfiguracja Logowania ---
+# Poziom z POZIOM_LOGU (np. INFO, żeby logować każdy ruch). Rekordy trafiają do kolejki, a do gra.log
+# zapisuje je wątek słuchacza - pod blokadą sesji nie ma operacji na dysku. Wątek i plik otwiera dopiero
+# start serwera (`wlacz_log_do_pliku` w `cykl_zycia`); sam import modułu niczego nie uruchamia.
 logger = logging.getLogger('szesc_szesc_logger')
-if not logger.handlers:
-    # Zmieniamy tryb na 'a' (append), aby nie kasować logów przy każdym restarcie
-    handler = logging.FileHandler('gra.log', mode='a', encoding='utf-8')
-    formatter = logging.Formatter('[%(asctime)s] %(levelname)s: %(message)s', datefmt='%H:%M:%S')
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+logger.setLevel(os.environ.get('POZIOM_LOGU', 'WARNING').upper())
+# Zapisy meczów (linia "ZAPIS MECZU" po każdym rozdaniu) trafiają do gra.log przy każdym POZIOM_LOGU:
+# to wejście dla dane_rozdan.py i powtorka.py, a kosztują jedną linię na rozdanie, nie na ruch
+zapisy_meczow = logger.getChild('zapisy')
+zapisy_meczow.setLevel(logging.INFO)
+
+def wlacz_log_do_pliku(sciezka: str = 'gra.log'):
+    """Podpina zapis logu do pliku przez kolejkę i wątek słuchacza; zwraca funkcję, która go odpina (albo None,
+    jeśli logger ma już obsługę, np. gdy w jednym procesie startuje drugi klient testowy)."""
+    if logger.handlers:
+        return None
+    kolejka: queue.SimpleQueue = queue.SimpleQueue()
+    # Tryb 'a' (append), aby nie kasować logów przy każdym restarcie
+    do_pliku = logging.FileHandler(sciezka, mode='a', encoding='utf-8', delay=True)
+    do_pliku.setFormatter(logging.Formatter('[%(asctime)s] %(levelname)s: %(message)s', datefmt='%H:%M:%S'))
+    sluchacz = logging.handlers.QueueListener(kolejka, do_pliku)
+    do_kolejki = logging.handlers.QueueHandler(kolejka)
+    sluchacz.start()
+    logger.addHandler(do_kolejki)
+    def wylacz():
+        logger.removeHandler(do_kolejki)
+        sluchacz.stop() # Zapisuje rekordy, które zostały w kolejce
+        do_pliku.close()
+    return wylacz
+
+# --- Przechowywanie gier ---
+PLIK_SESJI = 'sesje.db'      # Migawki meczów; pozwalają wznowić gry po restarcie
+INTERWAL_PORZADKOW_S = 60    # Co tyle sekund zapisujemy zmienione mecze i wygaszamy nieaktywne
+# Kilka procesów serwera (WIELE_PROCESOW=1 uvicorn app:app --workers N) dzieli stan gier przez PLIK_SESJI:
+# każdy ruch jest od razu zatwierdzany w bazie, więc zapytanie gracza może trafić do dowolnego procesu
+WIELE_PROCESOW = os.environ.get('WIELE_PROCESOW') == '1'
+INTERWAL_ZMIAN_S = 0.25      # Co tyle sekund proces sprawdza, czy inny proces zmienił stoły jego połączeń WebSocket
+aktywne_gry = MagazynSesji(sciezka_bazy=PLIK_SESJI, wspoldzielony=WIELE_PROCESOW)
+
+async def porzadkuj_sesje():
+    while True:
+        await asyncio.sleep(INTERWAL_PORZADKOW_S)
+        wygasle = await asyncio.to_thread(aktywne_gry.porzadkuj)
+        if wygasle: logger.info("Wygaszono %d nieaktywnych sesji, w pamięci: %d", wygasle, len(aktywne_gry))
+
+async def sledz_inne_procesy():
+    """Rozsyła stan stołów, które zmienił inny proces - połączenia WebSocket są zawsze w jednym procesie."""
+    while True:
+        await asyncio.sleep(INTERWAL_ZMIAN_S)
+        for stol_id in await asyncio.to_thread(aktywne_gry.nowsze_w_bazie, list(polaczenia)):
+            asyncio.create_task(prowadz_gre(stol_id))
+
+@asynccontextmanager
+async def cykl_zycia(app: FastAPI):
+    wylacz_log = wlacz_log_do_pliku()
+    zadania = [asyncio.create_task(porzadkuj_sesje())]
+    if WIELE_PROCESOW: zadania.append(asyncio.create_task(sledz_inne_procesy()))
+    yield
+    for zadanie in zadania: zadanie.cancel()
+    aktywne_gry.zapisz_wszystkie()
+    if wylacz_log: wylacz_log()
+
+app = FastAPI(lifespan=cykl_zycia)
 
-app = FastAPI()
+# Bot grający za komputerowych graczy; budżet czasu na jedną decyzję w sekundach
+bot_ai: Bot = BotPIMC(budzet_s=0.05, rng=random.Random())
+PLIK_SILY_REKI = 'sila_reki.npz' # Tabela z sila_reki.py; jeśli jest, komputer licytuje z niej zamiast symulować
+PLIK_SZANS_MECZU = 'szanse_meczu.npz' # Tabela z szanse_meczu.py: szansa wygrania meczu (w stanie gry) i progi lufy dla komputera
+tabela_meczu = None
+if os.path.exists(PLIK_SZANS_MECZU):
+    from szanse_meczu import TabelaMeczu
+    tabela_meczu = TabelaMeczu.wczytaj(PLIK_SZANS_MECZU)
+if os.path.exists(PLIK_SILY_REKI):
+    from sila_reki import TabelaSily
+    bot_ai = BotTabelaSily(TabelaSily.wczytaj(PLIK_SILY_REKI), gra=bot_ai, tabela_meczu=tabela_meczu)
 
-# --- Przechowywanie gier i blokada (bez zmian) ---
-aktywne_gry: Dict[str, Mecz] = {}
-game_lock = threading.Lock()
+# --- Powiadomienia (WebSocket) ---
+OPOZNIENIE_AI_S = 0.6 # Przerwa między kolejnymi ruchami komputera, żeby gracz widział każdą kartę
+polaczenia: Dict[str, Dict[WebSocket, int]] = {} # id stołu -> otwarte połączenia i miejsca, z których patrzą
+aktywne_petle: Set[str] = set()                   # stoły, dla których działa już pętla ruchów komputera
+PAMIETANE_WERSJE = 8 # Tyle ostatnich stanów sesji trzymamy, żeby odpowiadać różnicą względem wersji klienta
+
+# --- Metryki (GET /metryki w formacie Prometheusa, tylko z localhost) ---
+ADRESY_LOKALNE = {'127.0.0.1', '::1'}
+czas_zapytan = Histogram('gra_zapytanie_sekundy', 'Czas obsługi zapytania HTTP', 'endpoint')
+czas_etapow = Histogram('gra_etap_sekundy', 'Czas etapów obsługi gry wykonywanych pod blokadą sesji', 'etap')
+czekanie_na_blokade = Histogram('gra_oczekiwanie_na_blokade_sekundy', 'Czas oczekiwania na blokadę sesji', 'miejsce')
+czas_decyzji_ai = Histogram('gra_decyzja_ai_sekundy', 'Czas jednej decyzji bot_ai', 'rodzaj')
+profiler = Profiler()
+metryki = [
+    czas_zapytan, czas_etapow, czekanie_na_blokade, czas_decyzji_ai,
+    Wskaznik('gra_sesje_w_pamieci', 'Stoły (sesje) trzymane w pamięci', lambda: len(aktywne_gry)),
+    Wskaznik('gra_poczekalnia', 'Ludzie czekający na stół wieloosobowy', lambda: len(poczekalnia)),
+    Wskaznik('gra_polaczenia_ws', 'Otwarte połączenia WebSocket', lambda: sum(map(len, polaczenia.values()))),
+    Wskaznik('gra_petle_komputera', 'Sesje z działającą pętlą ruchów komputera', lambda: len(aktywne_petle)),
+    Wskaznik('gra_profiler_wlaczony', 'Czy działa profiler próbkujący', lambda: int(profiler.wlaczony)),
+]
+
+@app.middleware("http")
+async def mierz_zapytania(request: Request, call_next):
+    start = time.perf_counter()
+    odpowiedz = await call_next(request)
+    # Szablon ścieżki ("/zagraj_karte/{karta_str}"), żeby każda karta nie tworzyła osobnej serii
+    czas_zapytan.obserwuj(getattr(request.scope.get('route'), 'path', None) or 'static', time.perf_counter() - start)
+    return odpowiedz
 
 # ✅ === POCZĄTEK ZMIANY: Nowa funkcja do logowania stanu gry ===
 def loguj_stan_gry(rozdanie: Rozdanie, gracz_podejmujacy_decyzje: str):
-    """Loguje kluczowe informacje o stanie gry do pliku gra.log."""
-    if not rozdanie or rozdanie.kolej_gracza_idx is None:
+    """Loguje kluczowe informacje o stanie gry do pliku gra.log (nic nie liczy, gdy poziom INFO jest wyłączony)."""
+    if not rozdanie or rozdanie.kolej_gracza_idx is None or not logger.isEnabledFor(logging.INFO):
         return
         
     aktualny_gracz = rozdanie.gracze[rozdanie.kolej_gracza_idx]
@@ -58,146 +163,372 @@ def loguj_stan_gry(rozdanie: Rozdanie, gracz_podejmujacy_decyzje: str):
 # ✅ === KONIEC ZMIANY ===
 
 
-def get_or_create_mecz(session_id: Optional[str], response: Response) -> Mecz:
-    """Pobiera mecz dla danego ID sesji lub tworzy nowy, jeśli nie istnieje."""
-    if not session_id or session_id not in aktywne_gry:
+def get_or_create_sesja(session_id: Optional[str], response: Response) -> tuple[str, Sesja, int]:
+    """(ID stołu, sesja, miejsce) gracza z ciasteczka; gracz bez stołu dostaje nowy mecz jednoosobowy (miejsce 0)."""
+    miejsce = aktywne_gry.znajdz_miejsce(session_id) if session_id else None
+    sesja = aktywne_gry.pobierz(miejsce[0]) if miejsce else None
+    if sesja is None:
         session_id = secrets.token_hex(16)
-        logger.info(f"Tworzenie nowej sesji i gry o ID: {session_id}")
-        mecz = Mecz(nazwy_graczy=["Ty", "Lewy", "Partner", "Prawy"])
+        ziarno = secrets.randbits(32)
+        logger.info("Tworzenie nowej sesji i gry o ID: %s (ziarno: %d)", session_id, ziarno)
+        mecz = Mecz(nazwy_graczy=["Ty", "Lewy", "Partner", "Prawy"], ziarno=ziarno)
         mecz.rozpocznij_mecz()
-        aktywne_gry[session_id] = mecz
+        sesja = Sesja(mecz, ludzie={0: session_id})
+        aktywne_gry.dodaj(session_id, sesja)
         response.set_cookie(key="session_id", value=session_id, httponly=True)
-    return aktywne_gry[session_id]
+        return session_id, sesja, 0
+    return miejsce[0], sesja, miejsce[1]
 
-# ✅ ZMIANA: Dodajemy logowanie wyboru AI
-def uruchom_ture_ai(mecz: Mecz):
-    """Logika AI z dodanym logowaniem decyzji."""
+def czeka_na_komputer(sesja: Sesja) -> bool:
+    """Czy gra może pójść dalej bez ludzi (ruch komputera albo rozliczenie zakończonego rozdania)."""
+    mecz = sesja.mecz
     rozdanie = mecz.rozdanie
-    gracz_czlowieka = mecz.gracze[0]
-    for _ in range(3): 
-        if not rozdanie or rozdanie.rozdanie_zakonczone or rozdanie.kolej_gracza_idx is None: break
-        
-        aktualny_gracz = rozdanie.gracze[rozdanie.kolej_gracza_idx]
-        if aktualny_gracz == gracz_czlowieka: break
+    if mecz.zwyciezca_meczu or not rozdanie:
+        return False
+    if rozdanie.rozdanie_zakonczone:
+        return True
+    return rozdanie.kolej_gracza_idx is not None and rozdanie.kolej_gracza_idx not in sesja.ludzie
+
+def wykonaj_krok_gry(session_id: str, sesja: Sesja) -> bool:
+    """Jeden krok gry bez człowieka (rozliczenie rozdania albo ruch `bot_ai`) zatwierdzony w magazynie.
+
+    Zwraca True, jeśli stan się zmienił; False także wtedy, gdy inny proces zapisał wcześniej swój ruch.
+    """
+    return _krok_gry(sesja) and aktywne_gry.zatwierdz(session_id, sesja)
+
+def _krok_gry(sesja: Sesja) -> bool:
+    mecz = sesja.mecz
+    with zajmij(sesja.blokada, czekanie_na_blokade, 'krok_komputera'):
+        if not czeka_na_komputer(sesja):
+            return False
+        rozdanie = mecz.rozdanie
+        if rozdanie.rozdanie_zakonczone:
+            zwyciezca, punkty, mnoznik = rozdanie.rozlicz_rozdanie()
+            logger.info("--- KONIEC ROZDANIA --- Wygrywa: %s (+%d pkt)", zwyciezca.nazwa, punkty)
+            if zapisy_meczow.isEnabledFor(logging.INFO):
+                # Wystarcza do odtworzenia meczu: python powtorka.py --ziarno ... --ruchy ...
+                zapisy_meczow.info("ZAPIS MECZU: ziarno=%s ruchy=%s", mecz.ziarno, ruchy_meczu(mecz).hex())
+            mecz.sprawdz_koniec_meczu()
+            if not mecz.zwyciezca_meczu:
+                mecz.przygotuj_nastepne_rozdanie()
+            sesja.oznacz_zmiane()
+            return True
 
+        aktualny_gracz = rozdanie.gracze[rozdanie.kolej_gracza_idx]
         # Logujemy stan gry tuż przed decyzją AI
-        loguj_stan_gry(rozdanie, aktualny_gracz.nazwa)
-        
+        with czas_etapow.mierz('logowanie'):
+            loguj_stan_gry(rozdanie, aktualny_gracz.nazwa)
+        dlugosc_stosu = len(rozdanie.stos_cofania)
         if rozdanie.faza == FazaGry.ROZGRYWKA:
-            mozliwe_karty = rozdanie.get_legalne_karty(aktualny_gracz)
-            if mozliwe_karty:
-                wybrana_karta = random.choice(mozliwe_karty)
-                logger.info(f"DECYZJA AI '{aktualny_gracz.nazwa}': Zagrywa kartę -> {wybrana_karta}")
-                rozdanie.zagraj_karte(aktualny_gracz, wybrana_karta)
-        else: 
-            mozliwe_akcje = rozdanie.get_mozliwe_akcje(aktualny_gracz)
-            if mozliwe_akcje:
-                wybrana_akcja = random.choice(mozliwe_akcje)
-                logger.info(f"DECYZJA AI '{aktualny_gracz.nazwa}': Wybiera akcję -> {wybrana_akcja}")
-                rozdanie.wykonaj_akcje(aktualny_gracz, wybrana_akcja)
-            else: break
+            if not rozdanie.get_legalne_maska(aktualny_gracz): return False
+            with czas_decyzji_ai.mierz('karta'):
+                wybrana_karta = bot_ai.wybierz_karte(rozdanie, aktualny_gracz)
+            logger.info("DECYZJA AI '%s': Zagrywa kartę -> %s", aktualny_gracz.nazwa, wybrana_karta)
+            rozdanie.zagraj_karte(aktualny_gracz, wybrana_karta)
+        else:
+            if not rozdanie.get_mozliwe_akcje(aktualny_gracz): return False
+            with czas_decyzji_ai.mierz('akcja'):
+                wybrana_akcja = bot_ai.wybierz_akcje(rozdanie, aktualny_gracz)
+            logger.info("DECYZJA AI '%s': Wybiera akcję -> %s", aktualny_gracz.nazwa, wybrana_akcja)
+            rozdanie.wykonaj_akcje(aktualny_gracz, wybrana_akcja)
+        if len(rozdanie.stos_cofania) == dlugosc_stosu: # Silnik odrzucił ruch bota - stan się nie zmienił
+            return False
+        # Nowa wersja tylko po wykonanym ruchu - puste kroki nie unieważniają ETag i nie zapisują migawki
+        sesja.oznacz_zmiane()
+        return True
+
+def _opis_dla_frontendu(akcja: Akcja) -> str:
+    if akcja.typ == 'deklaracja':
+        return f"Graj {akcja.kontrakt.name.capitalize()} w {akcja.atut.name.capitalize()}" if akcja.atut else f"Graj {akcja.kontrakt.name.capitalize()}"
+    return akcja.typ.replace('_', ' ').capitalize()
+
+# Widok każdej karty na ręce gracza (wspólne słowniki, tylko do odczytu)
+WIDOKI_KART: tuple[dict, ...] = tuple({"nazwa": k.nazwa, "nazwa_pliku": k.nazwa_pliku} for k in KARTY)
+# Teksty przycisków licytacji liczone raz (po kodzie akcji) zamiast przy każdym odpytaniu o stan
+OPISY_AKCJI_FRONTEND: tuple[str, ...] = tuple(_opis_dla_frontendu(a) for a in AKCJE_LICYTACJI)
+URLE_AKCJI: tuple[str, ...] = tuple(f"/wykonaj_akcje/{idx}" for idx in range(len(AKCJE_LICYTACJI)))
+
+def zbuduj_stan_gry(aktualny_mecz: Mecz, miejsce: int = 0) -> dict:
+    """Stan gry z perspektywy człowieka na danym miejscu - ten sam słownik dla /stan_gry i dla WebSocket.
+
+    Lista graczy zaczyna się od patrzącego (frontend rysuje gracze[0] na dole), a "My" to zawsze jego drużyna.
+    """
+    rozdanie = aktualny_mecz.rozdanie
+    gracz_czlowieka = aktualny_mecz.gracze[miejsce]
+    nasi, oni = gracz_czlowieka.druzyna, gracz_czlowieka.druzyna.przeciwnicy
+    mozliwe_akcje_dla_frontendu = []
+    legalne_karty_dla_frontendu = []
+    is_human_turn = rozdanie and not rozdanie.rozdanie_zakonczone and rozdanie.kolej_gracza_idx is not None and rozdanie.gracze[rozdanie.kolej_gracza_idx] == gracz_czlowieka
+    if is_human_turn:
+        if rozdanie.faza == FazaGry.ROZGRYWKA:
+            legalne_karty = rozdanie.get_legalne_karty(gracz_czlowieka)
+            legalne_karty_dla_frontendu = [k.nazwa for k in legalne_karty]
+        else:
+            akcje_z_silnika = rozdanie.get_mozliwe_akcje(gracz_czlowieka)
+            mozliwe_akcje_dla_frontendu = [{"url": URLE_AKCJI[idx], "opis": OPISY_AKCJI_FRONTEND[akcja.kod]} for idx, akcja in enumerate(akcje_z_silnika)]
+    return {
+         "gracze": [aktualny_mecz.gracze[(miejsce + i) % 4].nazwa for i in range(4)],
+         "ilosc_kart_graczy": {g.nazwa: len(g.reka) for g in aktualny_mecz.rozdanie.gracze},
+         "faza_gry": aktualny_mecz.rozdanie.faza.name,
+         "kolej_na": aktualny_mecz.rozdanie.gracze[aktualny_mecz.rozdanie.kolej_gracza_idx].nazwa if aktualny_mecz.rozdanie.kolej_gracza_idx is not None else "",
+         "reka_gracza": [WIDOKI_KART[k.indeks] for k in KARTY_DO_WYSWIETLENIA if gracz_czlowieka.reka_maska >> k.indeks & 1],
+         "karty_na_stole": [{"gracz": g.nazwa, "karta": k.nazwa, "nazwa_pliku": k.nazwa_pliku} for g, k in aktualny_mecz.rozdanie.aktualna_lewa],
+         "kontrakt": {"typ": aktualny_mecz.rozdanie.kontrakt.name if aktualny_mecz.rozdanie.kontrakt else None, "atut": aktualny_mecz.rozdanie.atut.name if aktualny_mecz.rozdanie.atut else None, "gracz": aktualny_mecz.rozdanie.grajacy.nazwa if aktualny_mecz.rozdanie.grajacy else None},
+         "punkty_w_rozdaniu": {"My": aktualny_mecz.rozdanie.punkty_w_rozdaniu[nasi.nazwa], "Oni": aktualny_mecz.rozdanie.punkty_w_rozdaniu[oni.nazwa]},
+         "ogolne_punkty_meczu": {"My": nasi.punkty_meczu, "Oni": oni.punkty_meczu},
+         "szansa_meczu": round(tabela_meczu.szansa(nasi.punkty_meczu, oni.punkty_meczu, (rozdanie.rozdajacy_idx + 1) % 2 == miejsce % 2), 3) if tabela_meczu else None,
+         "mozliwe_akcje": mozliwe_akcje_dla_frontendu,
+         "legalne_karty_nazwy": legalne_karty_dla_frontendu,
+         "historia_akcji": aktualny_mecz.rozdanie.historia_akcji,
+         "aktualna_stawka": aktualny_mecz.rozdanie.get_aktualna_stawka(),
+         "rozdajacy_idx": (aktualny_mecz.rozdanie.rozdajacy_idx - miejsce) % 4,
+         "koniec_meczu": bool(aktualny_mecz.zwyciezca_meczu),
+         "zwyciezca": ("My" if aktualny_mecz.zwyciezca_meczu is nasi else "Oni") if aktualny_mecz.zwyciezca_meczu else None,
+         "wynik": f"My {nasi.punkty_meczu} - {oni.punkty_meczu} Oni" if aktualny_mecz.zwyciezca_meczu else ""
+    }
+
+def stan_sesji(sesja: Sesja, miejsce: int = 0) -> dict:
+    """Stan gry dla aktualnej wersji meczu z polem "wersja"; budowany raz na wersję i miejsce (wołać pod blokadą sesji)."""
+    klucz = (sesja.mecz.wersja, miejsce)
+    stan = sesja.stany.get(klucz)
+    if stan is None:
+        stan = zbuduj_stan_gry(sesja.mecz, miejsce)
+        stan["wersja"] = f"{sesja.epoka}.{sesja.mecz.wersja}"
+        sesja.stany[klucz] = stan
+        while len(sesja.stany) > 4 * PAMIETANE_WERSJE: sesja.stany.popitem(last=False)
+    return stan
+
+def roznica_stanow(stary: dict, nowy: dict) -> dict:
+    """Odpowiedź z samymi zmienionymi polami; z historii wysyłamy tylko nowe wpisy, jeśli stara jest jej początkiem."""
+    zmiany = {k: v for k, v in nowy.items() if k not in ("wersja", "historia_akcji") and stary.get(k) != v}
+    roznica = {"delta": True, "od": stary["wersja"], "wersja": nowy["wersja"], "zmiany": zmiany}
+    stara_historia, nowa_historia = stary["historia_akcji"], nowy["historia_akcji"]
+    if nowa_historia[:len(stara_historia)] == stara_historia:
+        roznica["nowa_historia"] = nowa_historia[len(stara_historia):]
+    else:
+        zmiany["historia_akcji"] = nowa_historia
+    return roznica
+
+def _teksty_stanu(sesja: Sesja, miejsca: Set[int]) -> Dict[int, str]:
+    with zajmij(sesja.blokada, czekanie_na_blokade, 'rozsylanie'), czas_etapow.mierz('stan_gry_json'):
+        return {m: json.dumps(stan_sesji(sesja, m), ensure_ascii=False) for m in miejsca}
+
+def _loguj_stan_czlowieka(sesja: Sesja):
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    with zajmij(sesja.blokada, czekanie_na_blokade, 'logowanie'), czas_etapow.mierz('logowanie'):
+        rozdanie = sesja.mecz.rozdanie
+        if rozdanie and rozdanie.kolej_gracza_idx is not None:
+            loguj_stan_gry(rozdanie, rozdanie.gracze[rozdanie.kolej_gracza_idx].nazwa)
+
+async def rozeslij_stan(session_id: str):
+    """Wysyła aktualny stan do wszystkich połączeń stołu: JSON budowany raz na miejsce, wysyłki równolegle."""
+    odbiorcy = polaczenia.get(session_id)
+    sesja = aktywne_gry.pobierz(session_id) if odbiorcy else None
+    if not sesja:
+        return
+    adresaci = list(odbiorcy.items())
+    teksty = await asyncio.to_thread(_teksty_stanu, sesja, {m for _, m in adresaci})
+    # Wolne połączenie jednego gracza nie opóźnia powiadomień pozostałych
+    wyniki = await asyncio.gather(*(ws.send_text(teksty[m]) for ws, m in adresaci), return_exceptions=True)
+    for (websocket, _), wynik in zip(adresaci, wyniki):
+        if isinstance(wynik, Exception): odbiorcy.pop(websocket, None)
+
+async def prowadz_gre(session_id: str, rozeslij_na_poczatku: bool = True):
+    """Pętla ruchów komputera dla jednego stołu: po każdej zmianie rozsyła stan, kończy się na turze człowieka."""
+    if session_id in aktywne_petle:
+        return
+    aktywne_petle.add(session_id)
+    try:
+        if rozeslij_na_poczatku: await rozeslij_stan(session_id)
+        while (sesja := aktywne_gry.pobierz(session_id)) and czeka_na_komputer(sesja):
+            await asyncio.sleep(OPOZNIENIE_AI_S)
+            # Decyzja bota działa w wątku roboczym; pętla zdarzeń w tym czasie obsługuje inne sesje
+            if not await asyncio.to_thread(wykonaj_krok_gry, session_id, sesja):
+                break
+            await rozeslij_stan(session_id)
+        if sesja and not sesja.mecz.zwyciezca_meczu:
+            # Logujemy stan gry raz, przed decyzją człowieka
+            await asyncio.to_thread(_loguj_stan_czlowieka, sesja)
+    finally:
+        aktywne_petle.discard(session_id)
 
 @app.get("/stan_gry")
-def get_stan_gry(response: Response, session_id: Optional[str] = Cookie(None)):
-    with game_lock:
-        aktualny_mecz = get_or_create_mecz(session_id, response)
-        
-        # Uruchamiamy AI, które teraz samo loguje swoje decyzje
-        uruchom_ture_ai(aktualny_mecz)
-        
-        rozdanie = aktualny_mecz.rozdanie
-        if rozdanie and rozdanie.rozdanie_zakonczone and not aktualny_mecz.zwyciezca_meczu:
-            zwyciezca, punkty, mnoznik = rozdanie.rozlicz_rozdanie()
-            logger.info(f"--- KONIEC ROZDANIA --- Wygrywa: {zwyciezca.nazwa} (+{punkty} pkt)")
-            aktualny_mecz.sprawdz_koniec_meczu()
-            if not aktualny_mecz.zwyciezca_meczu:
-                aktualny_mecz.przygotuj_nastepne_rozdanie()
-
-        # Logujemy stan gry przed zwróceniem go do ludzkiego gracza
-        gracz_czlowieka = aktualny_mecz.gracze[0]
-        loguj_stan_gry(rozdanie, gracz_czlowieka.nazwa)
-
-        # Reszta kodu do generowania odpowiedzi JSON pozostaje bez zmian
-        mozliwe_akcje_dla_frontendu = []
-        legalne_karty_dla_frontendu = []
-        is_human_turn = rozdanie and rozdanie.kolej_gracza_idx is not None and rozdanie.gracze[rozdanie.kolej_gracza_idx] == gracz_czlowieka
-        if is_human_turn:
-            if rozdanie.faza == FazaGry.ROZGRYWKA:
-                legalne_karty = rozdanie.get_legalne_karty(gracz_czlowieka)
-                legalne_karty_dla_frontendu = [str(k) for k in legalne_karty]
-            else:
-                akcje_z_silnika = rozdanie.get_mozliwe_akcje(gracz_czlowieka)
-                for idx, akcja in enumerate(akcje_z_silnika):
-                    opis = akcja['typ'].replace('_', ' ').capitalize()
-                    if akcja['typ'] == 'deklaracja':
-                        opis = f"Graj {akcja['kontrakt'].name.capitalize()} w {akcja['atut'].name.capitalize()}" if akcja.get('atut') else f"Graj {akcja['kontrakt'].name.capitalize()}"
-                    
-                    mozliwe_akcje_dla_frontendu.append({
-                        "url": f"/wykonaj_akcje/{idx}",
-                        "opis": opis
-                    })
-        return {
-             "gracze": [g.nazwa for g in aktualny_mecz.gracze],
-             "ilosc_kart_graczy": {g.nazwa: len(g.reka) for g in aktualny_mecz.rozdanie.gracze},
-             "faza_gry": aktualny_mecz.rozdanie.faza.name,
-             "kolej_na": aktualny_mecz.rozdanie.gracze[aktualny_mecz.rozdanie.kolej_gracza_idx].nazwa if aktualny_mecz.rozdanie.kolej_gracza_idx is not None else "",
-             "reka_gracza": [{"nazwa": str(k), "nazwa_pliku": k.nazwa_pliku} for k in sorted(aktualny_mecz.gracze[0].reka, key=lambda k: (k.kolor.name, k.ranga.value))],
-             "karty_na_stole": [{"gracz": g.nazwa, "karta": str(k), "nazwa_pliku": k.nazwa_pliku} for g, k in aktualny_mecz.rozdanie.aktualna_lewa],
-             "kontrakt": {"typ": aktualny_mecz.rozdanie.kontrakt.name if aktualny_mecz.rozdanie.kontrakt else None, "atut": aktualny_mecz.rozdanie.atut.name if aktualny_mecz.rozdanie.atut else None, "gracz": aktualny_mecz.rozdanie.grajacy.nazwa if aktualny_mecz.rozdanie.grajacy else None},
-             "punkty_w_rozdaniu": aktualny_mecz.rozdanie.punkty_w_rozdaniu,
-             "ogolne_punkty_meczu": {"My": aktualny_mecz.druzyna_a.punkty_meczu, "Oni": aktualny_mecz.druzyna_b.punkty_meczu},
-             "mozliwe_akcje": mozliwe_akcje_dla_frontendu,
-             "legalne_karty_nazwy": legalne_karty_dla_frontendu,
-             "historia_akcji": aktualny_mecz.rozdanie.historia_akcji,
-             "aktualna_stawka": aktualny_mecz.rozdanie.get_aktualna_stawka(),
-             "rozdajacy_idx": aktualny_mecz.rozdanie.rozdajacy_idx,
-             "koniec_meczu": bool(aktualny_mecz.zwyciezca_meczu),
-             "zwyciezca": aktualny_mecz.zwyciezca_meczu.nazwa if aktualny_mecz.zwyciezca_meczu else None,
-             "wynik": f"My {aktualny_mecz.druzyna_a.punkty_meczu} - {aktualny_mecz.druzyna_b.punkty_meczu} Oni" if aktualny_mecz.zwyciezca_meczu else ""
-        }
+def get_stan_gry(response: Response, background_tasks: BackgroundTasks, od: Optional[str] = None,
+                 if_none_match: Optional[str] = Header(None), session_id: Optional[str] = Cookie(None)):
+    """Stan gry. Z nagłówkiem If-None-Match równym ETag aktualnej wersji - 304 bez treści; z `od=<wersja>`
+    znanej serwerowi - tylko różnica względem tej wersji (`roznica_stanow`), w przeciwnym razie pełny stan."""
+    stol_id, sesja, miejsce = get_or_create_sesja(session_id, response)
+    # Ruchy komputera wykonuje pętla stołu po wysłaniu odpowiedzi
+    background_tasks.add_task(prowadz_gre, stol_id)
+    with zajmij(sesja.blokada, czekanie_na_blokade, 'stan_gry'), czas_etapow.mierz('stan_gry'):
+        etag = f'"{sesja.epoka}.{sesja.mecz.wersja}"'
+        if if_none_match and etag in (t.strip().removeprefix('W/') for t in if_none_match.split(',')):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-store"})
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-store" # Wersjami zarządza klient (If-None-Match, od=)
+        stan = stan_sesji(sesja, miejsce)
+        epoka, _, wersja_klienta = (od or "").partition(".")
+        stary = sesja.stany.get((int(wersja_klienta), miejsce)) if epoka == sesja.epoka and wersja_klienta.isdigit() else None
+        return roznica_stanow(stary, stan) if stary is not None else stan
+
+@app.websocket("/ws")
+async def ws_stan_gry(websocket: WebSocket, session_id: Optional[str] = Cookie(None)):
+    """Kanał powiadomień: serwer wysyła pełny stan gry tylko wtedy, gdy mecz się zmienił."""
+    await websocket.accept()
+    miejsce = aktywne_gry.znajdz_miejsce(session_id) if session_id else None
+    sesja = aktywne_gry.pobierz(miejsce[0]) if miejsce else None
+    if sesja is None:
+        await websocket.close(code=1008)
+        return
+    stol_id, nr_miejsca = miejsce
+    polaczenia.setdefault(stol_id, {})[websocket] = nr_miejsca
+    try:
+        await websocket.send_text((await asyncio.to_thread(_teksty_stanu, sesja, {nr_miejsca}))[nr_miejsca])
+        asyncio.create_task(prowadz_gre(stol_id, rozeslij_na_poczatku=False))
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        odbiorcy = polaczenia.get(stol_id)
+        if odbiorcy is not None:
+            odbiorcy.pop(websocket, None)
+            if not odbiorcy: del polaczenia[stol_id]
+
+def zatwierdz_ruch(stol_id: str, sesja: Sesja):
+    if not aktywne_gry.zatwierdz(stol_id, sesja):
+        raise HTTPException(status_code=409, detail="Stan gry zmienił się w międzyczasie - odśwież stan")
 
 @app.get("/wykonaj_akcje/{akcja_idx}")
-def wykonaj_akcje_gracza(akcja_idx: int, response: Response, session_id: Optional[str] = Cookie(None)):
-    with game_lock:
-        aktualny_mecz = get_or_create_mecz(session_id, response)
-        gracz_czlowieka = aktualny_mecz.gracze[0]
+def wykonaj_akcje_gracza(akcja_idx: int, response: Response, background_tasks: BackgroundTasks, session_id: Optional[str] = Cookie(None)):
+    stol_id, sesja, miejsce = get_or_create_sesja(session_id, response)
+    with zajmij(sesja.blokada, czekanie_na_blokade, 'wykonaj_akcje'):
+        aktualny_mecz = sesja.mecz
+        gracz_czlowieka = aktualny_mecz.gracze[miejsce]
         rozdanie = aktualny_mecz.rozdanie
-        if rozdanie and rozdanie.kolej_gracza_idx is not None and rozdanie.gracze[rozdanie.kolej_gracza_idx] == gracz_czlowieka:
+        if rozdanie and not rozdanie.rozdanie_zakonczone and rozdanie.kolej_gracza_idx == miejsce:
             mozliwe_akcje = rozdanie.get_mozliwe_akcje(gracz_czlowieka)
             if 0 <= akcja_idx < len(mozliwe_akcje):
                 wybrana_akcja = mozliwe_akcje[akcja_idx]
                 # ✅ ZMIANA: Logowanie decyzji gracza
-                logger.info(f"DECYZJA GRACZA '{gracz_czlowieka.nazwa}': Wybiera akcję -> {wybrana_akcja}")
+                logger.info("DECYZJA GRACZA '%s': Wybiera akcję -> %s", gracz_czlowieka.nazwa, wybrana_akcja)
                 rozdanie.wykonaj_akcje(gracz_czlowieka, wybrana_akcja)
+                sesja.oznacz_zmiane()
+                background_tasks.add_task(prowadz_gre, stol_id)
+    zatwierdz_ruch(stol_id, sesja)
     return {"status": "ok"}
 
 @app.get("/zagraj_karte/{karta_str}")
-def zagraj_karte_gracza(karta_str: str, response: Response, session_id: Optional[str] = Cookie(None)):
-    with game_lock:
-        aktualny_mecz = get_or_create_mecz(session_id, response)
-        gracz_czlowieka = aktualny_mecz.gracze[0]
+def zagraj_karte_gracza(karta_str: str, response: Response, background_tasks: BackgroundTasks, session_id: Optional[str] = Cookie(None)):
+    stol_id, sesja, miejsce = get_or_create_sesja(session_id, response)
+    with zajmij(sesja.blokada, czekanie_na_blokade, 'zagraj_karte'):
+        aktualny_mecz = sesja.mecz
+        gracz_czlowieka = aktualny_mecz.gracze[miejsce]
         rozdanie = aktualny_mecz.rozdanie
-        if rozdanie and rozdanie.kolej_gracza_idx is not None and rozdanie.gracze[rozdanie.kolej_gracza_idx] == gracz_czlowieka:
-            legalne_karty = rozdanie.get_legalne_karty(gracz_czlowieka)
-            from urllib.parse import unquote
+        if rozdanie and not rozdanie.rozdanie_zakonczone and rozdanie.kolej_gracza_idx == miejsce:
             karta_str_decoded = unquote(karta_str)
-            wybrana_karta = next((k for k in legalne_karty if str(k) == karta_str_decoded), None)
-            if wybrana_karta:
+            wybrana_karta = KARTY_PO_NAZWIE.get(karta_str_decoded)
+            if wybrana_karta and rozdanie.get_legalne_maska(gracz_czlowieka) >> wybrana_karta.indeks & 1:
                 # ✅ ZMIANA: Logowanie decyzji gracza
-                logger.info(f"DECYZJA GRACZA '{gracz_czlowieka.nazwa}': Zagrywa kartę -> {wybrana_karta}")
+                logger.info("DECYZJA GRACZA '%s': Zagrywa kartę -> %s", gracz_czlowieka.nazwa, wybrana_karta)
                 rozdanie.zagraj_karte(gracz_czlowieka, wybrana_karta)
+                sesja.oznacz_zmiane()
+                background_tasks.add_task(prowadz_gre, stol_id)
             else:
-                logger.error(f"Nielegalny ruch! Próba zagrania {karta_str_decoded}. Legalne karty: {[str(k) for k in legalne_karty]}")
+                logger.error("Nielegalny ruch! Próba zagrania %s. Legalne karty: %s", karta_str_decoded, [k.nazwa for k in rozdanie.get_legalne_karty(gracz_czlowieka)])
                 raise HTTPException(status_code=400, detail="Nielegalny ruch lub zła karta")
+    zatwierdz_ruch(stol_id, sesja)
     return {"status": "ok"}
 
+def odejdz_od_stolu(gracz: str, background_tasks: BackgroundTasks):
+    """Zwalnia miejsce gracza; jeśli przy stole zostali ludzie, komputer przejmuje jego ruchy."""
+    miejsce = aktywne_gry.znajdz_miejsce(gracz)
+    aktywne_gry.zwolnij_miejsce(gracz)
+    if miejsce and aktywne_gry.pobierz(miejsce[0]):
+        background_tasks.add_task(prowadz_gre, miejsce[0])
+
 @app.get("/nowy_mecz")
-def nowy_mecz_endpoint(response: Response, session_id: Optional[str] = Cookie(None)):
+def nowy_mecz_endpoint(response: Response, background_tasks: BackgroundTasks, session_id: Optional[str] = Cookie(None)):
     logger.info("="*20 + " NOWY MECZ " + "="*20)
-    with game_lock:
-        if session_id and session_id in aktywne_gry:
-            del aktywne_gry[session_id]
-        get_or_create_mecz(None, response)
+    if session_id:
+        odejdz_od_stolu(session_id, background_tasks)
+    get_or_create_sesja(None, response)
     return {"status": "nowy mecz rozpoczęty"}
 
+# --- Poczekalnia i stoły wieloosobowe ---
+poczekalnia = Poczekalnia(sciezka_bazy=PLIK_SESJI if WIELE_PROCESOW else None) # Z wieloma procesami kolejka jest w bazie
+NAZWY_KOMPUTERA = ("Komputer 1", "Komputer 2", "Komputer 3")
+
+def _nazwa_gracza(nazwa: str) -> str:
+    return re.sub(r"[^\w \-]", "", nazwa)[:16].strip() or "Gracz"
+
+def utworz_stoly(background_tasks: BackgroundTasks):
+    """Sadza przy nowych stołach grupy gotowe w poczekalni; wolne miejsca zajmuje komputer."""
+    for grupa in poczekalnia.dobierz_stoly():
+        ludzie, nazwy = {}, [None] * 4
+        for miejsce, (gracz, nazwa) in zip(KOLEJNOSC_MIEJSC, grupa):
+            ludzie[miejsce] = gracz
+            # Silnik rozróżnia graczy po nazwie, więc nazwy przy stole muszą być różne
+            nazwa = baza = _nazwa_gracza(nazwa)
+            nr = 1
+            while nazwa in nazwy or nazwa in NAZWY_KOMPUTERA:
+                nr += 1
+                nazwa = f"{baza[:13]} {nr}"
+            nazwy[miejsce] = nazwa
+        wolne = (m for m in range(4) if nazwy[m] is None)
+        for nr, miejsce in enumerate(wolne): nazwy[miejsce] = NAZWY_KOMPUTERA[nr]
+        stol_id, ziarno = secrets.token_hex(16), secrets.randbits(32)
+        logger.info("Nowy stół %s (ziarno: %d): %s", stol_id, ziarno, nazwy)
+        mecz = Mecz(nazwy_graczy=nazwy, ziarno=ziarno)
+        mecz.rozpocznij_mecz()
+        aktywne_gry.dodaj(stol_id, Sesja(mecz, ludzie=ludzie))
+        background_tasks.add_task(prowadz_gre, stol_id)
+
+@app.get("/lobby/dolacz")
+def lobby_dolacz(response: Response, background_tasks: BackgroundTasks, nazwa: str = "Gracz", session_id: Optional[str] = Cookie(None)):
+    """Zapisuje gracza do kolejki na stół wieloosobowy (gracz odchodzi od obecnego stołu)."""
+    if session_id:
+        odejdz_od_stolu(session_id, background_tasks)
+    else:
+        session_id = secrets.token_hex(16)
+        response.set_cookie(key="session_id", value=session_id, httponly=True)
+    poczekalnia.dolacz(session_id, nazwa)
+    utworz_stoly(background_tasks)
+    return lobby_stan(background_tasks, session_id)
+
+@app.get("/lobby/stan")
+def lobby_stan(background_tasks: BackgroundTasks, session_id: Optional[str] = Cookie(None)):
+    """Miejsce w kolejce albo - gdy stół już powstał - miejsce przy stole (frontend przechodzi wtedy do gry)."""
+    utworz_stoly(background_tasks)
+    pozycja = poczekalnia.pozycja(session_id) if session_id else None
+    miejsce = aktywne_gry.znajdz_miejsce(session_id) if session_id and pozycja is None else None
+    return {"pozycja": pozycja, "czekajacych": len(poczekalnia), "przy_stole": miejsce is not None,
+            "miejsce": miejsce[1] if miejsce else None}
+
+@app.api_route("/lobby/opusc", methods=["GET", "POST"]) # POST z navigator.sendBeacon przy zamykaniu strony
+def lobby_opusc(session_id: Optional[str] = Cookie(None)):
+    if session_id:
+        poczekalnia.opusc(session_id)
+    return {"status": "ok"}
+
+def _tylko_lokalnie(request: Request):
+    if not request.client or request.client.host not in ADRESY_LOKALNE:
+        raise HTTPException(status_code=403, detail="Metryki są dostępne tylko lokalnie")
+
+@app.get("/metryki", response_class=PlainTextResponse)
+def get_metryki(request: Request):
+    _tylko_lokalnie(request)
+    return PlainTextResponse(tekst_prometheusa(metryki), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/metryki/profiler/{akcja}", response_class=PlainTextResponse)
+def profiler_endpoint(akcja: str, request: Request):
+    """start - czyści i włącza profiler próbkujący, stop - wyłącza go, wynik - zebrane stosy (format collapsed)."""
+    _tylko_lokalnie(request)
+    if akcja == "start": profiler.wlacz()
+    elif akcja == "stop": profiler.wylacz()
+    elif akcja != "wynik": raise HTTPException(status_code=404, detail="Dostępne akcje: start, stop, wynik")
+    if akcja == "wynik": return profiler.wynik()
+    return f"profiler {'włączony' if profiler.wlaczony else 'wyłączony'}, próbek: {profiler.probki}\n"
+
 app.mount("/", StaticFiles(directory="static", html=True), name="static")
\ No newline at end of file
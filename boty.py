@@ -0,0 +1,205 @@
+import time
+import random
+from abc import ABC, abstractmethod
+from typing import Optional, Sequence, Union
+from silnik_gry import (Rozdanie, Gracz, Karta, Akcja, Kolor, Ranga, FazaGry, KARTY, PELNA_TALIA, STAWKI_KONTRAKTOW,
+                        karty_z_maski, losowa_karta_z_maski)
+
+LIMIT_RUCHOW_SYMULACJI = 200 # Zabezpieczenie przed zapętleniem licytacji w losowej symulacji
+PROBY_LOSOWANIA = 20         # Ile razy próbujemy rozdać ukryte karty zgodnie ze znanymi ograniczeniami
+PROG_LUFY = 0.6              # BotTabelaSily daje lufę/kontrę dopiero przy takiej szansie własnej drużyny
+
+# Król i Dama danego koloru - po meldunku wiadomo, że druga karta pary jest w ręce meldującego
+PARY_MELDUNKOWE = {k: (1 << Karta(Ranga.KROL, k).indeks) | (1 << Karta(Ranga.DAMA, k).indeks) for k in Kolor}
+
+
+class Bot(ABC):
+    """Interfejs gracza komputerowego. Bot dostaje rozdanie i gracza, który ma teraz ruch."""
+    @abstractmethod
+    def wybierz_karte(self, rozdanie: Rozdanie, gracz: Gracz) -> Karta: ...
+    @abstractmethod
+    def wybierz_akcje(self, rozdanie: Rozdanie, gracz: Gracz) -> Akcja: ...
+
+
+class BotLosowy(Bot):
+    """Dotychczasowe zachowanie: losowy legalny ruch."""
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng or random
+    def wybierz_karte(self, rozdanie: Rozdanie, gracz: Gracz) -> Karta:
+        return KARTY[losowa_karta_z_maski(rozdanie.get_legalne_maska(gracz), self.rng)]
+    def wybierz_akcje(self, rozdanie: Rozdanie, gracz: Gracz) -> Akcja:
+        return self.rng.choice(rozdanie.get_mozliwe_akcje(gracz))
+
+
+class BotPIMC(Bot):
+    """Monte Carlo z determinizacją (PIMC).
+
+    Bot wielokrotnie losuje ręce pozostałych graczy zgodne z tym, co widział (własna ręka,
+    zagrane karty, ujawnione braki w kolorze i zgłoszone meldunki), a dla każdego losowania
+    rozgrywa każdy możliwy ruch do końca rozdania losowymi ruchami. Wybiera ruch z najlepszym
+    średnim wynikiem rozdania (punkty meczowe z perspektywy własnej drużyny).
+
+    Symulacje działają na prawdziwym obiekcie Rozdanie przez zagraj/cofnij, a ukryte ręce i talia
+    są przywracane po każdej decyzji. Czas sprawdzany jest co `rozmiar_paczki` losowań.
+    """
+    def __init__(self, budzet_s: float = 0.05, rozmiar_paczki: int = 4, rng: Optional[random.Random] = None):
+        self.budzet_s = budzet_s
+        self.rozmiar_paczki = rozmiar_paczki
+        self.rng = rng or random
+
+    def wybierz_karte(self, rozdanie: Rozdanie, gracz: Gracz) -> Karta:
+        legalne = rozdanie.get_legalne_karty(gracz)
+        if len(legalne) == 1:
+            return legalne[0]
+        return self._najlepszy_ruch(rozdanie, gracz, legalne)
+
+    def wybierz_akcje(self, rozdanie: Rozdanie, gracz: Gracz) -> Akcja:
+        akcje = rozdanie.get_mozliwe_akcje(gracz)
+        if len(akcje) == 1:
+            return akcje[0]
+        return self._najlepszy_ruch(rozdanie, gracz, akcje)
+
+    def _najlepszy_ruch(self, rozdanie: Rozdanie, gracz: Gracz, ruchy: Sequence[Union[Karta, Akcja]]) -> Union[Karta, Akcja]:
+        sumy = [0] * len(ruchy)
+        prawdziwe_rece = [g.reka_maska for g in rozdanie.gracze]
+        prawdziwa_talia = rozdanie.talia.karty[:]
+        ograniczenia = self._ograniczenia(rozdanie, gracz)
+        bylo_logowanie, rozdanie.logowanie = rozdanie.logowanie, False
+        koniec = time.perf_counter() + self.budzet_s
+        try:
+            while True:
+                for _ in range(self.rozmiar_paczki):
+                    self._losuj_ukryte_karty(rozdanie, gracz, *ograniczenia)
+                    for i, ruch in enumerate(ruchy):
+                        sumy[i] += self._rozegraj(rozdanie, gracz, ruch)
+                if time.perf_counter() >= koniec:
+                    break
+        finally:
+            for g, reka in zip(rozdanie.gracze, prawdziwe_rece): g.reka_maska = reka
+            rozdanie.talia.karty[:] = prawdziwa_talia
+            rozdanie.logowanie = bylo_logowanie
+        return ruchy[max(range(len(ruchy)), key=sumy.__getitem__)]
+
+    def _ograniczenia(self, rozdanie: Rozdanie, gracz: Gracz) -> tuple[dict, dict]:
+        """Karty, których dany gracz na pewno nie ma (z zasad dokładania) i które na pewno ma (z meldunków)."""
+        zakazane = {g: 0 for g in rozdanie.gracze}
+        for g, karta, wzorzec in rozdanie.historia_zagran():
+            if wzorzec is None: continue
+            # Gracz zagrał kartę z i-tej maski łańcucha, więc nie miał żadnej karty z wcześniejszych masek
+            wczesniejsze = 0
+            for maska in wzorzec:
+                if maska >> karta.indeks & 1: break
+                wczesniejsze |= maska
+            zakazane[g] |= wczesniejsze
+        wymagane = {g: 0 for g in rozdanie.gracze}
+        for g, kolor in rozdanie.zadeklarowane_meldunki:
+            if g is not gracz:
+                wymagane[g] |= PARY_MELDUNKOWE[kolor]
+        return zakazane, wymagane
+
+    def _losuj_ukryte_karty(self, rozdanie: Rozdanie, gracz: Gracz, zakazane: dict, wymagane: dict):
+        """Rozdaje niewidoczne karty pozostałym graczom i do talii, z zachowaniem liczby kart w rękach."""
+        zagrane = rozdanie.lewa_maska
+        for g in rozdanie.gracze: zagrane |= g.wygrane_maska
+        ukryte = PELNA_TALIA & ~gracz.reka_maska & ~zagrane
+        inni = [g for g in rozdanie.gracze if g is not gracz]
+        liczby = {g: g.reka_maska.bit_count() for g in inni}
+        wymagane = {g: wymagane[g] & ukryte for g in inni}
+        # Najpierw gracze z największą liczbą ograniczeń, żeby zachłanne losowanie rzadziej się blokowało
+        inni.sort(key=lambda g: (ukryte & ~zakazane[g]).bit_count() - liczby[g])
+
+        for proba in range(PROBY_LOSOWANIA + 1):
+            uwzglednij_braki = proba < PROBY_LOSOWANIA
+            wolne = ukryte
+            for g in inni: wolne &= ~wymagane[g]
+            nowe_rece = {}
+            for g in inni:
+                dozwolone = [k.indeks for k in karty_z_maski(wolne & ~zakazane[g] if uwzglednij_braki else wolne)]
+                brakuje = liczby[g] - wymagane[g].bit_count()
+                if brakuje > len(dozwolone): break
+                reka = wymagane[g]
+                for idx in self.rng.sample(dozwolone, brakuje): reka |= 1 << idx
+                nowe_rece[g] = reka
+                wolne &= ~reka
+            else:
+                break
+
+        for g, reka in nowe_rece.items(): g.reka_maska = reka
+        # Reszta ukrytych kart trafia (w losowej kolejności) do nierozdanej części talii
+        talia = rozdanie.talia
+        reszta = karty_z_maski(wolne)
+        self.rng.shuffle(reszta)
+        talia.karty[:talia.pozostale] = reszta[:talia.pozostale]
+
+    def _rozegraj(self, rozdanie: Rozdanie, gracz: Gracz, ruch: Union[Karta, Akcja]) -> int:
+        """Wykonuje ruch, dogrywa rozdanie losowo, ocenia wynik i cofa wszystko."""
+        dlugosc_stosu = len(rozdanie.stos_cofania)
+        if isinstance(ruch, Karta): rozdanie.zagraj_karte(gracz, ruch)
+        else: rozdanie.wykonaj_akcje(gracz, ruch)
+        for _ in range(LIMIT_RUCHOW_SYMULACJI):
+            if rozdanie.rozdanie_zakonczone: break
+            aktualny = rozdanie.gracze[rozdanie.kolej_gracza_idx]
+            if rozdanie.faza == FazaGry.ROZGRYWKA:
+                maska = rozdanie.get_legalne_maska(aktualny)
+                if not maska: break
+                rozdanie.zagraj_karte(aktualny, KARTY[losowa_karta_z_maski(maska, self.rng)])
+            else:
+                akcje = rozdanie.get_mozliwe_akcje(aktualny)
+                if not akcje: break
+                rozdanie.wykonaj_akcje(aktualny, self.rng.choice(akcje))
+        wynik = 0
+        if rozdanie.rozdanie_zakonczone:
+            druzyna, punkty, _ = rozdanie.oblicz_wynik()
+            wynik = punkty if druzyna is gracz.druzyna else -punkty
+        rozdanie.cofnij_do(dlugosc_stosu)
+        return wynik
+
+
+class BotTabelaSily(Bot):
+    """Licytacja z tabeli siły rąk (sila_reki.TabelaSily), rozgrywka kart przez bota `gra`.
+
+    Każda akcja licytacji dostaje wartość oczekiwaną w punktach meczowych własnej drużyny, liczoną
+    z szansy w tabeli (stawka x (2 x szansa - 1)); bot wybiera akcję o największej wartości. Lufa
+    i kontra podwajają wartość, ale tylko przy szansie własnej drużyny co najmniej `prog_lufy`
+    (przy kolejnych podbiciach próg rośnie). Z `tabela_meczu` (szanse_meczu.TabelaMeczu) próg zależy
+    też od wyniku meczu: punkt odniesienia 0.5 zastępuje próg opłacalności lufy przy tym wyniku.
+    """
+    def __init__(self, tabela, gra: Optional[Bot] = None, prog_lufy: float = PROG_LUFY, tabela_meczu=None):
+        self.tabela = tabela
+        self.gra = gra or BotLosowy()
+        self.prog_lufy = prog_lufy
+        self.tabela_meczu = tabela_meczu
+
+    def wybierz_karte(self, rozdanie: Rozdanie, gracz: Gracz) -> Karta:
+        return self.gra.wybierz_karte(rozdanie, gracz)
+
+    def wybierz_akcje(self, rozdanie: Rozdanie, gracz: Gracz) -> Akcja:
+        akcje = rozdanie.get_mozliwe_akcje(gracz)
+        if len(akcje) == 1:
+            return akcje[0]
+        return max(akcje, key=lambda akcja: self._wartosc(rozdanie, gracz, akcja))
+
+    def _wartosc(self, rozdanie: Rozdanie, gracz: Gracz, akcja: Akcja) -> float:
+        reka, typ = gracz.reka_maska, akcja['typ']
+        if typ == 'deklaracja':
+            kontrakt, atut = akcja['kontrakt'], akcja['atut']
+        elif typ in ('zmiana_kontraktu', 'przebicie'):
+            kontrakt, atut = akcja['kontrakt'], rozdanie.atut # Grającym zostaje (albo zostaje) ten gracz
+        else:
+            # Pas, pytanie, lufa, kontra: kontrakt bez zmian, liczy się strona, po której gra gracz
+            grajacy = gracz is rozdanie.grajacy
+            szansa = self.tabela.szansa(reka, rozdanie.kontrakt, rozdanie.atut, 0 if grajacy else 1)
+            szansa_nasza = szansa if grajacy else 1 - szansa
+            wartosc = STAWKI_KONTRAKTOW[rozdanie.kontrakt] * rozdanie.mnoznik_lufy * (2 * szansa_nasza - 1)
+            if typ in ('lufa', 'kontra'):
+                # Każde kolejne podbicie to sygnał siły drugiej strony: próg rośnie (0.6, 0.8, 0.9, ...)
+                prog = 1 - (1 - self.prog_lufy) / rozdanie.mnoznik_lufy
+                if self.tabela_meczu is not None:
+                    stawka = STAWKI_KONTRAKTOW[rozdanie.kontrakt] * rozdanie.mnoznik_lufy
+                    # Następne rozdanie rozda gracz po lewej obecnego rozdającego, a licytację zacznie drużyna rozdającego
+                    zaczynamy = rozdanie.miejsca[gracz] % 2 == rozdanie.rozdajacy_idx % 2
+                    prog += self.tabela_meczu.prog_lufy(gracz.druzyna.punkty_meczu, gracz.druzyna.przeciwnicy.punkty_meczu, stawka, zaczynamy) - 0.5
+                return 2 * wartosc if szansa_nasza >= prog else float('-inf')
+            return wartosc
+        szansa = self.tabela.szansa(reka, kontrakt, atut)
+        return STAWKI_KONTRAKTOW[kontrakt] * rozdanie.mnoznik_lufy * (2 * szansa - 1)
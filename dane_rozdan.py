@@ -0,0 +1,437 @@
+"""Kolumnowy zbiór danych o rozdaniach: strumieniowe wczytywanie logów i zapytania agregujące.
+
+Zbiór to katalog z dwiema tabelami - rozdania/ (wiersz na rozdanie) i lewy/ (wiersz na lewę) - w których
+każda kolumna to osobny plik .npy. Zapytania mapują z dysku tylko potrzebne kolumny.
+
+Źródła czytamy linia po linii, w stałej pamięci (bufor to najwyżej jeden mecz i paczka wierszy):
+  - log serwera (gra.log): linie "ZAPIS MECZU: ziarno=... ruchy=..." - mecz odtwarzamy na silniku
+    i eksportujemy ostatnie zakończone rozdanie z jego dziennika (`eksport_rozdania`), więc wiersze są
+    dokładne. Zwykłe wpisy silnika w gra.log pomijamy, bo stoły wieloosobowe piszą do pliku na przemian.
+    Zapisy, których nie da się odtworzyć (mecz bez ziarna, niezgodne ruchy), są liczone w meta 'pominiete'.
+  - log tekstowy z uruchom_test.py (log_finalny.txt): wiersze meczu trafiają do zbioru po jego końcu,
+    bo dopiero wtedy znamy miejsca wszystkich graczy (a więc drużynę grającego).
+Zbiór pamięta, do którego bajtu przeczytał każde źródło; kolejne uruchomienie dopisuje tylko nowe mecze.
+
+Serwer zapisuje linie "ZAPIS MECZU" przy każdym poziomie logu (logger 'szesc_szesc_logger.zapisy'), więc
+`python dane_rozdan.py wczytaj gra.log` działa na logu z domyślnych ustawień, bez POZIOM_LOGU=INFO.
+
+Użycie:
+    python dane_rozdan.py wczytaj gra.log log_finalny.txt
+    python dane_rozdan.py raport --grupuj kontrakt mnoznik_lufy
+    python dane_rozdan.py raport --kontrakt BEZ_PYTANIA --liczba-lew 1 --grupuj wygrana_grajacego
+"""
+import os
+import re
+import json
+import argparse
+from collections import OrderedDict
+from enum import Enum
+from typing import Optional, Sequence
+import numpy as np
+from silnik_gry import Rozdanie, Kontrakt, Kolor, STAWKI_KONTRAKTOW, KARTY_PO_NAZWIE, ZD_KARTA, ZD_LEWA
+from powtorka import Powtorka
+
+# --- KONFIGURACJA ---
+KATALOG = 'dane_rozdan'
+WERSJA = 1
+WIERSZE_W_PACZCE = 65536   # Tyle wierszy tabeli trzymamy w pamięci przed dopisaniem do plików
+PAMIETANE_MECZE = 1000     # Ziarna ostatnich meczów z logu serwera (kolejne zapisy meczu dostają ten sam numer)
+
+NIEZNANE = -1 # Miejsce / drużyna, których nie dało się ustalić z logu
+KOLUMNY_ROZDAN = {
+    'mecz': np.int32, 'nr': np.int16, 'rozdajacy': np.int8, 'grajacy': np.int8, 'druzyna_grajacego': np.int8,
+    'kontrakt': np.int8, 'atut': np.int8, 'mnoznik_lufy': np.int16, 'mnoznik': np.int8, 'punkty_meczowe': np.int16,
+    'zwyciezca': np.int8, 'wygrana_grajacego': np.int8, 'punkty_my': np.int16, 'punkty_oni': np.int16,
+    'liczba_lew': np.int8, 'przed_czasem': np.bool_,
+}
+KOLUMNY_LEW = {
+    'rozdanie': np.int64, 'nr': np.int8, 'prowadzacy': np.int8, 'zwyciezca': np.int8,
+    'wygrana_grajacego': np.int8, 'punkty': np.int16, 'karty': np.int32,
+}
+# Kolumny zapisane jako Enum.value (0 - brak), dekodowane w wynikach zapytań
+_SLOWNIKI: dict[str, type[Enum]] = {'kontrakt': Kontrakt, 'atut': Kolor}
+_KONIEC_KART = "koniec kart"
+
+
+def eksport_rozdania(rozdanie: Rozdanie, nr: int = 1) -> tuple[dict, list[tuple]]:
+    """Wiersz rozdania i wiersze lew (bez kolumn 'mecz' i 'rozdanie') z zakończonego rozdania silnika."""
+    druzyna_a = rozdanie.druzyny[0]
+    grajacy = rozdanie.miejsca[rozdanie.grajacy]
+    druzyna_grajacego = 0 if rozdanie.grajacy.druzyna is druzyna_a else 1
+    zwyciezca, punkty_meczowe, mnoznik = rozdanie.oblicz_wynik()
+    zwyciezca = 0 if zwyciezca is druzyna_a else 1
+    lewy, prowadzacy, karty = [], None, 0
+    for rodzaj, miejsce, a, _ in rozdanie.dziennik:
+        if rodzaj == ZD_KARTA:
+            if prowadzacy is None: prowadzacy = miejsce
+            karty |= 1 << a
+        elif rodzaj == ZD_LEWA:
+            lewy.append((len(lewy) + 1, prowadzacy, miejsce, int(rozdanie.gracze[miejsce].druzyna is rozdanie.grajacy.druzyna), a, karty))
+            prowadzacy, karty = None, 0
+    wiersz = {
+        'nr': nr, 'rozdajacy': rozdanie.rozdajacy_idx, 'grajacy': grajacy,
+        'druzyna_grajacego': druzyna_grajacego, 'kontrakt': rozdanie.kontrakt.value, 'atut': rozdanie.atut.value if rozdanie.atut else 0,
+        'mnoznik_lufy': rozdanie.mnoznik_lufy, 'mnoznik': mnoznik, 'punkty_meczowe': punkty_meczowe, 'zwyciezca': zwyciezca,
+        'wygrana_grajacego': int(zwyciezca == druzyna_grajacego), 'punkty_my': rozdanie.punkty_w_rozdaniu[druzyna_a.nazwa],
+        'punkty_oni': rozdanie.punkty_w_rozdaniu[druzyna_a.przeciwnicy.nazwa], 'liczba_lew': len(lewy),
+        'przed_czasem': bool(rozdanie.powod_zakonczenia) and rozdanie.powod_zakonczenia != _KONIEC_KART,
+    }
+    return wiersz, lewy
+
+
+class _Kolumna:
+    """Plik .npy otwarty do dopisywania. Nagłówek ma zapas na liczbę wierszy, więc przy zamknięciu
+    poprawiamy go w miejscu; nadmiarowe bajty po przerwanym zapisie obcinamy przy otwarciu."""
+    def __init__(self, sciezka: str, dtype, liczba_wierszy: int):
+        self.dtype, self.liczba_wierszy = np.dtype(dtype), liczba_wierszy
+        istnieje = os.path.exists(sciezka)
+        self.plik = open(sciezka, 'r+b' if istnieje else 'w+b')
+        if istnieje:
+            np.lib.format.read_magic(self.plik)
+            np.lib.format.read_array_header_1_0(self.plik)
+            self.poczatek_danych = self.plik.tell()
+            self.plik.truncate(self.poczatek_danych + liczba_wierszy * self.dtype.itemsize)
+            self.plik.seek(0, os.SEEK_END)
+        else:
+            self._zapisz_naglowek()
+            self.poczatek_danych = self.plik.tell()
+
+    def _zapisz_naglowek(self):
+        self.plik.seek(0)
+        np.lib.format.write_array_header_1_0(self.plik, {'descr': np.lib.format.dtype_to_descr(self.dtype),
+                                                         'fortran_order': False, 'shape': (self.liczba_wierszy,)})
+
+    def dopisz(self, wartosci: list):
+        np.asarray(wartosci, dtype=self.dtype).tofile(self.plik)
+        self.liczba_wierszy += len(wartosci)
+
+    def zamknij(self):
+        self._zapisz_naglowek()
+        if self.plik.tell() != self.poczatek_danych:
+            raise ValueError("Nagłówek kolumny .npy zmienił długość")
+        self.plik.close()
+
+
+class _Tabela:
+    """Kolumny jednej tabeli; wiersze (krotki w kolejności kolumn) zbierają się w paczkę i idą na dysk razem."""
+    def __init__(self, katalog: str, kolumny: dict, liczba_wierszy: int):
+        os.makedirs(katalog, exist_ok=True)
+        self.nazwy = list(kolumny)
+        self.kolumny = [_Kolumna(os.path.join(katalog, f'{nazwa}.npy'), dtype, liczba_wierszy) for nazwa, dtype in kolumny.items()]
+        self.liczba_wierszy = liczba_wierszy
+        self.paczka: list[tuple] = []
+
+    def dodaj(self, wiersz: tuple):
+        self.paczka.append(wiersz)
+        self.liczba_wierszy += 1
+        if len(self.paczka) >= WIERSZE_W_PACZCE: self.oproznij()
+
+    def oproznij(self):
+        if not self.paczka: return
+        for kolumna, wartosci in zip(self.kolumny, zip(*self.paczka)):
+            kolumna.dopisz(list(wartosci))
+        self.paczka.clear()
+
+    def zamknij(self):
+        self.oproznij()
+        for kolumna in self.kolumny: kolumna.zamknij()
+
+
+# --- Log tekstowy z uruchom_test.py ---
+_R_PARTIA = re.compile(r'### ROZPOCZYNAMY PARTIĘ #')
+_R_KONIEC_PARTII = re.compile(r'!!! (KONIEC GRY|PRZERWANO PARTIĘ)')
+_R_ROZDANIE = re.compile(r'### NOWE ROZDANIE \(rozdaje: (.+)\) ###')
+_R_ETAP = re.compile(r'--- ETAP: (.+) ---')
+_R_TURA = re.compile(r'^  Tura gracza: (.+)$')
+_R_DECYZJA = re.compile(r'Decyzja: (NORMALNA|BEZ_PYTANIA|GORSZA|LEPSZA)(?: \((\w+)\))?$')
+_R_KONTRAKT = re.compile(r'\[KONTRAKT\] (.+) gra (\w+) \((?:w (\w+)|bez atu)\)')
+_R_KARTA = re.compile(r'\[KARTA\] (.+) zagrywa: (.+)$')
+_R_LEWA = re.compile(r'> \[LEWA\] Wygrywa (.+) \(\+(\d+) pkt\)')
+_R_GRANY = re.compile(r'Grany kontrakt: (\w+) \(gra: (.+)\)')
+_R_POWOD = re.compile(r'Rozdanie zakończone przed czasem: (.+) !!!')
+_R_PUNKTY = re.compile(r'Punkty z kart: My (\d+) - (\d+) Oni')
+_R_ZWYCIEZCA = re.compile(r'Rozdanie wygrywa: (My|Oni)')
+_R_PRZYZNANE = re.compile(r'Przyznane punkty meczowe: (\d+) \(mnożnik: x(\d+)\)')
+_R_ZAPIS = re.compile(r'ZAPIS MECZU: ziarno=(\S+) ruchy=([0-9a-f]*)')
+
+
+class _ParserLogu:
+    """Stan parsera logu tekstowego. Rozdanie opisujemy nazwami graczy; na miejsca zamieniamy je na końcu meczu.
+
+    Miejsca ustalamy z kolejności rozdających (rozdanie n rozdaje gracz z miejsca (n-1) % 4, jak w Mecz),
+    z pierwszej deklaracji (miejsce po rozdającym) i z kolejności kart w lewach czteroosobowych.
+    """
+    def __init__(self):
+        self.rozdania: list[dict] = []     # Zakończone rozdania bieżącego meczu
+        self.miejsca: dict[str, int] = {}
+        self.rozdanie: Optional[dict] = None
+        self.w_meczu = False
+
+    def nowy_mecz(self):
+        self.rozdania, self.miejsca, self.rozdanie, self.w_meczu = [], {}, None, True
+
+    def linia(self, tekst: str) -> bool:
+        """Przetwarza linię; True, gdy właśnie skończył się mecz (rozdania czekają w self.rozdania)."""
+        if _R_PARTIA.search(tekst):
+            koniec = self.w_meczu and bool(self.rozdania)
+            if koniec: self.w_meczu = False # Mecz bez zakończenia (np. ucięty log) - oddajemy to, co mamy
+            return koniec
+        if not self.w_meczu: return False
+        if _R_KONIEC_PARTII.search(tekst):
+            self.w_meczu = False
+            return True
+        if m := _R_ROZDANIE.search(tekst):
+            nr = len(self.rozdania) + 1
+            self.miejsca.setdefault(m[1], (nr - 1) % 4)
+            self.rozdanie = {'nr': nr, 'rozdajacy': (nr - 1) % 4, 'etap': None, 'atut': None, 'lewy': [], 'lewa': []}
+            return False
+        r = self.rozdanie
+        if r is None: return False
+        if m := _R_ETAP.search(tekst):
+            r['etap'] = m[1]
+        elif m := _R_TURA.search(tekst):
+            if r['etap'] == 'DEKLARACJA 1' and 'pierwszy' not in r:
+                r['pierwszy'] = m[1]
+                self.miejsca.setdefault(m[1], (r['rozdajacy'] + 1) % 4)
+        elif (m := _R_DECYZJA.search(tekst)) and r['etap'] == 'DEKLARACJA 1':
+            r['atut'] = m[2]
+        elif m := _R_KONTRAKT.search(tekst):
+            r['atut'] = m[3].upper() if m[3] else None
+        elif m := _R_KARTA.search(tekst):
+            r['lewa'].append((m[1], KARTY_PO_NAZWIE[m[2].strip()]))
+        elif m := _R_LEWA.search(tekst):
+            lewa = r['lewa']
+            self._miejsca_z_lewy([nazwa for nazwa, _ in lewa])
+            karty = 0
+            for _, karta in lewa: karty |= 1 << karta.indeks
+            r['lewy'].append((len(r['lewy']) + 1, lewa[0][0] if lewa else None, m[1], int(m[2]), karty))
+            r['lewa'] = []
+        elif m := _R_GRANY.search(tekst):
+            r['kontrakt'], r['grajacy'] = Kontrakt[m[1]], m[2]
+        elif m := _R_POWOD.search(tekst):
+            r['powod'] = m[1]
+        elif m := _R_PUNKTY.search(tekst):
+            r['punkty'] = (int(m[1]), int(m[2]))
+        elif m := _R_ZWYCIEZCA.search(tekst):
+            r['zwyciezca'] = 0 if m[1] == 'My' else 1
+        elif (m := _R_PRZYZNANE.search(tekst)) and 'kontrakt' in r and 'zwyciezca' in r:
+            r['punkty_meczowe'], r['mnoznik'] = int(m[1]), int(m[2])
+            self.rozdania.append(r)
+            self.rozdanie = None
+        return False
+
+    def _miejsca_z_lewy(self, nazwy: list[str]):
+        if len(nazwy) != 4: return
+        for i, nazwa in enumerate(nazwy):
+            if nazwa in self.miejsca:
+                for j, inny in enumerate(nazwy):
+                    self.miejsca.setdefault(inny, (self.miejsca[nazwa] + j - i) % 4)
+                return
+
+    def wiersze(self) -> list[tuple[dict, list[tuple]]]:
+        """Rozdania zakończonego meczu jako (wiersz rozdania, wiersze lew) - format eksport_rozdania."""
+        miejsce = lambda nazwa: self.miejsca.get(nazwa, NIEZNANE)
+        wynik = []
+        for r in self.rozdania:
+            kontrakt, grajacy = r['kontrakt'], miejsce(r['grajacy'])
+            druzyna = NIEZNANE if grajacy == NIEZNANE else grajacy % 2
+            atut = Kolor[r['atut']].value if r['atut'] and kontrakt in (Kontrakt.NORMALNA, Kontrakt.BEZ_PYTANIA) else 0
+            lewy = []
+            for nr, prowadzacy, zwyciezca, punkty, karty in r['lewy']:
+                zwyciezca = miejsce(zwyciezca)
+                wygrana = NIEZNANE if NIEZNANE in (druzyna, zwyciezca) else int(zwyciezca % 2 == druzyna)
+                lewy.append((nr, miejsce(prowadzacy), zwyciezca, wygrana, punkty, karty))
+            powod = r.get('powod', '')
+            wynik.append(({
+                'nr': r['nr'], 'rozdajacy': r['rozdajacy'], 'grajacy': grajacy, 'druzyna_grajacego': druzyna,
+                'kontrakt': kontrakt.value, 'atut': atut,
+                'mnoznik_lufy': max(1, r['punkty_meczowe'] // (STAWKI_KONTRAKTOW[kontrakt] * r['mnoznik'])),
+                'mnoznik': r['mnoznik'], 'punkty_meczowe': r['punkty_meczowe'], 'zwyciezca': r['zwyciezca'],
+                'wygrana_grajacego': NIEZNANE if druzyna == NIEZNANE else int(r['zwyciezca'] == druzyna),
+                'punkty_my': r['punkty'][0], 'punkty_oni': r['punkty'][1], 'liczba_lew': len(lewy),
+                'przed_czasem': bool(powod) and powod != _KONIEC_KART,
+            }, lewy))
+        return wynik
+
+
+class ZapisZbioru:
+    """Otwiera (albo tworzy) zbiór do dopisywania. Metadane - liczby wierszy i przeczytane bajty źródeł -
+    zapisuje dopiero `zamknij`, więc przerwane wczytywanie nie psuje zbioru: następne zaczyna od tego samego miejsca."""
+    def __init__(self, katalog: str = KATALOG):
+        self.katalog = katalog
+        os.makedirs(katalog, exist_ok=True)
+        self.meta = {'wersja': WERSJA, 'rozdania': 0, 'lewy': 0, 'mecze': 0, 'zrodla': {}, 'ziarna': []}
+        sciezka_meta = os.path.join(katalog, 'meta.json')
+        if os.path.exists(sciezka_meta):
+            with open(sciezka_meta, encoding='utf-8') as f: self.meta = json.load(f)
+            if self.meta['wersja'] != WERSJA:
+                raise ValueError(f"Nieobsługiwana wersja zbioru: {self.meta['wersja']}")
+        self.rozdania = _Tabela(os.path.join(katalog, 'rozdania'), KOLUMNY_ROZDAN, self.meta['rozdania'])
+        self.lewy = _Tabela(os.path.join(katalog, 'lewy'), KOLUMNY_LEW, self.meta['lewy'])
+        self._ziarna: OrderedDict[int, int] = OrderedDict(self.meta['ziarna']) # ziarno meczu z logu serwera -> numer meczu
+        self.pominiete = 0 # Zapisy meczu z logu serwera, których nie dało się odtworzyć (w tym uruchomieniu)
+
+    def __enter__(self) -> 'ZapisZbioru': return self
+    def __exit__(self, *wyjatek): self.zamknij()
+
+    def nowy_mecz(self) -> int:
+        self.meta['mecze'] += 1
+        return self.meta['mecze'] - 1
+
+    def dodaj_rozdanie(self, mecz: int, wiersz: dict, lewy: list[tuple]) -> int:
+        """Dopisuje rozdanie (format eksport_rozdania) i jego lewy; zwraca numer wiersza rozdania."""
+        numer = self.rozdania.liczba_wierszy
+        self.rozdania.dodaj(tuple(mecz if nazwa == 'mecz' else wiersz[nazwa] for nazwa in KOLUMNY_ROZDAN))
+        for lewa in lewy: self.lewy.dodaj((numer, *lewa))
+        return numer
+
+    def _mecz_z_ziarna(self, ziarno: int) -> int:
+        if ziarno in self._ziarna:
+            self._ziarna.move_to_end(ziarno)
+        else:
+            self._ziarna[ziarno] = self.nowy_mecz()
+            if len(self._ziarna) > PAMIETANE_MECZE: self._ziarna.popitem(last=False)
+        return self._ziarna[ziarno]
+
+    def wczytaj_plik(self, sciezka: str) -> int:
+        """Dopisuje rozdania z logu od miejsca, w którym skończyło poprzednie wczytywanie; zwraca ich liczbę."""
+        klucz, przed = os.path.abspath(sciezka), self.rozdania.liczba_wierszy
+        poczatek = self.meta['zrodla'].get(klucz, 0)
+        if os.path.getsize(sciezka) < poczatek: poczatek = 0 # Plik nadpisany od nowa
+        parser = _ParserLogu()
+        with open(sciezka, 'rb') as f:
+            f.seek(poczatek)
+            pozycja = bezpieczna = poczatek
+            for surowa in f:
+                if not surowa.endswith(b'\n'): break # Niedokończona linia - poczekamy, aż log ją dopisze
+                pozycja += len(surowa)
+                tekst = surowa.decode('utf-8', errors='replace').rstrip('\r\n')
+                if m := _R_ZAPIS.search(tekst):
+                    try:
+                        # Mecz bez ziarna (ziarno=None) albo zapis, którego silnik nie odtworzy, liczymy jako pominięty
+                        mecz = Powtorka(int(m[1]), bytes.fromhex(m[2])).mecz_po()
+                    except ValueError:
+                        self.pominiete += 1
+                        mecz = None
+                    if mecz and mecz.rozdanie.rozdanie_zakonczone:
+                        self.dodaj_rozdanie(self._mecz_z_ziarna(int(m[1])), *eksport_rozdania(mecz.rozdanie, mecz.numer_rozdania))
+                    if not parser.w_meczu: bezpieczna = pozycja
+                    continue
+                if _R_PARTIA.search(tekst):
+                    if parser.linia(tekst): self._dodaj_mecz(parser)
+                    parser.nowy_mecz()
+                    bezpieczna = pozycja - len(surowa) # Nowy mecz - wznowienie od jego pierwszej linii
+                elif parser.linia(tekst):
+                    self._dodaj_mecz(parser)
+                    bezpieczna = pozycja
+        self.meta['zrodla'][klucz] = bezpieczna
+        return self.rozdania.liczba_wierszy - przed
+
+    def _dodaj_mecz(self, parser: _ParserLogu):
+        mecz = self.nowy_mecz()
+        for wiersz, lewy in parser.wiersze(): self.dodaj_rozdanie(mecz, wiersz, lewy)
+        parser.rozdania = []
+
+    def zamknij(self):
+        self.rozdania.zamknij(); self.lewy.zamknij()
+        self.meta.update(rozdania=self.rozdania.liczba_wierszy, lewy=self.lewy.liczba_wierszy, ziarna=list(self._ziarna.items()),
+                         pominiete=self.meta.get('pominiete', 0) + self.pominiete)
+        self.pominiete = 0
+        tymczasowy = os.path.join(self.katalog, 'meta.json.tmp')
+        with open(tymczasowy, 'w', encoding='utf-8') as f: json.dump(self.meta, f, ensure_ascii=False, indent=1)
+        os.replace(tymczasowy, os.path.join(self.katalog, 'meta.json'))
+
+
+def _wartosc_warunku(kolumna: str, wartosc):
+    if isinstance(wartosc, Enum): return wartosc.value
+    if isinstance(wartosc, str) and kolumna in _SLOWNIKI: return _SLOWNIKI[kolumna][wartosc].value
+    return wartosc
+
+def _odkoduj(kolumna: str, wartosc: int):
+    if kolumna in _SLOWNIKI: return _SLOWNIKI[kolumna](wartosc).name if wartosc else None
+    return int(wartosc)
+
+
+class ZbiorRozdan:
+    """Zbiór do zapytań: kolumny czytane leniwie jako tablice mapowane z dysku (mmap).
+
+    Warunki to nazwy kolumn rozdań z wartością (liczba, Enum albo jego nazwa) lub listą dopuszczalnych wartości,
+    np. `zbior.agreguj(['mnoznik_lufy'], kontrakt='BEZ_PYTANIA', liczba_lew=1)`.
+    """
+    def __init__(self, katalog: str = KATALOG):
+        self.katalog = katalog
+        with open(os.path.join(katalog, 'meta.json'), encoding='utf-8') as f: self.meta = json.load(f)
+        self._kolumny: dict[tuple[str, str], np.ndarray] = {}
+
+    def __len__(self) -> int: return self.meta['rozdania']
+
+    def kolumna(self, nazwa: str, tabela: str = 'rozdania') -> np.ndarray:
+        if (tabela, nazwa) not in self._kolumny:
+            if self.meta[tabela] == 0: # Pustej tablicy nie da się zmapować
+                self._kolumny[tabela, nazwa] = np.zeros(0, dtype=(KOLUMNY_ROZDAN if tabela == 'rozdania' else KOLUMNY_LEW)[nazwa])
+            else:
+                self._kolumny[tabela, nazwa] = np.load(os.path.join(self.katalog, tabela, f'{nazwa}.npy'), mmap_mode='r')[:self.meta[tabela]]
+        return self._kolumny[tabela, nazwa]
+
+    def maska(self, **warunki) -> np.ndarray:
+        """Maska rozdań spełniających wszystkie warunki."""
+        maska = np.ones(len(self), dtype=bool)
+        for nazwa, wartosc in warunki.items():
+            if isinstance(wartosc, (list, tuple, set)):
+                maska &= np.isin(self.kolumna(nazwa), [_wartosc_warunku(nazwa, w) for w in wartosc])
+            else:
+                maska &= self.kolumna(nazwa) == _wartosc_warunku(nazwa, wartosc)
+        return maska
+
+    def lewy(self, **warunki) -> dict[str, np.ndarray]:
+        """Kolumny lew z rozdań spełniających warunki."""
+        wybrane = self.maska(**warunki)[self.kolumna('rozdanie', 'lewy')]
+        return {nazwa: np.asarray(self.kolumna(nazwa, 'lewy'))[wybrane] for nazwa in KOLUMNY_LEW}
+
+    def agreguj(self, grupuj: Sequence[str] = ('kontrakt',), **warunki) -> list[dict]:
+        """Grupy rozdań: liczba, wygrane grającego (z tych, gdzie wiadomo, kto grał) i średnie punkty meczowe."""
+        maska = self.maska(**warunki)
+        if not maska.any(): return []
+        klucze = np.stack([np.asarray(self.kolumna(nazwa))[maska].astype(np.int64) for nazwa in grupuj], axis=1) if grupuj else np.zeros((int(maska.sum()), 0), dtype=np.int64)
+        grupy, numery = np.unique(klucze, axis=0, return_inverse=True)
+        numery = numery.reshape(-1)
+        wygrana = np.asarray(self.kolumna('wygrana_grajacego'))[maska]
+        liczba = np.bincount(numery, minlength=len(grupy))
+        znane = np.bincount(numery, weights=wygrana != NIEZNANE, minlength=len(grupy))
+        wygrane = np.bincount(numery, weights=wygrana == 1, minlength=len(grupy))
+        punkty = np.bincount(numery, weights=np.asarray(self.kolumna('punkty_meczowe'))[maska], minlength=len(grupy))
+        return [{**{nazwa: _odkoduj(nazwa, wartosc) for nazwa, wartosc in zip(grupuj, grupa)},
+                 'rozdania': int(liczba[i]), 'wygrane_grajacego': int(wygrane[i]),
+                 'odsetek_wygranych': float(wygrane[i] / znane[i]) if znane[i] else None,
+                 'punkty_meczowe': float(punkty[i] / liczba[i])}
+                for i, grupa in enumerate(grupy)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kolumnowy zbiór danych o rozdaniach z logów gry.")
+    parser.add_argument("--katalog", default=KATALOG, help="katalog zbioru")
+    polecenia = parser.add_subparsers(dest="polecenie", required=True)
+    wczytaj = polecenia.add_parser("wczytaj", help="dopisuje do zbioru nowe rozdania z logów")
+    wczytaj.add_argument("pliki", nargs='+', help="gra.log (zapisy meczów) albo log z uruchom_test.py")
+    raport = polecenia.add_parser("raport", help="agregaty rozdań")
+    raport.add_argument("--grupuj", nargs='*', default=['kontrakt'], choices=list(KOLUMNY_ROZDAN), help="kolumny grupowania")
+    for nazwa in ('kontrakt', 'atut'):
+        raport.add_argument(f"--{nazwa}", nargs='+', choices=[e.name for e in _SLOWNIKI[nazwa]])
+    for nazwa in ('mnoznik_lufy', 'liczba_lew', 'wygrana_grajacego', 'przed_czasem'):
+        raport.add_argument(f"--{nazwa.replace('_', '-')}", nargs='+', type=int)
+    args = parser.parse_args()
+
+    if args.polecenie == "wczytaj":
+        with ZapisZbioru(args.katalog) as zbior:
+            for sciezka in args.pliki:
+                pominiete = zbior.pominiete
+                print(f"{sciezka}: {zbior.wczytaj_plik(sciezka)} nowych rozdań, {zbior.pominiete - pominiete} pominiętych zapisów meczu")
+        print(f"✅ Zbiór {args.katalog}: {zbior.rozdania.liczba_wierszy} rozdań, {zbior.lewy.liczba_wierszy} lew, "
+              f"{zbior.meta['pominiete']} pominiętych zapisów meczu")
+    else:
+        warunki = {nazwa: getattr(args, nazwa) for nazwa in ('kontrakt', 'atut', 'mnoznik_lufy', 'liczba_lew', 'wygrana_grajacego', 'przed_czasem')
+                   if getattr(args, nazwa) is not None}
+        for grupa in ZbiorRozdan(args.katalog).agreguj(args.grupuj, **warunki):
+            odsetek = '-' if grupa['odsetek_wygranych'] is None else f"{grupa['odsetek_wygranych']:.1%}"
+            klucz = ", ".join(f"{nazwa}={grupa[nazwa]}" for nazwa in args.grupuj) or "wszystkie"
+            print(f"{klucz:<45} rozdań: {grupa['rozdania']:>7}  wygrane grającego: {odsetek:>6}  pkt meczowe: {grupa['punkty_meczowe']:.2f}")
@@ -0,0 +1,132 @@
+"""Metryki serwera w formacie tekstowym Prometheusa i próbkujący profiler - bez dodatkowych zależności.
+
+Histogramy liczą czasy w sekundach z jedną etykietą (np. endpoint albo etap), wskaźniki odczytują
+wartość w chwili pobrania metryk. `tekst_prometheusa` składa wszystko w odpowiedź dla /metryki.
+"""
+import sys
+import time
+import threading
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+GRANICE_S = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _etykieta(wartosc: str) -> str:
+    return wartosc.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Histogram:
+    """Histogram czasów z jedną etykietą; `mierz(wartosc)` mierzy blok kodu."""
+    def __init__(self, nazwa: str, opis: str, etykieta: str, granice: tuple[float, ...] = GRANICE_S):
+        self.nazwa, self.opis, self.etykieta, self.granice = nazwa, opis, etykieta, granice
+        self._dane: dict[str, list] = {} # wartość etykiety -> [kubełki..., +Inf, suma]
+        self._blokada = threading.Lock()
+
+    def obserwuj(self, wartosc_etykiety: str, czas_s: float):
+        kubelek = bisect_left(self.granice, czas_s)
+        with self._blokada:
+            dane = self._dane.get(wartosc_etykiety)
+            if dane is None:
+                dane = self._dane[wartosc_etykiety] = [0] * (len(self.granice) + 1) + [0.0]
+            dane[kubelek] += 1
+            dane[-1] += czas_s
+
+    @contextmanager
+    def mierz(self, wartosc_etykiety: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.obserwuj(wartosc_etykiety, time.perf_counter() - start)
+
+    def linie(self) -> list[str]:
+        linie = [f"# HELP {self.nazwa} {self.opis}", f"# TYPE {self.nazwa} histogram"]
+        with self._blokada:
+            dane = {w: list(d) for w, d in self._dane.items()}
+        for wartosc, d in sorted(dane.items()):
+            etykieta = f'{self.etykieta}="{_etykieta(wartosc)}"'
+            narastajaco = 0
+            for granica, liczba in zip((*map(repr, self.granice), '+Inf'), d):
+                narastajaco += liczba
+                linie.append(f'{self.nazwa}_bucket{{{etykieta},le="{granica}"}} {narastajaco}')
+            linie.append(f'{self.nazwa}_sum{{{etykieta}}} {d[-1]!r}')
+            linie.append(f'{self.nazwa}_count{{{etykieta}}} {narastajaco}')
+        return linie
+
+class Wskaznik:
+    """Wartość chwilowa (gauge) odczytywana funkcją przy każdym pobraniu metryk."""
+    def __init__(self, nazwa: str, opis: str, odczyt: Callable[[], float]):
+        self.nazwa, self.opis, self.odczyt = nazwa, opis, odczyt
+
+    def linie(self) -> list[str]:
+        return [f"# HELP {self.nazwa} {self.opis}", f"# TYPE {self.nazwa} gauge", f"{self.nazwa} {self.odczyt()}"]
+
+def tekst_prometheusa(metryki: list) -> str:
+    return "\n".join(linia for m in metryki for linia in m.linie()) + "\n"
+
+@contextmanager
+def zajmij(blokada: threading.Lock, histogram: Histogram, miejsce: str) -> Iterator[None]:
+    """`with blokada`, który zapisuje do histogramu czas oczekiwania na jej zajęcie."""
+    start = time.perf_counter()
+    blokada.acquire()
+    histogram.obserwuj(miejsce, time.perf_counter() - start)
+    try:
+        yield
+    finally:
+        blokada.release()
+
+
+class Profiler:
+    """Próbkujący profiler: co `interwal_s` zapisuje stosy wszystkich wątków.
+
+    Wynik jest w formacie "collapsed" (ramki od korzenia rozdzielone `;` i liczba próbek), który czytają
+    flamegraph.pl i speedscope. Koszt to jeden wątek budzony co `interwal_s`, tylko gdy profiler działa.
+    """
+    def __init__(self, interwal_s: float = 0.005, maks_glebokosc: int = 64):
+        self.interwal_s, self.maks_glebokosc = interwal_s, maks_glebokosc
+        self.stosy: Counter = Counter()
+        self.probki = 0
+        self._blokada = threading.Lock() # Próbki dopisuje wątek profilera, wynik czyta wątek zapytania
+        self._stop = threading.Event()
+        self._watek = None
+
+    @property
+    def wlaczony(self) -> bool:
+        return self._watek is not None
+
+    def wlacz(self):
+        if self._watek: return
+        with self._blokada:
+            self.stosy.clear(); self.probki = 0
+        self._stop.clear()
+        self._watek = threading.Thread(target=self._probkuj, name="profiler", daemon=True)
+        self._watek.start()
+
+    def wylacz(self):
+        if not self._watek: return
+        self._stop.set()
+        self._watek.join()
+        self._watek = None
+
+    def _probkuj(self):
+        wlasny = threading.get_ident()
+        while not self._stop.wait(self.interwal_s):
+            probka = []
+            for id_watku, ramka in sys._current_frames().items():
+                if id_watku == wlasny: continue
+                stos = []
+                while ramka is not None and len(stos) < self.maks_glebokosc:
+                    kod = ramka.f_code
+                    stos.append(f"{kod.co_name} ({kod.co_filename.rsplit('/', 1)[-1]}:{ramka.f_lineno})")
+                    ramka = ramka.f_back
+                probka.append(";".join(reversed(stos)))
+            with self._blokada:
+                self.stosy.update(probka)
+                self.probki += 1
+
+    def wynik(self, limit: int = 500) -> str:
+        with self._blokada:
+            najczestsze = self.stosy.most_common(limit)
+        return "\n".join(f"{stos} {liczba}" for stos, liczba in najczestsze) + "\n"
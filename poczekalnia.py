@@ -0,0 +1,84 @@
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+# --- KONFIGURACJA ---
+LUDZI_NA_STOL = 4        # Stół startuje od razu, gdy tylu ludzi czeka
+CZEKANIE_NA_STOL_S = 30  # Po tym czasie najdłużej czekający siada z tymi, którzy są, a resztę miejsc zajmuje komputer
+KOLEJNOSC_MIEJSC = (0, 1, 2, 3) # Miejsca dla kolejnych ludzi ze stołu: przy dwóch osobach grają przeciwko sobie
+
+
+class Poczekalnia:
+    """Kolejka ludzi czekających na stół wieloosobowy (bezpieczna wątkowo).
+
+    `dobierz_stoly` zdejmuje z kolejki grupy gotowe do gry: pełne stoły od razu, a niepełne, gdy pierwszy
+    z czekających czeka dłużej niż `czekanie_s`. Tworzenie meczu dla grupy należy do serwera.
+    Z `sciezka_bazy` kolejka jest w SQLite i wspólna dla wszystkich procesów serwera.
+    """
+    def __init__(self, ludzi_na_stol: int = LUDZI_NA_STOL, czekanie_s: float = CZEKANIE_NA_STOL_S,
+                 sciezka_bazy: Optional[str] = None):
+        self.ludzi_na_stol = ludzi_na_stol
+        self.czekanie_s = czekanie_s
+        self._kolejka: OrderedDict[str, tuple[str, float]] = OrderedDict() # gracz -> (nazwa, od kiedy czeka)
+        self._blokada = threading.Lock()
+        self._baza: Optional[sqlite3.Connection] = None
+        if sciezka_bazy:
+            # isolation_level=None: transakcje otwieramy sami (BEGIN IMMEDIATE przy zdejmowaniu grup)
+            self._baza = sqlite3.connect(sciezka_bazy, check_same_thread=False, timeout=10, isolation_level=None)
+            self._baza.execute("PRAGMA journal_mode=WAL")
+            self._baza.execute("CREATE TABLE IF NOT EXISTS poczekalnia (gracz TEXT PRIMARY KEY, nazwa TEXT NOT NULL, od REAL NOT NULL)")
+
+    def _czekajacy(self) -> list[tuple[str, str, float]]:
+        if self._baza is None:
+            return [(gracz, nazwa, od) for gracz, (nazwa, od) in self._kolejka.items()]
+        return self._baza.execute("SELECT gracz, nazwa, od FROM poczekalnia ORDER BY od, rowid").fetchall()
+
+    def __len__(self) -> int:
+        with self._blokada:
+            return len(self._czekajacy()) if self._baza is not None else len(self._kolejka)
+
+    def dolacz(self, gracz: str, nazwa: str):
+        with self._blokada:
+            # Czas ścienny, a nie monotoniczny - porównują go różne procesy
+            if self._baza is not None:
+                self._baza.execute("INSERT OR IGNORE INTO poczekalnia (gracz, nazwa, od) VALUES (?, ?, ?)", (gracz, nazwa, time.time()))
+            elif gracz not in self._kolejka:
+                self._kolejka[gracz] = (nazwa, time.time())
+
+    def opusc(self, gracz: str):
+        with self._blokada:
+            if self._baza is not None:
+                self._baza.execute("DELETE FROM poczekalnia WHERE gracz = ?", (gracz,))
+            else:
+                self._kolejka.pop(gracz, None)
+
+    def pozycja(self, gracz: str) -> Optional[int]:
+        """Miejsce w kolejce liczone od 1 albo None, jeśli gracz nie czeka."""
+        with self._blokada:
+            for nr, (czekajacy, _, _) in enumerate(self._czekajacy(), start=1):
+                if czekajacy == gracz: return nr
+            return None
+
+    def dobierz_stoly(self) -> list[list[tuple[str, str]]]:
+        """Grupy (gracz, nazwa) gotowe do posadzenia przy stołach, w kolejności dołączenia."""
+        grupy = []
+        with self._blokada:
+            # Ten sam czekający nie może trafić do stołów tworzonych przez dwa procesy naraz
+            if self._baza is not None: self._baza.execute("BEGIN IMMEDIATE")
+            try:
+                czekajacy = self._czekajacy()
+                while czekajacy:
+                    if len(czekajacy) < self.ludzi_na_stol and time.time() - czekajacy[0][2] < self.czekanie_s:
+                        break
+                    grupa, czekajacy = czekajacy[:self.ludzi_na_stol], czekajacy[self.ludzi_na_stol:]
+                    grupy.append([(gracz, nazwa) for gracz, nazwa, _ in grupa])
+                zdjeci = [gracz for grupa in grupy for gracz, _ in grupa]
+                if self._baza is not None:
+                    self._baza.executemany("DELETE FROM poczekalnia WHERE gracz = ?", [(g,) for g in zdjeci])
+                else:
+                    for gracz in zdjeci: del self._kolejka[gracz]
+            finally:
+                if self._baza is not None: self._baza.execute("COMMIT")
+        return grupy
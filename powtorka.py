@@ -0,0 +1,67 @@
+"""Deterministyczne powtórki meczów z ziarna i zapisu ruchów.
+
+Talie meczu tasuje random.Random(ziarno), więc ziarno wyznacza wszystkie rozdania, a ruchy
+(bajty z zapis_binarny.ruchy_meczu) - przebieg gry. Powtórka pozwala zbudować stan meczu po
+dowolnej liczbie ruchów, np. żeby odtworzyć zgłoszone rozdanie albo sprawdzić zmianę zasad
+na identycznym wejściu.
+
+Użycie z linii poleceń:
+    python powtorka.py --ziarno 123 --ruchy 1f5a... [--do 40]
+"""
+import sys
+import argparse
+from typing import Optional
+from silnik_gry import Mecz
+from zapis_binarny import ruchy_meczu, wykonaj_ruch
+
+DOMYSLNE_NAZWY = ["Ty", "Lewy", "Partner", "Prawy"]
+
+
+class Powtorka:
+    """Ziarno i ruchy meczu; `mecz_po(n)` przewija nowy mecz do stanu po n ruchach (bez logowania)."""
+    def __init__(self, ziarno: int, ruchy: bytes, nazwy_graczy: Optional[list[str]] = None):
+        self.ziarno = ziarno
+        self.ruchy = bytes(ruchy)
+        self.nazwy_graczy = nazwy_graczy or DOMYSLNE_NAZWY
+
+    @classmethod
+    def z_meczu(cls, mecz: Mecz) -> 'Powtorka':
+        if mecz.ziarno is None:
+            raise ValueError("Mecz bez ziarna nie da się powtórzyć")
+        return cls(mecz.ziarno, ruchy_meczu(mecz), [g.nazwa for g in mecz.gracze])
+
+    def __len__(self) -> int:
+        return len(self.ruchy)
+
+    def mecz_po(self, liczba_ruchow: Optional[int] = None) -> Mecz:
+        """Stan meczu po `liczba_ruchow` ruchach (domyślnie po wszystkich). Rozdania rozliczane są jak w app.py."""
+        mecz = Mecz(nazwy_graczy=self.nazwy_graczy, ziarno=self.ziarno)
+        mecz.rozpocznij_mecz()
+        for ruch in self.ruchy[:liczba_ruchow]:
+            rozdanie = mecz.rozdanie
+            if rozdanie.rozdanie_zakonczone:
+                rozdanie.rozlicz_rozdanie()
+                mecz.sprawdz_koniec_meczu()
+                if mecz.zwyciezca_meczu:
+                    raise ValueError("Zapis zawiera ruchy po końcu meczu")
+                mecz.przygotuj_nastepne_rozdanie()
+                rozdanie = mecz.rozdanie
+            rozdanie.logowanie = False
+            wykonaj_ruch(rozdanie, ruch)
+        mecz.rozdanie.logowanie = True
+        return mecz
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Odtwarza mecz 66 z ziarna i zapisu ruchów.")
+    parser.add_argument("--ziarno", type=int, required=True, help="ziarno meczu (z logu serwera)")
+    parser.add_argument("--ruchy", required=True, help="ruchy meczu zapisane szesnastkowo")
+    parser.add_argument("--do", type=int, default=None, help="po ilu ruchach zatrzymać powtórkę")
+    args = parser.parse_args()
+
+    mecz = Powtorka(args.ziarno, bytes.fromhex(args.ruchy)).mecz_po(args.do)
+    rozdanie = mecz.rozdanie
+    print(f"Wynik meczu: My {mecz.druzyna_a.punkty_meczu} - {mecz.druzyna_b.punkty_meczu} Oni, rozdanie nr {mecz.numer_rozdania}")
+    for gracz in rozdanie.gracze:
+        print(f"  {gracz.nazwa:<10} {', '.join(str(k) for k in gracz.reka)}")
+    print("\n".join(rozdanie.historia_akcji), file=sys.stdout)
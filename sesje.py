@@ -0,0 +1,276 @@
+import time
+import secrets
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+from silnik_gry import Mecz
+from zapis_binarny import zakoduj_mecz, odkoduj_mecz
+
+# --- KONFIGURACJA ---
+TTL_SESJI_S = 2 * 3600            # Po tylu sekundach bez zapytań sesja opuszcza pamięć (migawka zostaje na dysku)
+MAKS_SESJI = 1000                 # Limit meczów w pamięci; po przekroczeniu wypada najdawniej używany
+TTL_MIGAWKI_S = 7 * 24 * 3600     # Starsze migawki są usuwane z bazy
+
+
+@dataclass(eq=False)
+class Sesja:
+    """Mecz jednego stołu z własną blokadą - zapytania z różnych stołów nie czekają na siebie nawzajem.
+
+    `ludzie` to miejsca zajęte przez ludzi (miejsce -> identyfikator gracza z ciasteczka); na pozostałych gra
+    komputer. W grze jednoosobowej identyfikator stołu i jedynego gracza (miejsce 0) są takie same.
+    """
+    mecz: Mecz
+    ludzie: dict[int, str] = field(default_factory=dict)
+    blokada: threading.Lock = field(default_factory=threading.Lock)
+    ostatni_dostep: float = field(default_factory=time.monotonic)
+    zmieniona: bool = True # Czy stan meczu zmienił się od ostatniej migawki
+    # Wersje meczu liczą się od zera po każdym utworzeniu/odtworzeniu sesji; epoka odróżnia je od wersji sprzed restartu
+    epoka: str = field(default_factory=lambda: secrets.token_hex(4))
+    stany: OrderedDict = field(default_factory=OrderedDict) # (wersja meczu, miejsce) -> stan gry wysłany klientom (kilka ostatnich)
+    wersja_bazy: int = -1 # Wersja meczu w ostatnio zapisanej/wczytanej migawce (-1: jeszcze jej nie ma)
+
+    def oznacz_zmiane(self):
+        """Wołać pod blokadą po każdej zmianie meczu: nowa wersja i migawka do zapisu."""
+        self.zmieniona = True
+        self.mecz.wersja += 1
+
+
+class MagazynSesji:
+    """Sesje w pamięci (LRU) z wygaszaniem nieaktywnych i migawkami w SQLite.
+
+    Sesja usunięta z pamięci (po TTL albo przy przekroczeniu `maks_sesji`) jest najpierw zapisywana,
+    a `pobierz` odtwarza ją z migawki - po restarcie serwera albo w innym procesie. Bez `sciezka_bazy`
+    magazyn działa tylko w pamięci.
+
+    `wspoldzielony=True` to tryb wielu procesów serwera na jednej bazie (SQLite w trybie WAL): każdą zmianę
+    meczu zatwierdza od razu `zatwierdz` z optymistyczną kontrolą wersji, a `pobierz` wczytuje migawkę
+    ponownie, gdy inny proces zapisał nowszą wersję. Pamięć procesu jest wtedy tylko podręczną kopią bazy.
+    Migawka (zapis_binarny) niesie ziarno meczu i numer rozdania, więc mecz wczytany w dowolnym procesie
+    tasuje dalej te same talie i da się go powtórzyć (`ruchy_meczu`).
+    """
+    def __init__(self, sciezka_bazy: Optional[str] = None, ttl_s: float = TTL_SESJI_S, maks_sesji: int = MAKS_SESJI,
+                 ttl_migawki_s: float = TTL_MIGAWKI_S, wspoldzielony: bool = False):
+        if wspoldzielony and not sciezka_bazy:
+            raise ValueError("Magazyn współdzielony przez procesy wymaga sciezka_bazy")
+        self.wspoldzielony = wspoldzielony
+        self.ttl_s = ttl_s
+        self.maks_sesji = maks_sesji
+        self.ttl_migawki_s = ttl_migawki_s
+        self._sesje: OrderedDict[str, Sesja] = OrderedDict()
+        self._blokada = threading.Lock() # Chroni słownik sesji i połączenie z bazą, nie stan meczów
+        self._baza: Optional[sqlite3.Connection] = None
+        if sciezka_bazy:
+            self._baza = sqlite3.connect(sciezka_bazy, check_same_thread=False, timeout=10)
+            self._baza.execute("PRAGMA journal_mode=WAL") # Czytelnicy z innych procesów nie czekają na zapis
+            self._baza.execute("PRAGMA synchronous=NORMAL")
+            self._baza.execute("CREATE TABLE IF NOT EXISTS sesje (id TEXT PRIMARY KEY, migawka BLOB NOT NULL, zapisano REAL NOT NULL,"
+                               " wersja INTEGER NOT NULL DEFAULT 0, epoka TEXT)")
+            kolumny = {k[1] for k in self._baza.execute("PRAGMA table_info(sesje)")}
+            if 'wersja' not in kolumny: # Baza sprzed trybu wielu procesów
+                self._baza.execute("ALTER TABLE sesje ADD COLUMN wersja INTEGER NOT NULL DEFAULT 0")
+                self._baza.execute("ALTER TABLE sesje ADD COLUMN epoka TEXT")
+            self._baza.execute("CREATE TABLE IF NOT EXISTS miejsca (gracz TEXT PRIMARY KEY, stol TEXT NOT NULL, miejsce INTEGER NOT NULL)")
+            self._baza.commit()
+        self._miejsca: dict[str, tuple[str, int]] = {} # gracz -> (stół, miejsce) dla stołów w pamięci
+
+    def __len__(self) -> int:
+        return len(self._sesje)
+
+    def pobierz(self, session_id: str) -> Optional[Sesja]:
+        """Sesja z pamięci albo odtworzona z migawki; None, jeśli nie ma jej nigdzie."""
+        with self._blokada:
+            sesja = self._sesje.get(session_id)
+            if sesja is not None and self.wspoldzielony:
+                wiersz = self._baza.execute("SELECT wersja FROM sesje WHERE id = ?", (session_id,)).fetchone()
+                if not wiersz or wiersz[0] != sesja.wersja_bazy:
+                    self._usun_z_pamieci(session_id) # Inny proces zmienił albo usunął mecz
+                    sesja = None
+            if sesja is None and self._baza is not None:
+                wiersz = self._baza.execute("SELECT migawka, wersja, epoka FROM sesje WHERE id = ?", (session_id,)).fetchone()
+                if wiersz:
+                    try:
+                        sesja = Sesja(odkoduj_mecz(wiersz[0]), zmieniona=False, wersja_bazy=wiersz[1])
+                        sesja.mecz.wersja = wiersz[1]
+                        if wiersz[2]: sesja.epoka = wiersz[2] # Ta sama wersja stanu (ETag) we wszystkich procesach
+                    except ValueError:
+                        # Migawka w starym formacie albo uszkodzona - sesja zaczyna się od nowa
+                        self._baza.execute("DELETE FROM sesje WHERE id = ?", (session_id,))
+                        self._baza.commit()
+                    else:
+                        wiersze = self._baza.execute("SELECT miejsce, gracz FROM miejsca WHERE stol = ?", (session_id,)).fetchall()
+                        sesja.ludzie = dict(wiersze) or {0: session_id} # Migawki sprzed stołów wieloosobowych
+                        self._wstaw(session_id, sesja)
+            if sesja is not None:
+                self._sesje.move_to_end(session_id)
+                sesja.ostatni_dostep = time.monotonic()
+            return sesja
+
+    def dodaj(self, session_id: str, sesja: Sesja):
+        with self._blokada:
+            if self.wspoldzielony:
+                # Nowy mecz musi być w bazie, zanim kolejne zapytanie gracza trafi do innego procesu
+                self._baza.execute("INSERT OR REPLACE INTO sesje (id, migawka, zapisano, wersja, epoka) VALUES (?, ?, ?, ?, ?)",
+                                   (session_id, zakoduj_mecz(sesja.mecz), time.time(), sesja.mecz.wersja, sesja.epoka))
+                sesja.wersja_bazy, sesja.zmieniona = sesja.mecz.wersja, False
+            self._wstaw(session_id, sesja)
+            self._zapisz_miejsca(session_id, sesja)
+
+    def zatwierdz(self, session_id: str, sesja: Sesja) -> bool:
+        """W trybie współdzielonym zapisuje zmieniony mecz, jeśli w bazie jest wciąż wersja, od której zaczęliśmy.
+
+        Zwraca False, gdy inny proces zdążył zapisać swoją zmianę - nasza przepada, a sesja wypada z pamięci,
+        więc następne `pobierz` wczyta stan z bazy. Bez trybu współdzielonego migawki zapisuje `porzadkuj`.
+        """
+        if not self.wspoldzielony:
+            return True
+        with sesja.blokada:
+            if sesja.mecz.wersja == sesja.wersja_bazy:
+                return True
+            dane, wersja = zakoduj_mecz(sesja.mecz), sesja.mecz.wersja
+        with self._blokada:
+            if wersja <= sesja.wersja_bazy: # Inny wątek zdążył zapisać nowszy stan tej samej sesji
+                return True
+            zapisano = self._baza.execute("UPDATE sesje SET migawka = ?, wersja = ?, zapisano = ? WHERE id = ? AND wersja = ?",
+                                          (dane, wersja, time.time(), session_id, sesja.wersja_bazy)).rowcount
+            self._baza.commit()
+            if not zapisano:
+                if self._sesje.get(session_id) is sesja: self._usun_z_pamieci(session_id)
+                return False
+            sesja.wersja_bazy = wersja
+            return True
+
+    def nowsze_w_bazie(self, ids: list[str]) -> list[str]:
+        """Sesje z `ids`, których wersji z bazy nie ma w pamięci tego procesu - zapisał ją inny proces (tylko tryb współdzielony)."""
+        if not self.wspoldzielony or not ids:
+            return []
+        with self._blokada:
+            wiersze = self._baza.execute(f"SELECT id, wersja FROM sesje WHERE id IN ({','.join('?' * len(ids))})", ids).fetchall()
+            return [sid for sid, wersja in wiersze if sid not in self._sesje or self._sesje[sid].wersja_bazy != wersja]
+
+    def usun(self, session_id: str):
+        with self._blokada:
+            self._usun_z_pamieci(session_id)
+            if self._baza is not None:
+                self._baza.execute("DELETE FROM sesje WHERE id = ?", (session_id,))
+                self._baza.execute("DELETE FROM miejsca WHERE stol = ?", (session_id,))
+                self._baza.commit()
+
+    def znajdz_miejsce(self, gracz: str) -> Optional[tuple[str, int]]:
+        """(stół, miejsce) gracza o identyfikatorze z ciasteczka albo None, jeśli nie siedzi przy żadnym stole."""
+        with self._blokada:
+            # W trybie współdzielonym gracz mógł zmienić stół przez inny proces - rozstrzyga baza
+            miejsce = None if self.wspoldzielony else self._miejsca.get(gracz)
+            if miejsce is None and self._baza is not None:
+                wiersz = self._baza.execute("SELECT stol, miejsce FROM miejsca WHERE gracz = ?", (gracz,)).fetchone()
+                miejsce = tuple(wiersz) if wiersz else None
+            if miejsce is None and (gracz in self._sesje or self._baza is not None and
+                                    self._baza.execute("SELECT 1 FROM sesje WHERE id = ?", (gracz,)).fetchone()):
+                miejsce = (gracz, 0) # Gra jednoosobowa zapisana przed stołami wieloosobowymi
+            return miejsce
+
+    def zwolnij_miejsce(self, gracz: str):
+        """Gracz odchodzi od stołu: jego miejsce przejmuje komputer, a stół bez ludzi jest usuwany."""
+        miejsce = self.znajdz_miejsce(gracz)
+        sesja = self.pobierz(miejsce[0]) if miejsce else None
+        if sesja is None:
+            return
+        with sesja.blokada:
+            sesja.ludzie.pop(miejsce[1], None)
+            pusty = not sesja.ludzie
+            sesja.oznacz_zmiane() # Inne procesy wczytają stół ponownie, razem z nowym składem ludzi
+        if pusty:
+            self.usun(miejsce[0])
+            return
+        with self._blokada:
+            self._zapisz_miejsca(miejsce[0], sesja)
+        while not self.zatwierdz(miejsce[0], sesja) and (sesja := self.pobierz(miejsce[0])):
+            with sesja.blokada: sesja.oznacz_zmiane()
+
+    def _usun_z_pamieci(self, session_id: str):
+        self._sesje.pop(session_id, None)
+        for gracz, (stol, _) in list(self._miejsca.items()):
+            if stol == session_id: del self._miejsca[gracz]
+
+    def _zapisz_miejsca(self, session_id: str, sesja: Sesja):
+        for gracz, (stol, _) in list(self._miejsca.items()):
+            if stol == session_id: del self._miejsca[gracz]
+        self._miejsca.update((gracz, (session_id, m)) for m, gracz in sesja.ludzie.items())
+        if self._baza is not None:
+            self._baza.execute("DELETE FROM miejsca WHERE stol = ?", (session_id,))
+            self._baza.executemany("INSERT OR REPLACE INTO miejsca (gracz, stol, miejsce) VALUES (?, ?, ?)",
+                                   [(gracz, session_id, m) for m, gracz in sesja.ludzie.items()])
+            self._baza.commit()
+
+    def _wstaw(self, session_id: str, sesja: Sesja):
+        self._sesje[session_id] = sesja
+        self._sesje.move_to_end(session_id)
+        self._miejsca.update((gracz, (session_id, m)) for m, gracz in sesja.ludzie.items())
+        if len(self._sesje) > self.maks_sesji:
+            nadmiar, wypadaja = len(self._sesje) - self.maks_sesji, []
+            for stary_id, stara in self._sesje.items():
+                if len(wypadaja) == nadmiar: break
+                # Trzymamy blokadę magazynu, więc na blokadę sesji nie czekamy: zajęta zostaje w pamięci do następnego razu
+                if stary_id == session_id or not stara.blokada.acquire(blocking=False):
+                    continue
+                try: wypadaja.append((stary_id, stara, self._migawka(stara)))
+                finally: stara.blokada.release()
+            for stary_id, stara, migawka in wypadaja:
+                self._zapisz(stary_id, stara, migawka)
+                del self._sesje[stary_id]
+                for gracz in stara.ludzie.values(): self._miejsca.pop(gracz, None)
+            if self._baza is not None:
+                self._baza.commit()
+
+    def _migawka(self, sesja: Sesja) -> Optional[bytes]:
+        """Wołać pod blokadą sesji: zakodowany mecz do zapisu albo None, jeśli nie ma czego zapisywać."""
+        # W trybie współdzielonym zmiany zapisuje tylko `zatwierdz` - tu nadpisalibyśmy nowszą wersję innego procesu
+        if self._baza is None or self.wspoldzielony or not sesja.zmieniona:
+            return None
+        sesja.zmieniona, sesja.wersja_bazy = False, sesja.mecz.wersja
+        return zakoduj_mecz(sesja.mecz)
+
+    def _migawki(self) -> list[tuple[str, Sesja, Optional[bytes]]]:
+        """Migawki wszystkich sesji w pamięci. Blokady sesji bierzemy bez blokady magazynu - czekanie na ruch
+        przy jednym stole nie wstrzymuje zapytań pozostałych stołów."""
+        with self._blokada:
+            sesje = list(self._sesje.items())
+        migawki = []
+        for sid, sesja in sesje:
+            with sesja.blokada: migawki.append((sid, sesja, self._migawka(sesja)))
+        return migawki
+
+    def _zapisz(self, session_id: str, sesja: Sesja, migawka: Optional[bytes]):
+        """Wołać pod blokadą magazynu (zatwierdza wołający)."""
+        if migawka is not None:
+            self._baza.execute("INSERT OR REPLACE INTO sesje (id, migawka, zapisano, wersja, epoka) VALUES (?, ?, ?, ?, ?)",
+                               (session_id, migawka, time.time(), sesja.wersja_bazy, sesja.epoka))
+
+    def porzadkuj(self) -> int:
+        """Zapisuje zmienione sesje, usuwa z pamięci nieaktywne dłużej niż TTL i stare migawki. Zwraca liczbę wygaszonych."""
+        granica = time.monotonic() - self.ttl_s
+        migawki = self._migawki()
+        with self._blokada:
+            for sid, sesja, migawka in migawki:
+                self._zapisz(sid, sesja, migawka)
+            # Sesja zmieniona już po migawce zostaje w pamięci, żeby nie zgubić zmiany (zapisze ją następne porządkowanie)
+            zapisywane = self._baza is not None and not self.wspoldzielony
+            wygasle = [sid for sid, s, _ in migawki if self._sesje.get(sid) is s and s.ostatni_dostep < granica
+                       and not (zapisywane and s.zmieniona)]
+            for sid in wygasle:
+                for gracz in self._sesje.pop(sid).ludzie.values(): self._miejsca.pop(gracz, None)
+            if self._baza is not None:
+                self._baza.execute("DELETE FROM sesje WHERE zapisano < ?", (time.time() - self.ttl_migawki_s,))
+                self._baza.execute("DELETE FROM miejsca WHERE stol NOT IN (SELECT id FROM sesje)")
+                self._baza.commit()
+        return len(wygasle)
+
+    def zapisz_wszystkie(self):
+        """Migawki wszystkich zmienionych sesji (np. przy zamykaniu serwera)."""
+        migawki = self._migawki()
+        with self._blokada:
+            for sid, sesja, migawka in migawki:
+                self._zapisz(sid, sesja, migawka)
+            if self._baza is not None:
+                self._baza.commit()
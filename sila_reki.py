@@ -0,0 +1,129 @@
+"""Tabela siły rąk do licytacji: szansa wygrania kontraktu dla każdej ręki z 3 i z 6 kart.
+
+Ręce grupujemy z dokładnością do symetrii kolorów: przy kontrakcie z atutem kolor atutowy zostaje na
+miejscu, a pozostałe trzy kolory są wymienne; Gorsza i Lepsza (bez atutu) nie rozróżniają kolorów wcale.
+Klucz klasy to wzorce kolorów (po 6 bitów) - najpierw atut, potem pozostałe malejąco. Dla każdej klasy,
+kontraktu i roli (grający albo przeciwnik po jego lewej) zapisujemy odsetek rozdań wygranych przez drużynę
+grającego, szacowany na silniku wektorowym (losowa rozgrywka, reszta kart rozdana losowo).
+
+Tabelę buduje się raz, równolegle na wielu procesach, i zapisuje jako .npz (szanse w bajtach 0-255);
+boty wczytują ją przy starcie i licytują przez `szansa` - jedno wyszukanie w słowniku zamiast symulacji.
+
+Użycie:
+    python sila_reki.py --proby 256 --procesy 8    # zapisuje sila_reki.npz
+"""
+import os
+import time
+import argparse
+import itertools
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from silnik_gry import Kontrakt, Kolor, KARTY
+from silnik_wektorowy import PartieWektorowe
+
+# --- KONFIGURACJA ---
+PLIK_TABELI = 'sila_reki.npz'
+PROBY_NA_KLASE = 256        # Rozdania na (klasę ręki, kontrakt, rolę); błąd standardowy szansy <= 3 pkt. proc.
+KLASY_NA_ZADANIE = 256      # Tyle klas ręki symuluje jeden worker w ramach jednego zadania
+
+KONTRAKTY_Z_ATUTEM = (Kontrakt.NORMALNA, Kontrakt.BEZ_PYTANIA)
+KONTRAKTY_BEZ_ATUTU = (Kontrakt.GORSZA, Kontrakt.LEPSZA)
+GRAJACY, PRZECIWNIK = 0, 1  # Role: miejsce ręki względem grającego (0) w symulacji
+_KONTRAKTY = {k: (True, nr) for nr, k in enumerate(KONTRAKTY_Z_ATUTEM)} | {k: (False, nr) for nr, k in enumerate(KONTRAKTY_BEZ_ATUTU)}
+
+
+def klucz_reki(maska: int, atut_idx: Optional[int]) -> int:
+    """Klucz klasy ręki: wzorzec koloru atutowego, a po nim pozostałe wzorce malejąco (bez atutu - wszystkie)."""
+    wzorce = [maska >> (6 * k) & 0b111111 for k in range(4)]
+    if atut_idx is None:
+        a, b, c, d = sorted(wzorce, reverse=True)
+    else:
+        a = wzorce.pop(atut_idx)
+        b, c, d = sorted(wzorce, reverse=True)
+    return a << 18 | b << 12 | c << 6 | d
+
+def _maska_klucza(klucz: int) -> int:
+    """Ręka reprezentująca klasę: wzorce klucza kolejno w kolorach 0..3 (atut w kolorze 0)."""
+    return (klucz >> 18 & 0b111111) | (klucz >> 12 & 0b111111) << 6 | (klucz >> 6 & 0b111111) << 12 | (klucz & 0b111111) << 18
+
+def klucze_klas(liczba_kart: int, z_atutem: bool) -> np.ndarray:
+    """Posortowane klucze wszystkich klas rąk z `liczba_kart` kart."""
+    klucze = {klucz_reki(sum(1 << i for i in karty), 0 if z_atutem else None)
+              for karty in itertools.combinations(range(len(KARTY)), liczba_kart)}
+    return np.array(sorted(klucze), dtype=np.int32)
+
+
+def _symuluj_zadanie(zadanie: tuple[int, np.ndarray, bool, int]) -> np.ndarray:
+    """Kod workera: szanse (klasa, kontrakt, rola) w bajtach dla paczki kluczy."""
+    ziarno, klucze, z_atutem, proby = zadanie
+    rng = np.random.default_rng(ziarno)
+    znane = np.repeat(np.array([_maska_klucza(int(k)) for k in klucze], dtype=np.int64), proby)
+    kontrakty = KONTRAKTY_Z_ATUTEM if z_atutem else KONTRAKTY_BEZ_ATUTU
+    szanse = np.empty((len(klucze), len(kontrakty), 2), dtype=np.uint8)
+    for nr, kontrakt in enumerate(kontrakty):
+        for rola in (GRAJACY, PRZECIWNIK):
+            partie = PartieWektorowe.dobrane(znane, rola, kontrakt, Kolor(1) if z_atutem else None, 0, rng).rozegraj()
+            wygrane = (partie.wyniki()[0] == 0).reshape(len(klucze), proby).mean(axis=1)
+            szanse[:, nr, rola] = np.rint(wygrane * 255)
+    return szanse
+
+
+class TabelaSily:
+    """Wczytana tabela: `szansa` zwraca szansę drużyny grającego w O(1)."""
+    def __init__(self, tablice: dict[str, np.ndarray]):
+        self.tablice = tablice
+        # (liczba kart, z atutem) -> (klucz -> wiersz, szanse)
+        self._tabele = {}
+        for liczba_kart in (3, 6):
+            for z_atutem, nazwa in ((True, 'atut'), (False, 'bez')):
+                klucze = tablice[f'klucze_{liczba_kart}_{nazwa}']
+                self._tabele[liczba_kart, z_atutem] = (dict(zip(klucze.tolist(), range(len(klucze)))), tablice[f'szanse_{liczba_kart}_{nazwa}'])
+
+    @classmethod
+    def wczytaj(cls, sciezka: str = PLIK_TABELI) -> 'TabelaSily':
+        with np.load(sciezka) as dane:
+            return cls({nazwa: dane[nazwa] for nazwa in dane.files})
+
+    def zapisz(self, sciezka: str = PLIK_TABELI):
+        np.savez_compressed(sciezka, **self.tablice)
+
+    def szansa(self, reka_maska: int, kontrakt: Kontrakt, atut: Optional[Kolor], rola: int = GRAJACY) -> float:
+        """Szansa wygrania `kontrakt` przez drużynę grającego, gdy ręka z 3 albo 6 kart należy do gracza w `rola`."""
+        z_atutem, nr = _KONTRAKTY[kontrakt]
+        wiersze, szanse = self._tabele[reka_maska.bit_count(), z_atutem]
+        klucz = klucz_reki(reka_maska, atut.value - 1 if z_atutem else None)
+        return szanse[wiersze[klucz], nr, rola] / 255
+
+
+def zbuduj_tabele(proby: int = PROBY_NA_KLASE, liczba_procesow: Optional[int] = None, ziarno: int = 0) -> TabelaSily:
+    """Symuluje wszystkie klasy rąk na puli procesów; wynik zależy tylko od argumentów (ziarno na zadanie)."""
+    tablice, zadania, miejsca = {}, [], []
+    for liczba_kart in (3, 6):
+        for z_atutem, nazwa in ((True, 'atut'), (False, 'bez')):
+            klucze = klucze_klas(liczba_kart, z_atutem)
+            tablice[f'klucze_{liczba_kart}_{nazwa}'] = klucze
+            for poczatek in range(0, len(klucze), KLASY_NA_ZADANIE):
+                zadania.append((ziarno * 1_000_003 + len(zadania), klucze[poczatek:poczatek + KLASY_NA_ZADANIE], z_atutem, proby))
+                miejsca.append(f'szanse_{liczba_kart}_{nazwa}')
+    with ProcessPoolExecutor(max_workers=liczba_procesow) as pula:
+        wyniki = list(pula.map(_symuluj_zadanie, zadania))
+    for nazwa in set(miejsca):
+        tablice[nazwa] = np.concatenate([w for w, m in zip(wyniki, miejsca) if m == nazwa])
+    tablice['proby'] = np.array(proby)
+    return TabelaSily(tablice)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Buduje tabelę siły rąk do licytacji (symulacja na silniku wektorowym).")
+    parser.add_argument("--proby", type=int, default=PROBY_NA_KLASE, help="rozdania na klasę ręki, kontrakt i rolę")
+    parser.add_argument("--procesy", type=int, default=os.cpu_count(), help="liczba procesów w puli")
+    parser.add_argument("--ziarno", type=int, default=0, help="ziarno bazowe generatora losowego")
+    parser.add_argument("--plik", default=PLIK_TABELI, help="ścieżka pliku wynikowego (.npz)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    tabela = zbuduj_tabele(args.proby, args.procesy, args.ziarno)
+    tabela.zapisz(args.plik)
+    klasy = sum(len(v) for k, v in tabela.tablice.items() if k.startswith('klucze'))
+    print(f"✅ Zapisano {args.plik}: {klasy} klas rąk, {args.proby} rozdań na wpis, {time.perf_counter() - start:.0f} s")
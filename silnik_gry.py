@@ -1,5 +1,7 @@
 import random
 import logging
+import itertools
+from collections.abc import Mapping
 from enum import Enum, auto
 from dataclasses import dataclass, field
 from typing import Union, Optional
@@ -14,32 +16,120 @@ class Ranga(Enum):
 
 WARTOSCI_KART = { Ranga.AS: 11, Ranga.DZIESIATKA: 10, Ranga.KROL: 4, Ranga.DAMA: 3, Ranga.WALET: 2, Ranga.DZIEWIATKA: 0 }
 
-@dataclass(frozen=True)
 class Karta:
-    ranga: Ranga
-    kolor: Kolor
-    @property
-    def wartosc(self) -> int: return WARTOSCI_KART[self.ranga]
-    def __str__(self) -> str: return f"{self.ranga.name.capitalize()} {self.kolor.name.capitalize()}"
-    @property
-    def nazwa_pliku(self) -> str: return f"{self.ranga.name.capitalize()}{self.kolor.name.capitalize()}.png"
+    """Jedna z 24 kart. Karty są internowane i niezmienne: Karta(ranga, kolor) zwraca obiekt z KARTY,
+    a wartość, nazwa, plik obrazka, indeks bitu i klucz sortowania są policzone raz przy imporcie."""
+    __slots__ = ('ranga', 'kolor', 'indeks', 'wartosc', 'nazwa', 'nazwa_pliku', 'klucz_sortowania')
+
+    def __new__(cls, ranga: Ranga, kolor: Kolor) -> 'Karta':
+        return KARTY[(kolor.value - 1) * 6 + ranga.value - 1]
+    @classmethod
+    def _utworz(cls, ranga: Ranga, kolor: Kolor) -> 'Karta':
+        karta = object.__new__(cls)
+        nazwa_rangi, nazwa_koloru = ranga.name.capitalize(), kolor.name.capitalize()
+        for pole, wartosc in (('ranga', ranga), ('kolor', kolor), ('indeks', (kolor.value - 1) * 6 + ranga.value - 1),
+                              ('wartosc', WARTOSCI_KART[ranga]), ('nazwa', f"{nazwa_rangi} {nazwa_koloru}"),
+                              ('nazwa_pliku', f"{nazwa_rangi}{nazwa_koloru}.png"),
+                              ('klucz_sortowania', (kolor.name, ranga.value))): # Kolejność na ręce w interfejsie
+            object.__setattr__(karta, pole, wartosc)
+        return karta
+    def __setattr__(self, pole, wartosc): raise AttributeError("Karta jest niezmienna")
+    def __str__(self) -> str: return self.nazwa
+    def __repr__(self) -> str: return f"Karta(ranga={self.ranga!r}, kolor={self.kolor!r})"
+    def __hash__(self) -> int: return self.indeks
+    def __reduce__(self): return (_karta_z_indeksu, (self.indeks,)) # Kopia i pickle zwracają tę samą kartę
+
+def _karta_z_indeksu(indeks: int) -> Karta: return KARTY[indeks]
+
+# --- Reprezentacja bitowa ---
+# Karta to indeks 0..23 (kolor * 6 + ranga), a ręka, lewa i stos wziętych kart to 24-bitowe maski.
+# W obrębie koloru bity rosną razem z siłą karty, więc "najwyższa karta" to po prostu najstarszy bit.
+KARTY: tuple[Karta, ...] = tuple(Karta._utworz(r, k) for k in Kolor for r in Ranga)
+# Odwrotne indeksy: nazwa wyświetlana ("As Wino") -> karta oraz karty w kolejności wyświetlania na ręce
+KARTY_PO_NAZWIE: dict[str, Karta] = {k.nazwa: k for k in KARTY}
+KARTY_DO_WYSWIETLENIA: tuple[Karta, ...] = tuple(sorted(KARTY, key=lambda k: k.klucz_sortowania))
+PELNA_TALIA = (1 << len(KARTY)) - 1
+MASKI_KOLOROW: dict[Kolor, int] = {k: 0b111111 << (6 * (k.value - 1)) for k in Kolor}
+MASKA_KOLORU_KARTY: tuple[int, ...] = tuple(MASKI_KOLOROW[k.kolor] for k in KARTY)
+# Indeks drugiej karty pary meldunkowej (Król <-> Dama tego samego koloru)
+PARA_MELDUNKOWA: dict[int, int] = {k.indeks: Karta(Ranga.DAMA if k.ranga == Ranga.KROL else Ranga.KROL, k.kolor).indeks for k in KARTY if k.ranga in (Ranga.KROL, Ranga.DAMA)}
+WARTOSCI_INDEKSOW: tuple[int, ...] = tuple(k.wartosc for k in KARTY)
+_PUNKTY_KOLORU: tuple[int, ...] = tuple(sum(WARTOSCI_KART[r] for r in Ranga if m >> (r.value - 1) & 1) for m in range(64))
+
+# --- Tablica legalnych ruchów ---
+# Zasady dokładania (do koloru, przebicie, atut, przebicie atutem) zależą tylko od najwyższej karty
+# w kolorze wiodącym, najwyższego atutu na stole i koloru atutowego. Dla każdej takiej sytuacji
+# trzymamy łańcuch masek: legalne = pierwsza niepusta z (ręka & maska), a jeśli wszystkie puste - cała ręka.
+BRAK_ATUTU = len(Kolor)
+
+def _wzorzec_legalnych(najwyzsza_wiodaca: int, najwyzszy_atut: Optional[int], atut_idx: int) -> tuple[int, int, int, int]:
+    maska_wiodaca = MASKA_KOLORU_KARTY[najwyzsza_wiodaca]
+    wyzsze_wiodace = maska_wiodaca >> (najwyzsza_wiodaca + 1) << (najwyzsza_wiodaca + 1)
+    if atut_idx == BRAK_ATUTU:
+        return (wyzsze_wiodace, maska_wiodaca, 0, 0)
+    maska_atutu = 0b111111 << (6 * atut_idx)
+    wyzsze_atuty = maska_atutu if najwyzszy_atut is None else maska_atutu >> (najwyzszy_atut + 1) << (najwyzszy_atut + 1)
+    return (wyzsze_wiodace, maska_wiodaca, wyzsze_atuty, maska_atutu)
+
+def indeks_wzorca_legalnych(najwyzsza_wiodaca: int, najwyzszy_atut: Optional[int], atut_idx: int) -> int:
+    return ((atut_idx * 25) + (0 if najwyzszy_atut is None else najwyzszy_atut + 1)) * 24 + najwyzsza_wiodaca
+
+WZORCE_LEGALNYCH: list[Optional[tuple[int, int, int, int]]] = [None] * ((BRAK_ATUTU + 1) * 25 * 24)
+for _atut_idx in range(BRAK_ATUTU + 1):
+    _mozliwe_atuty = [None] if _atut_idx == BRAK_ATUTU else [None] + list(range(6 * _atut_idx, 6 * _atut_idx + 6))
+    for _najwyzszy_atut in _mozliwe_atuty:
+        for _najwyzsza_wiodaca in range(len(KARTY)):
+            WZORCE_LEGALNYCH[indeks_wzorca_legalnych(_najwyzsza_wiodaca, _najwyzszy_atut, _atut_idx)] = _wzorzec_legalnych(_najwyzsza_wiodaca, _najwyzszy_atut, _atut_idx)
+
+def punkty_maski(maska: int) -> int:
+    """Suma wartości kart w masce (cztery odczyty z tablicy, po jednym na kolor)."""
+    return _PUNKTY_KOLORU[maska & 63] + _PUNKTY_KOLORU[maska >> 6 & 63] + _PUNKTY_KOLORU[maska >> 12 & 63] + _PUNKTY_KOLORU[maska >> 18 & 63]
+
+def maska_kart(karty) -> int:
+    maska = 0
+    for karta in karty: maska |= 1 << karta.indeks
+    return maska
+
+def karty_z_maski(maska: int) -> list[Karta]:
+    karty = []
+    while maska:
+        najnizszy_bit = maska & -maska
+        karty.append(KARTY[najnizszy_bit.bit_length() - 1])
+        maska ^= najnizszy_bit
+    return karty
+
+def losowa_karta_z_maski(maska: int, rng=random) -> int:
+    """Indeks losowo wybranej karty z (niepustej) maski, bez budowania listy."""
+    for _ in range(rng.randrange(maska.bit_count())):
+        maska &= maska - 1
+    return (maska & -maska).bit_length() - 1
 
 class Talia:
-    def __init__(self):
-        self.karty = [Karta(r, k) for k in Kolor for r in Ranga]
-        self.tasuj()
-    def tasuj(self): random.shuffle(self.karty)
-    def rozdaj_karte(self) -> Optional['Karta']: return self.karty.pop() if self.karty else None
-
-@dataclass
+    # Karty zostają na liście; rozdawanie przesuwa tylko licznik, więc da się je cofnąć.
+    def __init__(self, rng=random):
+        self.karty = list(KARTY)
+        self.pozostale = len(self.karty)
+        self.tasuj(rng)
+    def tasuj(self, rng=random): rng.shuffle(self.karty)
+    def rozdaj_karte(self) -> Optional['Karta']:
+        if not self.pozostale: return None
+        self.pozostale -= 1
+        return self.karty[self.pozostale]
+    def __len__(self) -> int: return self.pozostale
+
+@dataclass(eq=False)
 class Gracz:
     nazwa: str
-    reka: list[Karta] = field(default_factory=list)
     druzyna: Optional['Druzyna'] = None
-    wygrane_karty: list[Karta] = field(default_factory=list)
+    reka_maska: int = 0
+    wygrane_maska: int = 0
+    @property
+    def reka(self) -> list[Karta]: return karty_z_maski(self.reka_maska)
+    @property
+    def wygrane_karty(self) -> list[Karta]: return karty_z_maski(self.wygrane_maska)
     def __str__(self) -> str: return self.nazwa
 
-@dataclass
+@dataclass(eq=False)
 class Druzyna:
     nazwa: str
     gracze: list[Gracz] = field(default_factory=list)
@@ -58,24 +148,124 @@ class FazaGry(Enum):
 
 STAWKI_KONTRAKTOW = { Kontrakt.NORMALNA: 1, Kontrakt.BEZ_PYTANIA: 6, Kontrakt.GORSZA: 6, Kontrakt.LEPSZA: 12 }
 
+class Akcja(Mapping):
+    """Akcja licytacji: niezmienna i internowana - każda istnieje raz w AKCJE_LICYTACJI, a `kod` to jej pozycja.
+
+    Czyta się ją jak słownik ({'typ': ..., 'kontrakt': ..., 'atut': ...} - tylko obecne klucze), więc
+    akcja['typ'] i akcja.get('atut') działają jak dawniej. Równość to tożsamość: akcja nie jest równa nawet
+    słownikowi o tych samych polach - słownik zamienia się na akcję przez `akcja(...)` albo `kod_akcji`.
+    """
+    __slots__ = ('typ', 'kontrakt', 'atut', 'kod', '_pola')
+
+    def __init__(self, kod: int, typ: str, **pola):
+        for nazwa, wartosc in (('typ', typ), ('kontrakt', pola.get('kontrakt')), ('atut', pola.get('atut')), ('kod', kod), ('_pola', {'typ': typ, **pola})):
+            object.__setattr__(self, nazwa, wartosc)
+    def __setattr__(self, nazwa, wartosc): raise AttributeError("Akcja jest niezmienna")
+    def __getitem__(self, klucz): return self._pola[klucz]
+    def __iter__(self): return iter(self._pola)
+    def __len__(self) -> int: return len(self._pola)
+    def __hash__(self) -> int: return self.kod
+    def __eq__(self, inna): return self is inna
+    def __ne__(self, inna): return self is not inna
+    def __repr__(self) -> str: return repr(self._pola)
+    def __reduce__(self): return (_akcja_z_kodu, (self.kod,)) # Kopia i pickle zwracają tę samą akcję
+
+# Wszystkie możliwe akcje licytacji w stałej kolejności; pozycja akcji to jej kod (np. w zapisie binarnym)
+AKCJE_LICYTACJI: tuple[Akcja, ...] = tuple(Akcja(kod, **pola) for kod, pola in enumerate((
+    *({'typ': 'deklaracja', 'kontrakt': k, 'atut': c} for k in (Kontrakt.NORMALNA, Kontrakt.BEZ_PYTANIA) for c in Kolor),
+    *({'typ': 'deklaracja', 'kontrakt': k, 'atut': None} for k in (Kontrakt.GORSZA, Kontrakt.LEPSZA)),
+    *({'typ': 'zmiana_kontraktu', 'kontrakt': k} for k in (Kontrakt.LEPSZA, Kontrakt.GORSZA, Kontrakt.BEZ_PYTANIA)),
+    *({'typ': 'przebicie', 'kontrakt': k} for k in (Kontrakt.LEPSZA, Kontrakt.GORSZA)),
+    {'typ': 'pytanie'}, {'typ': 'pas'}, {'typ': 'lufa'}, {'typ': 'kontra'}, {'typ': 'pas_lufa'},
+)))
+_KODY_AKCJI = {(a.typ, a.kontrakt, a.atut): a.kod for a in AKCJE_LICYTACJI}
+
+def _akcja_z_kodu(kod: int) -> Akcja: return AKCJE_LICYTACJI[kod]
+
+def akcja(typ: str, kontrakt: Optional[Kontrakt] = None, atut: Optional[Kolor] = None) -> Akcja:
+    """Internowana akcja o podanych polach (KeyError dla akcji, której nie ma w grze)."""
+    return AKCJE_LICYTACJI[_KODY_AKCJI[(typ, kontrakt, atut)]]
+
+def kod_akcji(akcja: Mapping) -> int:
+    if type(akcja) is Akcja: return akcja.kod
+    return _KODY_AKCJI[(akcja['typ'], akcja.get('kontrakt'), akcja.get('atut'))]
+
+# Rodzaje wpisów na stosie cofania (pierwsze pole krotki)
+WPIS_KARTA, WPIS_AKCJA = 0, 1
+
+# Rodzaje zdarzeń w dzienniku rozdania. Zdarzenie to krotka liczb (rodzaj, miejsce gracza, a, b):
+#   ZD_AKCJA (kod akcji, 0), ZD_KONTRAKT (kontrakt, atut albo 0), ZD_KONIEC_LICYTACJI, ZD_PRZEBICIE (kontrakt, 0),
+#   ZD_BEZ_PRZEBICIA, ZD_MELDUNEK (kolor, punkty), ZD_KARTA (indeks karty, 0), ZD_LEWA (punkty, 0)
+ZD_AKCJA, ZD_KONTRAKT, ZD_KONIEC_LICYTACJI, ZD_PRZEBICIE, ZD_BEZ_PRZEBICIA, ZD_MELDUNEK, ZD_KARTA, ZD_LEWA = range(8)
+
+def ruchy_z_dziennika(dziennik: list[tuple[int, int, int, int]]) -> bytearray:
+    """Same ruchy (karty i akcje licytacji) z dziennika rozdania, po bajcie na ruch `miejsce << 6 | kod`."""
+    ruchy = bytearray()
+    for rodzaj, miejsce, a, _ in dziennik:
+        if rodzaj == ZD_KARTA: ruchy.append(miejsce << 6 | a)
+        elif rodzaj == ZD_AKCJA: ruchy.append(miejsce << 6 | len(KARTY) + a)
+    return ruchy
+
+def _opis_akcji(akcja: dict) -> str:
+    opis = akcja['typ'].upper()
+    if 'kontrakt' in akcja: opis += f" {akcja['kontrakt'].name}"
+    if 'atut' in akcja and akcja['atut']: opis += f" w {akcja['atut'].name}"
+    return opis
+
+OPISY_AKCJI: tuple[str, ...] = tuple(_opis_akcji(a) for a in AKCJE_LICYTACJI)
+
+# Rola gracza w licytacji względem grającego (część klucza tablic legalnych akcji i przejść)
+ROLA_BRAK, ROLA_GRAJACY, ROLA_PARTNER, ROLA_PRZECIWNIK = range(4)
+
+def _legalne_akcje(faza: FazaGry, rola: int, lufa_mozliwa: bool, po_podbiciu_druzyny: bool) -> tuple[Akcja, ...]:
+    """Reguły licytacji: akcje gracza, na którego przypada tura, w kolejności pokazywanej graczom."""
+    if faza == FazaGry.DEKLARACJA_1 and rola == ROLA_BRAK:
+        return AKCJE_LICYTACJI[:10]
+    if faza == FazaGry.LUFA and rola in (ROLA_GRAJACY, ROLA_PRZECIWNIK): # Partner grającego nigdy nie bierze udziału w lufie
+        if po_podbiciu_druzyny or not lufa_mozliwa:
+            return (akcja('pas_lufa'),)
+        return (akcja('kontra' if rola == ROLA_GRAJACY else 'lufa'), akcja('pas_lufa'))
+    if faza == FazaGry.FAZA_PYTANIA and rola == ROLA_GRAJACY:
+        return (*(akcja('zmiana_kontraktu', k) for k in (Kontrakt.LEPSZA, Kontrakt.GORSZA, Kontrakt.BEZ_PYTANIA)), akcja('pytanie'))
+    if faza == FazaGry.LICYTACJA and rola == ROLA_PRZECIWNIK: # Przeciwnicy mogą przebić, spasować lub dać lufę
+        return (akcja('pas'), akcja('przebicie', Kontrakt.LEPSZA), akcja('przebicie', Kontrakt.GORSZA), *((akcja('lufa'),) if lufa_mozliwa else ()))
+    if faza == FazaGry.LICYTACJA and rola != ROLA_BRAK: # Drużyna grającego może tylko spasować
+        return (akcja('pas'),)
+    return ()
+
+# (faza, rola, lufa możliwa, po podbiciu własnej drużyny) -> krotka akcji; _LEGALNE_KODY to te same zbiory jako maski kodów
+LEGALNE_AKCJE: dict[tuple[FazaGry, int, bool, bool], tuple[Akcja, ...]] = {
+    klucz: _legalne_akcje(*klucz) for klucz in itertools.product(FazaGry, range(4), (False, True), (False, True))}
+_LEGALNE_KODY: dict[tuple[FazaGry, int, bool, bool], int] = {
+    klucz: sum(1 << a.kod for a in akcje) for klucz, akcje in LEGALNE_AKCJE.items()}
+
 class Rozdanie:
-    def __init__(self, gracze: list[Gracz], druzyny: list[Druzyna], rozdajacy_idx: int):
+    def __init__(self, gracze: list[Gracz], druzyny: list[Druzyna], rozdajacy_idx: int, rng=random):
         self.gracze = gracze
         for gracz in self.gracze:
-            gracz.reka.clear()
-            gracz.wygrane_karty.clear()
+            gracz.reka_maska = 0
+            gracz.wygrane_maska = 0
         self.druzyny = druzyny; self.rozdajacy_idx = rozdajacy_idx
-        self.talia = Talia(); self.kontrakt: Optional[Kontrakt] = None; self.grajacy: Optional[Gracz] = None
-        self.atut: Optional[Kolor] = None; self.mnoznik_lufy: int = 1; self.czy_byla_lufa: bool = False
+        self.talia = Talia(rng); self.kontrakt: Optional[Kontrakt] = None; self.grajacy: Optional[Gracz] = None
+        self.atut: Optional[Kolor] = None; self.maska_atutu: int = 0; self.atut_idx: int = BRAK_ATUTU; self.mnoznik_lufy: int = 1; self.czy_byla_lufa: bool = False
         self.punkty_w_rozdaniu = {d.nazwa: 0 for d in druzyny}; self.kolej_gracza_idx: Optional[int] = None
-        self.aktualna_lewa: list[tuple[Gracz, Karta]] = []; self.zadeklarowane_meldunki: list[tuple[Gracz, Kolor]] = []
+        self.aktualna_lewa: list[tuple[Gracz, Karta]] = []; self.lewa_maska: int = 0; self.wzorzec_lewy: Optional[tuple[int, int, int, int]] = None; self.zadeklarowane_meldunki: list[tuple[Gracz, Kolor]] = []
         self.rozdanie_zakonczone: bool = False; self.powod_zakonczenia: str = ""
         self.zwyciezca_rozdania: Optional[Druzyna] = None; self.zwyciezca_ostatniej_lewy: Optional[Gracz] = None
         self.faza: FazaGry = FazaGry.PRZED_ROZDANIEM
-        self.historia_licytacji: list[tuple[Gracz, dict]] = []; self.historia_akcji: list[str] = []
-        self.pasujacy_gracze: list[Gracz] = []; self.oferty_przebicia: list[tuple[Gracz, dict]] = []
+        self.historia_licytacji: list[tuple[Gracz, Akcja]] = []
+        # Dziennik zdarzeń (krotki ZD_*); teksty dla API i logów powstają dopiero w historia_akcji
+        self.dziennik: list[tuple[int, int, int, int]] = []; self.miejsca = {g: i for i, g in enumerate(gracze)}
+        self.pasujacy_gracze: list[Gracz] = []; self.oferty_przebicia: list[tuple[Gracz, Akcja]] = []
         self.nieaktywny_gracz: Optional[Gracz] = None; self.liczba_aktywnych_graczy = 4; self.numer_lewy = 0
         self.ostatni_podbijajacy: Optional[Gracz] = None
+        # Stan lewy aktualizowany przy każdej zagranej karcie (bez przeglądania stołu na końcu lewy)
+        self.najwyzsza_wiodaca: int = -1; self.najwyzszy_atut: Optional[int] = None
+        self.prowadzacy_w_lewie: Optional[Gracz] = None; self.punkty_w_lewie: int = 0
+        self.wziete_lewy = {d.nazwa: False for d in druzyny}
+        # Każdy ruch odkłada tu płaską krotkę ze stanem sprzed ruchu (patrz cofnij_karte/cofnij_akcje)
+        self.stos_cofania: list[tuple] = []
+        self.logowanie: bool = True # Boty wyłączają je na czas przeszukiwania; wpisy powstają też tylko przy poziomie INFO
 
     def _nastepna_tura(self):
         if self.kolej_gracza_idx is None: return
@@ -103,9 +293,12 @@ class Rozdanie:
         if self.kontrakt in [Kontrakt.LEPSZA, Kontrakt.GORSZA]:
             self.atut, self.liczba_aktywnych_graczy = None, 3
             self.nieaktywny_gracz = next(p for p in self.grajacy.druzyna.gracze if p != self.grajacy)
-        atut_str = f"w {self.atut.name.capitalize()}" if self.atut else "bez atu"
-        logger.info(f"  * [KONTRAKT] {self.grajacy.nazwa} gra {self.kontrakt.name} ({atut_str})")
-        self.historia_akcji.append(f"INFO:{self.grajacy.nazwa} gra {self.kontrakt.name} ({atut_str})")
+        self.maska_atutu = MASKI_KOLOROW[self.atut] if self.atut else 0
+        self.atut_idx = self.atut.value - 1 if self.atut else BRAK_ATUTU
+        self.dziennik.append((ZD_KONTRAKT, self.miejsca[self.grajacy], self.kontrakt.value, self.atut.value if self.atut else 0))
+        if self.logowanie and logger.isEnabledFor(logging.INFO):
+            atut_str = f"w {self.atut.name.capitalize()}" if self.atut else "bez atu"
+            logger.info("  * [KONTRAKT] %s gra %s (%s)", self.grajacy.nazwa, self.kontrakt.name, atut_str)
 
     def _oblicz_limit_stawki(self) -> int:
         punkty_a, punkty_b = self.druzyny[0].punkty_meczu, self.druzyny[1].punkty_meczu
@@ -118,225 +311,124 @@ class Rozdanie:
     def rozpocznij_nowe_rozdanie(self):
         self.rozdaj_karty(3); self.faza = FazaGry.DEKLARACJA_1; self.kolej_gracza_idx = (self.rozdajacy_idx + 1) % 4
 
-    def get_mozliwe_akcje(self, gracz: Gracz) -> list[dict]:
-        if gracz != self.gracze[self.kolej_gracza_idx]: return []
-
-        if self.faza == FazaGry.LUFA:
-            is_partner_of_declarer = self.grajacy and gracz.druzyna == self.grajacy.druzyna and gracz != self.grajacy
-            if is_partner_of_declarer:
-                return [] # Partner grającego nigdy nie bierze udziału w lufie
-            if self.ostatni_podbijajacy and gracz.druzyna == self.ostatni_podbijajacy.druzyna:
-                return [{'typ': 'pas_lufa'}]
-            akcja_podbicia = {'typ': 'kontra'} if gracz == self.grajacy else {'typ': 'lufa'}
-            if self._czy_lufa_mozliwa():
-                return [akcja_podbicia, {'typ': 'pas_lufa'}]
-            else:
-                return [{'typ': 'pas_lufa'}]
-
-        if self.faza == FazaGry.DEKLARACJA_1:
-            akcje = [{'typ': 'deklaracja', 'kontrakt': k, 'atut': c} for k in [Kontrakt.NORMALNA, Kontrakt.BEZ_PYTANIA] for c in Kolor]
-            akcje.extend([{'typ': 'deklaracja', 'kontrakt': k, 'atut': None} for k in [Kontrakt.GORSZA, Kontrakt.LEPSZA]])
-            return akcje
+    def _rola(self, gracz: Gracz) -> int:
+        if self.grajacy is None: return ROLA_BRAK
+        if gracz is self.grajacy: return ROLA_GRAJACY
+        return ROLA_PARTNER if gracz.druzyna is self.grajacy.druzyna else ROLA_PRZECIWNIK
 
-        if self.faza == FazaGry.FAZA_PYTANIA:
-            return [{'typ': 'zmiana_kontraktu', 'kontrakt': k} for k in [Kontrakt.LEPSZA, Kontrakt.GORSZA, Kontrakt.BEZ_PYTANIA]] + [{'typ': 'pytanie'}]
+    def _klucz_licytacji(self, gracz: Gracz) -> tuple[FazaGry, int, bool, bool]:
+        po_podbiciu = self.ostatni_podbijajacy is not None and gracz.druzyna is self.ostatni_podbijajacy.druzyna
+        return self.faza, self._rola(gracz), self._czy_lufa_mozliwa(), po_podbiciu
 
-        if self.faza == FazaGry.LICYTACJA:
-            is_opponent = self.grajacy and gracz.druzyna != self.grajacy.druzyna
-            if not is_opponent: # Partner grającego może tylko spasować
-                return [{'typ': 'pas'}]
-            else: # Przeciwnicy mogą przebić, spasować lub dać lufę
-                akcje = [{'typ': 'pas'}, {'typ': 'przebicie', 'kontrakt': Kontrakt.LEPSZA}, {'typ': 'przebicie', 'kontrakt': Kontrakt.GORSZA}]
-                if self._czy_lufa_mozliwa():
-                    akcje.append({'typ': 'lufa'})
-                return akcje
-
-        return []
+    def get_mozliwe_akcje(self, gracz: Gracz) -> tuple[Akcja, ...]:
+        if self.kolej_gracza_idx is None or gracz is not self.gracze[self.kolej_gracza_idx]: return ()
+        return LEGALNE_AKCJE[self._klucz_licytacji(gracz)]
 
     def _zakoncz_licytacje(self):
         self.faza = FazaGry.ROZGRYWKA
         self.kolej_gracza_idx = self.gracze.index(self.grajacy)
-        if len(self.gracze[0].reka) < 6:
+        if self.gracze[0].reka_maska.bit_count() < 6:
             self.rozdaj_karty(3)
-        logger.info("  - [LICYTACJA] Licytacja zakończona, początek rozgrywki.")
-        self.historia_akcji.append("INFO:Licytacja zakończona")
-
-    # ✅ === POCZĄTEK ZMIANY: Całkowicie nowa logika fazy LUFA ===
-    def wykonaj_akcje(self, gracz: Gracz, akcja: dict):
+        if self.logowanie and logger.isEnabledFor(logging.INFO): logger.info("  - [LICYTACJA] Licytacja zakończona, początek rozgrywki.")
+        self.dziennik.append((ZD_KONIEC_LICYTACJI, 0, 0, 0))
+
+    def wykonaj_akcje(self, gracz: Gracz, akcja: Mapping):
+        kod = kod_akcji(akcja)
+        legalna = self.kolej_gracza_idx is not None and gracz is self.gracze[self.kolej_gracza_idx] and _LEGALNE_KODY[self._klucz_licytacji(gracz)] >> kod & 1
+        if not legalna:
+            logger.warning("NIELEGALNA AKCJA ODRZUCONA: %s próbuje %s w fazie %s", gracz.nazwa, OPISY_AKCJI[kod], self.faza.name)
+            return
+        akcja = AKCJE_LICYTACJI[kod]
+        self.stos_cofania.append((WPIS_AKCJA, self.faza, self.kolej_gracza_idx, self.grajacy, self.kontrakt, self.atut, self.maska_atutu, self.atut_idx,
+                                  self.nieaktywny_gracz, self.liczba_aktywnych_graczy, self.mnoznik_lufy, self.czy_byla_lufa, self.ostatni_podbijajacy,
+                                  tuple(self.pasujacy_gracze), len(self.oferty_przebicia), len(self.historia_licytacji), len(self.dziennik), self.talia.pozostale))
         self.historia_licytacji.append((gracz, akcja))
-        opis_akcji = akcja['typ'].upper()
-        if 'kontrakt' in akcja: opis_akcji += f" {akcja['kontrakt'].name}"
-        if 'atut' in akcja and akcja['atut']: opis_akcji += f" w {akcja['atut'].name}"
-        logger.info(f"    [AKCJA] {gracz.nazwa}: {opis_akcji}")
-        self.historia_akcji.append(f"INFO:{gracz.nazwa}:{opis_akcji}")
-
-        if self.faza == FazaGry.DEKLARACJA_1 and akcja['typ'] == 'deklaracja':
-            self._ustaw_kontrakt(gracz, akcja['kontrakt'], akcja.get('atut'))
-            self.faza = FazaGry.LUFA
-            self.kolej_gracza_idx = self.gracze.index(self.grajacy)
-            self._nastepna_tura()
+        self.dziennik.append((ZD_AKCJA, self.miejsca[gracz], kod, 0))
+        if self.logowanie and logger.isEnabledFor(logging.INFO): logger.info("    [AKCJA] %s: %s", gracz.nazwa, OPISY_AKCJI[kod])
+        PRZEJSCIA_LICYTACJI[self.faza, akcja.typ, self._rola(gracz)](self, gracz, akcja)
+
+    # --- Przejścia licytacji (wywoływane przez wykonaj_akcje według PRZEJSCIA_LICYTACJI) ---
+    def _deklaruj(self, gracz: Gracz, akcja: Akcja):
+        self._ustaw_kontrakt(gracz, akcja.kontrakt, akcja.atut)
+        self.faza = FazaGry.LUFA
+        self.kolej_gracza_idx = self.gracze.index(self.grajacy)
+        self._nastepna_tura()
+
+    def _podbij(self, gracz: Gracz):
+        self.mnoznik_lufy *= 2
+        self.czy_byla_lufa = True
+        self.ostatni_podbijajacy = gracz
+        self.pasujacy_gracze.clear()
+
+    def _kontra(self, gracz: Gracz, akcja: Akcja):
+        # Grający dał 'kontrę', tura wraca do aktywnego przeciwnika
+        self._podbij(gracz)
+        przeciwnik = next(p for p in gracz.druzyna.przeciwnicy.gracze if p != self.nieaktywny_gracz and p not in self.pasujacy_gracze)
+        self.kolej_gracza_idx = self.gracze.index(przeciwnik)
+
+    def _lufa(self, gracz: Gracz, akcja: Akcja):
+        # Przeciwnik dał 'lufę', tura ZAWSZE wraca do grającego
+        self._podbij(gracz)
+        self.kolej_gracza_idx = self.gracze.index(self.grajacy)
 
-        # ✅ === POCZĄTEK ZMIANY: Poprawiona logika przekazywania tury po lufie/kontrze ===
-        elif self.faza == FazaGry.LUFA:
-            if akcja['typ'] in ['lufa', 'kontra']:
-                self.mnoznik_lufy *= 2
-                self.czy_byla_lufa = True
-                self.ostatni_podbijajacy = gracz
-                self.pasujacy_gracze.clear()
-                
-                if gracz == self.grajacy:
-                    # Grający dał 'kontrę', tura wraca do aktywnego przeciwnika
-                    przeciwnik = next(p for p in gracz.druzyna.przeciwnicy.gracze if p != self.nieaktywny_gracz and p not in self.pasujacy_gracze)
-                    self.kolej_gracza_idx = self.gracze.index(przeciwnik)
-                else:
-                    # Przeciwnik dał 'lufę', tura ZAWSZE wraca do grającego
-                    self.kolej_gracza_idx = self.gracze.index(self.grajacy)
-                return
-
-            elif akcja['typ'] == 'pas_lufa':
-                self.pasujacy_gracze.append(gracz)
-                
-                przeciwnicy_grajacego = [p for p in self.grajacy.druzyna.przeciwnicy.gracze if p != self.nieaktywny_gracz]
-                if len(self.gracze[0].reka) < 6 and all(p in self.pasujacy_gracze for p in przeciwnicy_grajacego):
-                    logger.info("  - [LICYTACJA] Koniec pierwszej tury lufy, dobieranie kart.")
-                    self.rozdaj_karty(3)
-                    if self.czy_byla_lufa or self.kontrakt != Kontrakt.NORMALNA:
-                        self._zakoncz_licytacje()
-                    else:
-                        self.faza = FazaGry.FAZA_PYTANIA
-                        self.kolej_gracza_idx = self.gracze.index(self.grajacy)
-                    return
-
-                if self.ostatni_podbijajacy:
-                    druzyna_odpowiadajaca = self.ostatni_podbijajacy.druzyna.przeciwnicy
-                    if gracz.druzyna == druzyna_odpowiadajaca:
-                        logger.info(f"  - [LICYTACJA] {gracz.nazwa} pasuje, kończąc lufę.")
-                        self._zakoncz_licytacje()
-                    else:
-                        self._nastepna_tura()
-                else:
-                    self._nastepna_tura()
-        # ✅ === KONIEC ZMIANY ===
-
-        elif self.faza == FazaGry.FAZA_PYTANIA:
-            if akcja['typ'] == 'zmiana_kontraktu':
-                self._ustaw_kontrakt(self.grajacy, akcja['kontrakt'], self.atut)
-                self.faza = FazaGry.LUFA
-                self.ostatni_podbijajacy = self.grajacy
-                self.kolej_gracza_idx = self.gracze.index(self.grajacy)
-                self._nastepna_tura()
-            elif akcja['typ'] == 'pytanie':
-                self.faza = FazaGry.LICYTACJA
-                self.kolej_gracza_idx = self.gracze.index(self.grajacy)
-                self._nastepna_tura()
+    def _pas_lufa(self, gracz: Gracz, akcja: Akcja):
+        self.pasujacy_gracze.append(gracz)
 
-        elif self.faza == FazaGry.LICYTACJA:
-            if akcja['typ'] == 'lufa':
-                self.czy_byla_lufa = True; self.mnoznik_lufy *= 2; self.faza = FazaGry.LUFA
-                self.ostatni_podbijajacy = gracz
-                self.kolej_gracza_idx = self.gracze.index(self.grajacy)
-                return
-            if akcja['typ'] == 'pas':
-                self.pasujacy_gracze.append(gracz)
-            elif akcja['typ'] == 'przebicie':
-                self.oferty_przebicia.append((gracz, akcja))
-            if len(self.pasujacy_gracze) + len(self.oferty_przebicia) >= 3:
-                self._rozstrzygnij_licytacje_2()
+        przeciwnicy_grajacego = [p for p in self.grajacy.druzyna.przeciwnicy.gracze if p != self.nieaktywny_gracz]
+        if self.gracze[0].reka_maska.bit_count() < 6 and all(p in self.pasujacy_gracze for p in przeciwnicy_grajacego):
+            if self.logowanie and logger.isEnabledFor(logging.INFO): logger.info("  - [LICYTACJA] Koniec pierwszej tury lufy, dobieranie kart.")
+            self.rozdaj_karty(3)
+            if self.czy_byla_lufa or self.kontrakt != Kontrakt.NORMALNA:
+                self._zakoncz_licytacje()
             else:
-                self._nastepna_tura()
-
-        elif self.faza == FazaGry.FAZA_PYTANIA:
-            if akcja['typ'] == 'zmiana_kontraktu':
-                self._ustaw_kontrakt(self.grajacy, akcja['kontrakt'], self.atut)
-                self.faza = FazaGry.LUFA
-                self.ostatni_podbijajacy = self.grajacy
-                self.kolej_gracza_idx = self.gracze.index(self.grajacy)
-                self._nastepna_tura()
-            elif akcja['typ'] == 'pytanie':
-                self.faza = FazaGry.LICYTACJA
+                self.faza = FazaGry.FAZA_PYTANIA
                 self.kolej_gracza_idx = self.gracze.index(self.grajacy)
-                self._nastepna_tura()
+            return
 
-        elif self.faza == FazaGry.LICYTACJA:
-            if akcja['typ'] == 'lufa':
-                self.czy_byla_lufa = True; self.mnoznik_lufy *= 2; self.faza = FazaGry.LUFA
-                self.ostatni_podbijajacy = gracz
-                self.kolej_gracza_idx = self.gracze.index(self.grajacy)
-                return
-            if akcja['typ'] == 'pas':
-                self.pasujacy_gracze.append(gracz)
-            elif akcja['typ'] == 'przebicie':
-                self.oferty_przebicia.append((gracz, akcja))
-            if len(self.pasujacy_gracze) + len(self.oferty_przebicia) >= 3:
-                self._rozstrzygnij_licytacje_2()
-            else:
-                self._nastepna_tura()
+        if self.ostatni_podbijajacy and gracz.druzyna == self.ostatni_podbijajacy.druzyna.przeciwnicy:
+            if self.logowanie and logger.isEnabledFor(logging.INFO): logger.info("  - [LICYTACJA] %s pasuje, kończąc lufę.", gracz.nazwa)
+            self._zakoncz_licytacje()
+        else:
+            self._nastepna_tura()
 
-        elif self.faza == FazaGry.FAZA_PYTANIA:
-            if akcja['typ'] == 'zmiana_kontraktu':
-                self._ustaw_kontrakt(self.grajacy, akcja['kontrakt'], self.atut)
-                self.faza = FazaGry.LUFA
-                self.ostatni_podbijajacy = self.grajacy
-                self.kolej_gracza_idx = self.gracze.index(self.grajacy)
-                self._nastepna_tura()
-            elif akcja['typ'] == 'pytanie':
-                self.faza = FazaGry.LICYTACJA
-                self.kolej_gracza_idx = self.gracze.index(self.grajacy)
-                self._nastepna_tura()
-
-        elif self.faza == FazaGry.LICYTACJA:
-            if akcja['typ'] == 'lufa':
-                self.czy_byla_lufa = True; self.mnoznik_lufy *= 2; self.faza = FazaGry.LUFA
-                self.ostatni_podbijajacy = gracz
-                self.kolej_gracza_idx = self.gracze.index(self.grajacy) # Tura wraca do grającego
-                return
-            if akcja['typ'] == 'pas':
-                self.pasujacy_gracze.append(gracz)
-            elif akcja['typ'] == 'przebicie':
-                self.oferty_przebicia.append((gracz, akcja))
-            if len(self.pasujacy_gracze) + len(self.oferty_przebicia) >= 3:
-                self._rozstrzygnij_licytacje_2()
-            else:
-                self._nastepna_tura()
+    def _zmien_kontrakt(self, gracz: Gracz, akcja: Akcja):
+        self._ustaw_kontrakt(self.grajacy, akcja.kontrakt, self.atut)
+        self.faza = FazaGry.LUFA
+        self.ostatni_podbijajacy = self.grajacy
+        self.kolej_gracza_idx = self.gracze.index(self.grajacy)
+        self._nastepna_tura()
+
+    def _pytanie(self, gracz: Gracz, akcja: Akcja):
+        self.faza = FazaGry.LICYTACJA
+        self.kolej_gracza_idx = self.gracze.index(self.grajacy)
+        self._nastepna_tura()
+
+    def _lufa_w_licytacji(self, gracz: Gracz, akcja: Akcja):
+        self.czy_byla_lufa = True; self.mnoznik_lufy *= 2; self.faza = FazaGry.LUFA
+        self.ostatni_podbijajacy = gracz
+        self.kolej_gracza_idx = self.gracze.index(self.grajacy) # Tura wraca do grającego
+
+    def _pas_lub_przebicie(self, gracz: Gracz, akcja: Akcja):
+        if akcja.typ == 'pas': self.pasujacy_gracze.append(gracz)
+        else: self.oferty_przebicia.append((gracz, akcja))
+        if len(self.pasujacy_gracze) + len(self.oferty_przebicia) >= 3:
+            self._rozstrzygnij_licytacje_2()
+        else:
+            self._nastepna_tura()
 
-        elif self.faza == FazaGry.FAZA_PYTANIA:
-            if akcja['typ'] == 'zmiana_kontraktu':
-                self._ustaw_kontrakt(self.grajacy, akcja['kontrakt'], self.atut)
-                self.faza = FazaGry.LUFA
-                self.ostatni_podbijajacy = self.grajacy
-                self.kolej_gracza_idx = self.gracze.index(self.grajacy)
-                self._nastepna_tura()
-            elif akcja['typ'] == 'pytanie':
-                self.faza = FazaGry.LICYTACJA
-                self.kolej_gracza_idx = self.gracze.index(self.grajacy)
-                self._nastepna_tura()
-
-        elif self.faza == FazaGry.LICYTACJA:
-            if akcja['typ'] == 'lufa':
-                self.czy_byla_lufa = True; self.mnoznik_lufy *= 2; self.faza = FazaGry.LUFA
-                self.ostatni_podbijajacy = gracz
-                self.kolej_gracza_idx = self.gracze.index(next(p for p in gracz.druzyna.przeciwnicy.gracze if p != self.nieaktywny_gracz))
-                return
-            if akcja['typ'] == 'pas': self.pasujacy_gracze.append(gracz)
-            elif akcja['typ'] == 'przebicie': self.oferty_przebicia.append((gracz, akcja))
-            if len(self.pasujacy_gracze) + len(self.oferty_przebicia) >= 3:
-                self._rozstrzygnij_licytacje_2()
-            else:
-                self._nastepna_tura()
-    # ✅ === KONIEC ZMIANY ===
-    
     def rozdaj_karty(self, ilosc: int):
         start_idx = (self.rozdajacy_idx + 1) % 4
         for _ in range(ilosc):
             for i in range(4):
                 karta = self.talia.rozdaj_karte()
-                if karta: self.gracze[(start_idx + i) % 4].reka.append(karta)
+                if karta: self.gracze[(start_idx + i) % 4].reka_maska |= 1 << karta.indeks
     
-    def rozlicz_rozdanie(self) -> tuple[Druzyna, int, int]:
+    def oblicz_wynik(self) -> tuple[Druzyna, int, int]:
+        """Zwycięzca, punkty meczowe i mnożnik zakończonego rozdania - bez dopisywania punktów drużynie."""
         druzyna_wygrana = self.zwyciezca_rozdania
         if not druzyna_wygrana:
             aktywni_gracze = [p for p in self.gracze if p != self.nieaktywny_gracz]
-            if self.kontrakt in [Kontrakt.GORSZA, Kontrakt.LEPSZA] and not any(p.reka for p in aktywni_gracze):
+            if self.kontrakt in [Kontrakt.GORSZA, Kontrakt.LEPSZA] and not any(p.reka_maska for p in aktywni_gracze):
                 druzyna_wygrana = self.grajacy.druzyna
             elif self.zwyciezca_ostatniej_lewy:
                  druzyna_wygrana = self.zwyciezca_ostatniej_lewy.druzyna
@@ -350,68 +442,39 @@ class Rozdanie:
         
         if self.kontrakt == Kontrakt.NORMALNA and druzyna_wygrana == self.grajacy.druzyna:
             punkty_przegranego = self.punkty_w_rozdaniu[druzyna_wygrana.przeciwnicy.nazwa]
-            if not any(gracz.wygrane_karty for gracz in druzyna_wygrana.przeciwnicy.gracze):
+            if not self.wziete_lewy[druzyna_wygrana.przeciwnicy.nazwa]:
                 mnoznik = 3
             elif punkty_przegranego < 33:
                 mnoznik = 2
             punkty_meczu *= mnoznik
             
         punkty_meczu *= self.mnoznik_lufy
+        return druzyna_wygrana, punkty_meczu, mnoznik
+
+    def rozlicz_rozdanie(self) -> tuple[Druzyna, int, int]:
+        druzyna_wygrana, punkty_meczu, mnoznik = self.oblicz_wynik()
         druzyna_wygrana.punkty_meczu += punkty_meczu
         return druzyna_wygrana, punkty_meczu, mnoznik
     
+    def _legalne_maska(self, reka: int) -> int:
+        """Maska kart z ręki, które wolno dołożyć do aktualnej lewy (odczyt z WZORCE_LEGALNYCH)."""
+        wzorzec = self.wzorzec_lewy
+        if wzorzec is None:
+            return reka
+        return reka & wzorzec[0] or reka & wzorzec[1] or reka & wzorzec[2] or reka & wzorzec[3] or reka
+
     def _waliduj_ruch(self, gracz: Gracz, karta: Karta) -> bool:
-        if gracz != self.gracze[self.kolej_gracza_idx] or karta not in gracz.reka:
+        if gracz is not self.gracze[self.kolej_gracza_idx]:
             return False
-        if not self.aktualna_lewa:
-            return True
-        kolor_wiodacy = self.aktualna_lewa[0][1].kolor
-        reka_gracza = gracz.reka
-        
-        karty_do_koloru = [k for k in reka_gracza if k.kolor == kolor_wiodacy]
-        
-        if karty_do_koloru:
-            najwyzsza_karta_wiodaca_na_stole = max(
-                (k for _, k in self.aktualna_lewa if k.kolor == kolor_wiodacy),
-                key=lambda k: k.ranga.value
-            )
-            wyzsze_karty_w_rece = [
-                k for k in karty_do_koloru 
-                if k.ranga.value > najwyzsza_karta_wiodaca_na_stole.ranga.value
-            ]
-            if wyzsze_karty_w_rece:
-                return karta in wyzsze_karty_w_rece
-            else:
-                return karta.kolor == kolor_wiodacy
-        else:
-            if self.atut:
-                karty_atutowe_w_rece = [k for k in reka_gracza if k.kolor == self.atut]
-                if karty_atutowe_w_rece:
-                    atuty_na_stole = [k for _, k in self.aktualna_lewa if k.kolor == self.atut]
-                    if atuty_na_stole:
-                        najwyzszy_atut_na_stole = max(atuty_na_stole, key=lambda k: k.ranga.value)
-                        wyzsze_atuty_w_rece = [k for k in karty_atutowe_w_rece if k.ranga.value > najwyzszy_atut_na_stole.ranga.value]
-                        if wyzsze_atuty_w_rece:
-                            return karta in wyzsze_atuty_w_rece
-                    return karta.kolor == self.atut
-            return True
+        return bool(self._legalne_maska(gracz.reka_maska) >> karta.indeks & 1)
     
     def _zakoncz_lewe(self):
         if not self.aktualna_lewa: return None
-        kolor_wiodacy = self.aktualna_lewa[0][1].kolor
-        karty_atutowe = [(g, k) for g, k in self.aktualna_lewa if k.kolor == self.atut]
-        
-        if karty_atutowe:
-            zwyciezca_pary = max(karty_atutowe, key=lambda p: p[1].ranga.value)
-        else:
-            karty_wiodace = [(g, k) for g, k in self.aktualna_lewa if k.kolor == kolor_wiodacy]
-            zwyciezca_pary = max(karty_wiodace, key=lambda p: p[1].ranga.value)
-            
-        zwyciezca_lewy, _ = zwyciezca_pary
-        punkty_w_lewie = sum(k.wartosc for _, k in self.aktualna_lewa)
+        zwyciezca_lewy, punkty_w_lewie = self.prowadzacy_w_lewie, self.punkty_w_lewie
         druzyna_zwyciezcy = zwyciezca_lewy.druzyna
         self.punkty_w_rozdaniu[druzyna_zwyciezcy.nazwa] += punkty_w_lewie
-        zwyciezca_lewy.wygrane_karty.extend([k for _, k in self.aktualna_lewa])
+        zwyciezca_lewy.wygrane_maska |= self.lewa_maska
+        self.wziete_lewy[druzyna_zwyciezcy.nazwa] = True
         druzyna_grajacego = self.grajacy.druzyna
         
         if self.kontrakt in [Kontrakt.NORMALNA, Kontrakt.BEZ_PYTANIA] and self.punkty_w_rozdaniu[druzyna_zwyciezcy.nazwa] >= 66:
@@ -426,51 +489,105 @@ class Rozdanie:
                 self.rozdanie_zakonczone, self.zwyciezca_rozdania, self.powod_zakonczenia = True, druzyna_grajacego.przeciwnicy, f"wzięcie lewy przez gracza {self.grajacy.nazwa}"
         
         aktywni_gracze = [p for p in self.gracze if p != self.nieaktywny_gracz]
-        if not any(p.reka for p in aktywni_gracze) and not self.rozdanie_zakonczone:
+        if not any(p.reka_maska for p in aktywni_gracze) and not self.rozdanie_zakonczone:
             self.zwyciezca_ostatniej_lewy = zwyciezca_lewy
             self.rozdanie_zakonczone = True
             self.powod_zakonczenia = "koniec kart"
 
-        log_msg_lewa = f"  > [LEWA] Wygrywa {zwyciezca_lewy.nazwa} (+{punkty_w_lewie} pkt). Stół: {', '.join([str(k) for _, k in self.aktualna_lewa])}"
-        self.historia_akcji.append(f"LEWA:{zwyciezca_lewy.nazwa}:{punkty_w_lewie}")
-        logger.info(log_msg_lewa)
+        self.dziennik.append((ZD_LEWA, self.miejsca[zwyciezca_lewy], punkty_w_lewie, 0))
+        if self.logowanie and logger.isEnabledFor(logging.INFO): logger.info("  > [LEWA] Wygrywa %s (+%d pkt). Stół: %s", zwyciezca_lewy.nazwa, punkty_w_lewie, ', '.join([str(k) for _, k in self.aktualna_lewa]))
 
-        self.aktualna_lewa.clear()
+        self.aktualna_lewa = []; self.lewa_maska = 0; self.wzorzec_lewy = None
+        self.najwyzsza_wiodaca, self.najwyzszy_atut, self.prowadzacy_w_lewie, self.punkty_w_lewie = -1, None, None, 0
         if not self.rozdanie_zakonczone: self.kolej_gracza_idx = self.gracze.index(zwyciezca_lewy)
         return (zwyciezca_lewy, punkty_w_lewie)
         
     def zagraj_karte(self, gracz: Gracz, karta: Karta):
         if not self._waliduj_ruch(gracz, karta): 
-            logger.warning(f"NIELEGALNY RUCH ODRZUCONY: {gracz.nazwa} próbuje zagrać {karta}")
+            logger.warning("NIELEGALNY RUCH ODRZUCONY: %s próbuje zagrać %s", gracz.nazwa, karta)
             return
         
+        druzyna_a, druzyna_b = self.druzyny[0].nazwa, self.druzyny[1].nazwa
+        self.stos_cofania.append((WPIS_KARTA, gracz, karta, self.aktualna_lewa, self.kolej_gracza_idx, self.numer_lewy, self.punkty_w_rozdaniu[druzyna_a], self.punkty_w_rozdaniu[druzyna_b],
+                                  len(self.zadeklarowane_meldunki), len(self.dziennik), self.lewa_maska, self.wzorzec_lewy, self.najwyzsza_wiodaca,
+                                  self.najwyzszy_atut, self.prowadzacy_w_lewie, self.punkty_w_lewie, self.rozdanie_zakonczone, self.zwyciezca_rozdania,
+                                  self.powod_zakonczenia, self.zwyciezca_ostatniej_lewy))
         if not self.aktualna_lewa: self.numer_lewy += 1
         
         punkty_z_meldunku = 0
         if not self.aktualna_lewa and self.kontrakt in [Kontrakt.NORMALNA, Kontrakt.BEZ_PYTANIA] and karta.ranga in [Ranga.KROL, Ranga.DAMA]:
-            szukana_ranga = Ranga.DAMA if karta.ranga == Ranga.KROL else Ranga.KROL
-            if any(k.ranga == szukana_ranga and k.kolor == karta.kolor for k in gracz.reka) and (gracz, karta.kolor) not in self.zadeklarowane_meldunki:
+            if gracz.reka_maska >> PARA_MELDUNKOWA[karta.indeks] & 1 and (gracz, karta.kolor) not in self.zadeklarowane_meldunki:
                 punkty_z_meldunku = 40 if karta.kolor == self.atut else 20
                 self.punkty_w_rozdaniu[gracz.druzyna.nazwa] += punkty_z_meldunku
                 self.zadeklarowane_meldunki.append((gracz, karta.kolor))
         
         if punkty_z_meldunku > 0:
-            log_msg_meldunek = f"  ! [MELDUNEK] {gracz.nazwa} zgłasza {punkty_z_meldunku} punktów w {karta.kolor.name.capitalize()}"
-            self.historia_akcji.append(f"MELDUNEK:{gracz.nazwa}: zgłasza {punkty_z_meldunku} punktów w kolorze {karta.kolor.name.capitalize()}")
-            logger.info(log_msg_meldunek)
+            self.dziennik.append((ZD_MELDUNEK, self.miejsca[gracz], karta.kolor.value, punkty_z_meldunku))
+            if self.logowanie and logger.isEnabledFor(logging.INFO): logger.info("  ! [MELDUNEK] %s zgłasza %d punktów w %s", gracz.nazwa, punkty_z_meldunku, karta.kolor.name.capitalize())
         
-        log_msg_karta = f"    [KARTA] {gracz.nazwa} zagrywa: {karta}"
-        self.historia_akcji.append(f"KARTA:{gracz.nazwa}:{str(karta)}")
-        logger.info(log_msg_karta)
+        self.dziennik.append((ZD_KARTA, self.miejsca[gracz], karta.indeks, 0))
+        if self.logowanie and logger.isEnabledFor(logging.INFO): logger.info("    [KARTA] %s zagrywa: %s", gracz.nazwa, karta)
         
-        gracz.reka.remove(karta)
-        self.aktualna_lewa.append((gracz, karta))
+        idx, bit = karta.indeks, 1 << karta.indeks
+        gracz.reka_maska &= ~bit
+        self.aktualna_lewa.append((gracz, karta)); self.lewa_maska |= bit
+        if self.najwyzsza_wiodaca < 0 or (bit & MASKA_KOLORU_KARTY[self.najwyzsza_wiodaca] and idx > self.najwyzsza_wiodaca):
+            self.najwyzsza_wiodaca = idx
+        if bit & self.maska_atutu and (self.najwyzszy_atut is None or idx > self.najwyzszy_atut):
+            self.najwyzszy_atut = idx
+        if idx == (self.najwyzsza_wiodaca if self.najwyzszy_atut is None else self.najwyzszy_atut):
+            self.prowadzacy_w_lewie = gracz
+        self.punkty_w_lewie += WARTOSCI_INDEKSOW[idx]
+        self.wzorzec_lewy = WZORCE_LEGALNYCH[indeks_wzorca_legalnych(self.najwyzsza_wiodaca, self.najwyzszy_atut, self.atut_idx)]
         
         if len(self.aktualna_lewa) == self.liczba_aktywnych_graczy:
             self._zakoncz_lewe()
         elif not self.rozdanie_zakonczone:
             self._nastepna_tura()
             
+    def cofnij_karte(self):
+        """Cofa ostatnie zagranie karty (łącznie z ewentualnym zamknięciem lewy i końcem rozdania)."""
+        (_, gracz, karta, lewa, self.kolej_gracza_idx, self.numer_lewy, punkty_a, punkty_b, liczba_meldunkow, dlugosc_historii,
+         lewa_maska, self.wzorzec_lewy, self.najwyzsza_wiodaca, self.najwyzszy_atut, self.prowadzacy_w_lewie, self.punkty_w_lewie,
+         self.rozdanie_zakonczone, self.zwyciezca_rozdania, self.powod_zakonczenia, self.zwyciezca_ostatniej_lewy) = self.stos_cofania.pop()
+        bit = 1 << karta.indeks
+        if lewa is not self.aktualna_lewa:
+            # Karta zamknęła lewę (_zakoncz_lewe podmienia listę): zabieramy lewę zwycięzcy i wracamy do starej listy
+            zwyciezca = next(g for g in self.gracze if g.wygrane_maska & bit)
+            zwyciezca.wygrane_maska &= ~(lewa_maska | bit)
+            self.wziete_lewy[zwyciezca.druzyna.nazwa] = any(g.wygrane_maska for g in zwyciezca.druzyna.gracze)
+            self.aktualna_lewa = lewa
+        self.aktualna_lewa.pop()
+        self.lewa_maska = lewa_maska
+        gracz.reka_maska |= bit
+        self.punkty_w_rozdaniu[self.druzyny[0].nazwa], self.punkty_w_rozdaniu[self.druzyny[1].nazwa] = punkty_a, punkty_b
+        del self.zadeklarowane_meldunki[liczba_meldunkow:]
+        del self.dziennik[dlugosc_historii:]
+
+    def cofnij_akcje(self):
+        """Cofa ostatnią akcję licytacyjną, razem z ewentualnym dobraniem kart."""
+        (_, self.faza, self.kolej_gracza_idx, self.grajacy, self.kontrakt, self.atut, self.maska_atutu, self.atut_idx,
+         self.nieaktywny_gracz, self.liczba_aktywnych_graczy, self.mnoznik_lufy, self.czy_byla_lufa, self.ostatni_podbijajacy,
+         pasujacy_gracze, liczba_ofert, dlugosc_licytacji, dlugosc_historii, pozostale_w_talii) = self.stos_cofania.pop()
+        if pozostale_w_talii != self.talia.pozostale:
+            rozdane = maska_kart(self.talia.karty[self.talia.pozostale:pozostale_w_talii])
+            for gracz in self.gracze: gracz.reka_maska &= ~rozdane
+            self.talia.pozostale = pozostale_w_talii
+        self.pasujacy_gracze[:] = pasujacy_gracze
+        del self.oferty_przebicia[liczba_ofert:]
+        del self.historia_licytacji[dlugosc_licytacji:]
+        del self.dziennik[dlugosc_historii:]
+
+    def cofnij_do(self, dlugosc_stosu: int):
+        """Cofa ruchy (karty i akcje) aż stos cofania wróci do podanej długości."""
+        while len(self.stos_cofania) > dlugosc_stosu:
+            if self.stos_cofania[-1][0] == WPIS_KARTA: self.cofnij_karte()
+            else: self.cofnij_akcje()
+
+    def historia_zagran(self) -> list[tuple[Gracz, Karta, Optional[tuple[int, int, int, int]]]]:
+        """Zagrane w tym rozdaniu karty: (gracz, karta, wzorzec legalnych ruchów obowiązujący przed zagraniem)."""
+        return [(wpis[1], wpis[2], wpis[11]) for wpis in self.stos_cofania if wpis[0] == WPIS_KARTA]
+
     def _rozstrzygnij_licytacje_2(self):
         nowy_grajacy, nowa_akcja = None, None
         oferty_lepsza = [o for o in self.oferty_przebicia if o[1]['kontrakt'] == Kontrakt.LEPSZA]
@@ -480,22 +597,44 @@ class Rozdanie:
             if oferty_gorsza: nowy_grajacy, nowa_akcja = oferty_gorsza[0]
         
         if nowy_grajacy and nowa_akcja:
-            self.historia_akcji.append(f"INFO:{nowy_grajacy.nazwa} przebił na {nowa_akcja['kontrakt'].name}.")
-            logger.info(f"  INFO: Licytację przebił {nowy_grajacy.nazwa} z kontraktem {nowa_akcja['kontrakt'].name}.")
+            self.dziennik.append((ZD_PRZEBICIE, self.miejsca[nowy_grajacy], nowa_akcja['kontrakt'].value, 0))
+            if self.logowanie and logger.isEnabledFor(logging.INFO): logger.info("  INFO: Licytację przebił %s z kontraktem %s.", nowy_grajacy.nazwa, nowa_akcja['kontrakt'].name)
             self._ustaw_kontrakt(nowy_grajacy, nowa_akcja['kontrakt'], None)
         else: 
-            self.historia_akcji.append("INFO:Wszyscy spasowali, kontrakt zostaje.")
-            logger.info("  INFO: Wszyscy spasowali, pierwotny kontrakt zostaje.")
+            self.dziennik.append((ZD_BEZ_PRZEBICIA, 0, 0, 0))
+            if self.logowanie and logger.isEnabledFor(logging.INFO): logger.info("  INFO: Wszyscy spasowali, pierwotny kontrakt zostaje.")
         
-        if len(self.gracze[0].reka) < 6:
+        if self.gracze[0].reka_maska.bit_count() < 6:
             self.rozdaj_karty(3)
         
         self.faza = FazaGry.ROZGRYWKA
         self.kolej_gracza_idx = self.gracze.index(self.grajacy)
 
+    def opis_zdarzenia(self, zdarzenie: tuple[int, int, int, int]) -> str:
+        """Tekst zdarzenia w formacie "TYP:gracz:reszta" używanym przez frontend."""
+        rodzaj, miejsce, a, b = zdarzenie
+        nazwa = self.gracze[miejsce].nazwa
+        if rodzaj == ZD_KARTA: return f"KARTA:{nazwa}:{KARTY[a]}"
+        if rodzaj == ZD_LEWA: return f"LEWA:{nazwa}:{a}"
+        if rodzaj == ZD_AKCJA: return f"INFO:{nazwa}:{OPISY_AKCJI[a]}"
+        if rodzaj == ZD_MELDUNEK: return f"MELDUNEK:{nazwa}: zgłasza {b} punktów w kolorze {Kolor(a).name.capitalize()}"
+        if rodzaj == ZD_KONTRAKT:
+            atut_str = f"w {Kolor(b).name.capitalize()}" if b else "bez atu"
+            return f"INFO:{nazwa} gra {Kontrakt(a).name} ({atut_str})"
+        if rodzaj == ZD_PRZEBICIE: return f"INFO:{nazwa} przebił na {Kontrakt(a).name}."
+        if rodzaj == ZD_KONIEC_LICYTACJI: return "INFO:Licytacja zakończona"
+        return "INFO:Wszyscy spasowali, kontrakt zostaje."
+
+    @property
+    def historia_akcji(self) -> list[str]:
+        return [self.opis_zdarzenia(z) for z in self.dziennik]
+
+    def get_legalne_maska(self, gracz: Gracz) -> int:
+        if gracz is not self.gracze[self.kolej_gracza_idx]: return 0
+        return self._legalne_maska(gracz.reka_maska)
+
     def get_legalne_karty(self, gracz: Gracz) -> list[Karta]:
-        if gracz != self.gracze[self.kolej_gracza_idx] or not gracz.reka: return []
-        return [karta for karta in gracz.reka if self._waliduj_ruch(gracz, karta)]
+        return karty_z_maski(self.get_legalne_maska(gracz))
         
     def get_aktualna_stawka(self) -> int:
         if not self.kontrakt: return 0
@@ -504,14 +643,29 @@ class Rozdanie:
             return stawka_bazowa * self.mnoznik_lufy
         druzyna_przeciwnikow = self.grajacy.druzyna.przeciwnicy
         punkty_przeciwnika = self.punkty_w_rozdaniu[druzyna_przeciwnikow.nazwa]
-        przeciwnik_wzial_lewe = any(gracz.wygrane_karty for gracz in druzyna_przeciwnikow.gracze)
+        przeciwnik_wzial_lewe = self.wziete_lewy[druzyna_przeciwnikow.nazwa]
         mnoznik_punktowy = 1
         if not przeciwnik_wzial_lewe: mnoznik_punktowy = 3
         elif punkty_przeciwnika < 33: mnoznik_punktowy = 2
         return mnoznik_punktowy * self.mnoznik_lufy
 
+# (faza, typ akcji, rola gracza) -> przejście; klucze pokrywają wszystkie akcje z LEGALNE_AKCJE
+PRZEJSCIA_LICYTACJI = {
+    (FazaGry.DEKLARACJA_1, 'deklaracja', ROLA_BRAK): Rozdanie._deklaruj,
+    (FazaGry.LUFA, 'kontra', ROLA_GRAJACY): Rozdanie._kontra,
+    (FazaGry.LUFA, 'lufa', ROLA_PRZECIWNIK): Rozdanie._lufa,
+    (FazaGry.LUFA, 'pas_lufa', ROLA_GRAJACY): Rozdanie._pas_lufa,
+    (FazaGry.LUFA, 'pas_lufa', ROLA_PRZECIWNIK): Rozdanie._pas_lufa,
+    (FazaGry.FAZA_PYTANIA, 'zmiana_kontraktu', ROLA_GRAJACY): Rozdanie._zmien_kontrakt,
+    (FazaGry.FAZA_PYTANIA, 'pytanie', ROLA_GRAJACY): Rozdanie._pytanie,
+    (FazaGry.LICYTACJA, 'lufa', ROLA_PRZECIWNIK): Rozdanie._lufa_w_licytacji,
+    (FazaGry.LICYTACJA, 'przebicie', ROLA_PRZECIWNIK): Rozdanie._pas_lub_przebicie,
+    **{(FazaGry.LICYTACJA, 'pas', rola): Rozdanie._pas_lub_przebicie for rola in (ROLA_GRAJACY, ROLA_PARTNER, ROLA_PRZECIWNIK)},
+}
+
 class Mecz:
-    def __init__(self, nazwy_graczy: list[str]):
+    """Mecz do 66 punktów. Talie tasuje `rng`; podanie `ziarno` (zamiast rng) daje powtarzalne rozdania."""
+    def __init__(self, nazwy_graczy: list[str], ziarno: Optional[int] = None, rng: Optional[random.Random] = None):
         self.druzyna_a = Druzyna(nazwa="My")
         self.druzyna_b = Druzyna(nazwa="Oni")
         self.gracze = [Gracz(nazwa=n) for n in nazwy_graczy]
@@ -524,18 +678,163 @@ class Mecz:
         self.rozdajacy_idx = 3 
         self.rozdanie: Optional[Rozdanie] = None
         self.zwyciezca_meczu: Optional[Druzyna] = None
+        self.ziarno = ziarno
+        self.rng = rng or (random.Random(ziarno) if ziarno is not None else None) # None: globalny moduł random
+        # Zakończone rozdania trzymamy tylko jako ruchy (ok. 30 bajtów na rozdanie, do powtórek), nie całe dzienniki
+        self.ruchy_rozdan = bytearray()
+        self.numer_rozdania = 0 # Numer aktualnego rozdania (od 1), zarazem liczba potasowanych talii
+        self.wersja = 0 # Rośnie przy każdej zmianie stanu meczu (podbija ją serwer); klienci porównują ją zamiast całego stanu
 
     def rozpocznij_mecz(self):
         self.przygotuj_nastepne_rozdanie()
 
     def przygotuj_nastepne_rozdanie(self):
+        if self.rozdanie: self.ruchy_rozdan += ruchy_z_dziennika(self.rozdanie.dziennik)
+        self.numer_rozdania += 1
         self.rozdajacy_idx = (self.rozdajacy_idx + 1) % 4
-        logger.info(f"===\n### NOWE ROZDANIE (rozdaje: {self.gracze[self.rozdajacy_idx].nazwa}) ###")
-        self.rozdanie = Rozdanie(gracze=self.gracze, druzyny=[self.druzyna_a, self.druzyna_b], rozdajacy_idx=self.rozdajacy_idx)
+        logger.info("===\n### NOWE ROZDANIE (rozdaje: %s) ###", self.gracze[self.rozdajacy_idx].nazwa)
+        self.rozdanie = Rozdanie(gracze=self.gracze, druzyny=[self.druzyna_a, self.druzyna_b], rozdajacy_idx=self.rozdajacy_idx, rng=self.rng or random)
         self.rozdanie.rozpocznij_nowe_rozdanie()
 
     def sprawdz_koniec_meczu(self, limit_punktow: int = 66):
         if self.druzyna_a.punkty_meczu >= limit_punktow:
             self.zwyciezca_meczu = self.druzyna_a
         elif self.druzyna_b.punkty_meczu >= limit_punktow:
-            self.zwyciezca_meczu = self.druzyna_b
\ No newline at end of file
+            self.zwyciezca_meczu = self.druzyna_b
+
+# --- Tryb kompaktowy (symulacje) ---
+# Całe rozdanie z losowymi ruchami na samych maskach i liczbach: bez obiektów Rozdanie/Gracz, stosu cofania,
+# dziennika i logów. Gracz to miejsce 0..3, drużyna to miejsce % 2 (My = 0 i 2, jak w Mecz). Przejścia licytacji
+# odwzorowują metody Rozdanie (_deklaruj, _kontra, _lufa, _pas_lufa, ...), a legalne akcje czytamy z LEGALNE_AKCJE.
+# Generator jest zużywany dokładnie tak jak przez Mecz/Rozdanie z rng.choice(get_mozliwe_akcje) i
+# losowa_karta_z_maski(get_legalne_maska), więc przy tym samym rng wynik jest identyczny.
+_LEGALNE_AKCJE_KOMPAKTOWE: dict[tuple[int, int, bool, bool], tuple[Akcja, ...]] = {
+    (faza.value, rola, lufa, po_podbiciu): akcje for (faza, rola, lufa, po_podbiciu), akcje in LEGALNE_AKCJE.items()}
+_DEKLARACJA_1, _LICYTACJA, _LUFA, _FAZA_PYTANIA = (f.value for f in (FazaGry.DEKLARACJA_1, FazaGry.LICYTACJA, FazaGry.LUFA, FazaGry.FAZA_PYTANIA))
+# Kolejne (i, liczba bitów i + 1) z Random.shuffle dla 24 kart
+_TASOWANIE: tuple[tuple[int, int], ...] = tuple((i, (i + 1).bit_length()) for i in reversed(range(1, len(KARTY))))
+_Z_MELDUNKAMI, _TRZYOSOBOWE = (Kontrakt.NORMALNA, Kontrakt.BEZ_PYTANIA), (Kontrakt.GORSZA, Kontrakt.LEPSZA)
+
+def _nastepne_miejsce(kolej: int, faza: int, grajacy: int, nieaktywny: int) -> int:
+    """Rozdanie._nastepna_tura: pomija nieaktywnego gracza, a w fazie LUFA także partnera grającego."""
+    for _ in range(4):
+        kolej = (kolej + 1) % 4
+        if kolej != nieaktywny and not (faza == _LUFA and kolej == grajacy ^ 2): break
+    return kolej
+
+def _dobierz_kompaktowo(reki: list[int], talia: list[int], pierwszy: int):
+    """Rozdanie.rozdaj_karty(3): 12 kart z końca talii, po jednej, zaczynając od gracza po rozdającym."""
+    for n in range(4): reki[(pierwszy + n) % 4] |= 1 << talia[-1 - n] | 1 << talia[-5 - n] | 1 << talia[-9 - n]
+    del talia[-12:]
+
+def _licytuj_kompaktowo(reki: list[int], talia: list[int], pierwszy: int, limit_stawki: int, rng) -> tuple[int, Kontrakt, Optional[Kolor], int, int]:
+    """Losowa licytacja; dobiera resztę kart do `reki`. Zwraca (grajacy, kontrakt, atut, nieaktywny albo -1, mnożnik lufy)."""
+    deklaracja = rng.choice(_LEGALNE_AKCJE_KOMPAKTOWE[_DEKLARACJA_1, ROLA_BRAK, False, False])
+    grajacy, kontrakt, atut, nieaktywny = pierwszy, deklaracja.kontrakt, deklaracja.atut, -1
+    if kontrakt in _TRZYOSOBOWE: atut, nieaktywny = None, grajacy ^ 2
+    stawka, mnoznik_lufy, podbijajacy, pasujacy, oferty = STAWKI_KONTRAKTOW[kontrakt], 1, -1, [], []
+    faza = _LUFA
+    kolej = _nastepne_miejsce(grajacy, faza, grajacy, nieaktywny)
+    while True:
+        rola = ROLA_GRAJACY if kolej == grajacy else ROLA_PARTNER if kolej == grajacy ^ 2 else ROLA_PRZECIWNIK
+        lufa_mozliwa = stawka * mnoznik_lufy * 2 <= limit_stawki
+        po_podbiciu = podbijajacy >= 0 and (podbijajacy ^ kolej) & 1 == 0
+        akcja = rng.choice(_LEGALNE_AKCJE_KOMPAKTOWE[faza, rola, lufa_mozliwa, po_podbiciu])
+        typ = akcja.typ
+        if typ == 'kontra' or typ == 'lufa':
+            mnoznik_lufy *= 2; podbijajacy = kolej
+            if faza == _LUFA: pasujacy.clear() # Lufa w licytacji (po pytaniu) nie czyści pasujących
+            faza = _LUFA
+            kolej = (grajacy & 1) ^ 1 if typ == 'kontra' else grajacy # Po kontrze pierwszy przeciwnik, po lufie grający
+            continue
+        if typ == 'pas_lufa':
+            pasujacy.append(kolej)
+            if talia and (grajacy ^ 1) in pasujacy and (grajacy ^ 3) in pasujacy:
+                _dobierz_kompaktowo(reki, talia, pierwszy)
+                if mnoznik_lufy > 1 or kontrakt != Kontrakt.NORMALNA: break
+                faza, kolej = _FAZA_PYTANIA, grajacy
+            elif podbijajacy >= 0 and (podbijajacy ^ kolej) & 1: break
+            else: kolej = _nastepne_miejsce(kolej, faza, grajacy, nieaktywny)
+            continue
+        if typ == 'zmiana_kontraktu':
+            kontrakt = akcja.kontrakt
+            stawka = STAWKI_KONTRAKTOW[kontrakt]
+            if kontrakt in _TRZYOSOBOWE: atut, nieaktywny = None, grajacy ^ 2
+            faza, podbijajacy = _LUFA, grajacy
+            kolej = _nastepne_miejsce(grajacy, faza, grajacy, nieaktywny)
+            continue
+        if typ == 'pytanie':
+            faza = _LICYTACJA
+            kolej = _nastepne_miejsce(grajacy, faza, grajacy, nieaktywny)
+            continue
+        # 'pas' albo 'przebicie' w fazie LICYTACJA (Rozdanie._pas_lub_przebicie i _rozstrzygnij_licytacje_2)
+        if typ == 'pas': pasujacy.append(kolej)
+        else: oferty.append((kolej, akcja.kontrakt))
+        if len(pasujacy) + len(oferty) < 3:
+            kolej = _nastepne_miejsce(kolej, faza, grajacy, nieaktywny)
+            continue
+        przebicie = next((o for o in oferty if o[1] == Kontrakt.LEPSZA), None) or next((o for o in oferty if o[1] == Kontrakt.GORSZA), None)
+        if przebicie: (grajacy, kontrakt), atut, nieaktywny = przebicie, None, przebicie[0] ^ 2
+        break
+    if talia: _dobierz_kompaktowo(reki, talia, pierwszy)
+    return grajacy, kontrakt, atut, nieaktywny, mnoznik_lufy
+
+def rozegraj_rozdanie_kompaktowo(rozdajacy_idx: int, punkty_meczu: tuple[int, int], rng=random) -> tuple[Kontrakt, int, int, int, int, int]:
+    """Rozgrywa losowe rozdanie w trybie kompaktowym (ruchy jak z rng.choice i losowa_karta_z_maski).
+
+    `punkty_meczu` (My, Oni) wyznaczają limit lufy. Zwraca (kontrakt, miejsce grającego, wygrana drużyna,
+    punkty meczowe, mnożnik punktowy, mnożnik lufy) - to, co rozlicz_rozdanie, bez dopisywania punktów.
+    """
+    # rng.shuffle(talia) rozpisane na getrandbits tak jak w Random._randbelow: te same liczby, bez wywołań na kartę
+    talia, losowe_bity = list(range(len(KARTY))), rng.getrandbits
+    for i, bity in _TASOWANIE:
+        j = losowe_bity(bity)
+        while j > i: j = losowe_bity(bity)
+        talia[i], talia[j] = talia[j], talia[i]
+    reki, pierwszy = [0, 0, 0, 0], (rozdajacy_idx + 1) % 4
+    _dobierz_kompaktowo(reki, talia, pierwszy)
+    grajacy, kontrakt, atut, nieaktywny, mnoznik_lufy = _licytuj_kompaktowo(reki, talia, pierwszy, 66 - min(punkty_meczu), rng)
+
+    # --- Rozgrywka (Rozdanie.zagraj_karte i _zakoncz_lewe) ---
+    maska_atutu = MASKI_KOLOROW[atut] if atut else 0
+    wzorce_atutu = (atut.value - 1 if atut else BRAK_ATUTU) * 25 # Początek wzorców tego atutu (indeks_wzorca_legalnych)
+    z_meldunkami, liczba_aktywnych = kontrakt in _Z_MELDUNKAMI, 3 if nieaktywny >= 0 else 4
+    bez_pytania, lepsza, gorsza = kontrakt == Kontrakt.BEZ_PYTANIA, kontrakt == Kontrakt.LEPSZA, kontrakt == Kontrakt.GORSZA
+    druzyna_grajacego = grajacy & 1
+    punkty, wziete, kolej, zwyciezca = [0, 0], [False, False], grajacy, -1
+    while zwyciezca < 0:
+        najwyzsza_wiodaca, najwyzszy_atut, prowadzacy, punkty_w_lewie, wzorzec = -1, -1, -1, 0, None
+        for n in range(liczba_aktywnych):
+            if n: kolej = (kolej + 1) % 4 if (kolej + 1) % 4 != nieaktywny else (kolej + 2) % 4
+            reka = reki[kolej]
+            legalne = reka if wzorzec is None else reka & wzorzec[0] or reka & wzorzec[1] or reka & wzorzec[2] or reka & wzorzec[3] or reka
+            liczba = legalne.bit_count() # losowa_karta_z_maski w miejscu (randrange też przez getrandbits)
+            bity = liczba.bit_length()
+            k = losowe_bity(bity)
+            while k >= liczba: k = losowe_bity(bity)
+            for _ in range(k): legalne &= legalne - 1
+            idx = (legalne & -legalne).bit_length() - 1
+            bit = 1 << idx
+            if not n and z_meldunkami and idx in PARA_MELDUNKOWA and reka >> PARA_MELDUNKOWA[idx] & 1:
+                punkty[kolej & 1] += 40 if bit & maska_atutu else 20
+            reki[kolej] = reka ^ bit
+            if najwyzsza_wiodaca < 0 or (bit & MASKA_KOLORU_KARTY[najwyzsza_wiodaca] and idx > najwyzsza_wiodaca): najwyzsza_wiodaca = idx
+            if bit & maska_atutu and idx > najwyzszy_atut: najwyzszy_atut = idx
+            if idx == (najwyzsza_wiodaca if najwyzszy_atut < 0 else najwyzszy_atut): prowadzacy = kolej
+            punkty_w_lewie += WARTOSCI_INDEKSOW[idx]
+            wzorzec = WZORCE_LEGALNYCH[(wzorce_atutu + najwyzszy_atut + 1) * 24 + najwyzsza_wiodaca]
+        druzyna = prowadzacy & 1
+        punkty[druzyna] += punkty_w_lewie; wziete[druzyna] = True
+        if z_meldunkami and punkty[druzyna] >= 66: zwyciezca = druzyna
+        elif (bez_pytania and prowadzacy != grajacy) or (lepsza and druzyna != druzyna_grajacego) or (gorsza and prowadzacy == grajacy):
+            zwyciezca = druzyna_grajacego ^ 1
+        elif not reki[prowadzacy]: # Koniec kart: Gorsza/Lepsza wygrywa grający, inaczej ostatnia lewa
+            zwyciezca = druzyna_grajacego if nieaktywny >= 0 else druzyna
+        kolej = prowadzacy
+
+    # --- Rozliczenie (Rozdanie.oblicz_wynik) ---
+    mnoznik = 1
+    if kontrakt == Kontrakt.NORMALNA and zwyciezca == druzyna_grajacego:
+        przegrani = zwyciezca ^ 1
+        mnoznik = 3 if not wziete[przegrani] else 2 if punkty[przegrani] < 33 else 1
+    return kontrakt, grajacy, zwyciezca, STAWKI_KONTRAKTOW[kontrakt] * mnoznik * mnoznik_lufy, mnoznik, mnoznik_lufy
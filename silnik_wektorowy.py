@@ -0,0 +1,241 @@
+"""Wsadowy silnik rozgrywki na tablicach NumPy.
+
+Trzyma N rozdań naraz (maski rąk, stan lewy, atut, kontrakt, punkty, kolejka) i przesuwa
+wszystkie o jedną kartę na krok. Zasady odwzorowują Rozdanie._legalne_maska, zagraj_karte,
+_zakoncz_lewe i oblicz_wynik z silnik_gry.py. Służy do szacowania szans kontraktów na
+milionach losowych rozdań; wymaga pakietu numpy (silnik_gry go nie potrzebuje).
+"""
+from typing import Callable, Optional
+import numpy as np
+from silnik_gry import (Rozdanie, Kontrakt, Kolor, KARTY, MASKA_KOLORU_KARTY, WARTOSCI_INDEKSOW, PARA_MELDUNKOWA,
+                        WZORCE_LEGALNYCH, BRAK_ATUTU, STAWKI_KONTRAKTOW)
+
+ROZMIAR_PACZKI = 200_000 # Tyle rozdań naraz trzymamy w pamięci przy szacowaniu szans
+
+# --- Tablice silnika w wersji NumPy ---
+_BITY = np.int64(1) << np.arange(len(KARTY), dtype=np.int64)
+_MASKA_KOLORU = np.array(MASKA_KOLORU_KARTY, dtype=np.int64)
+_KOLOR_KARTY = np.array([k.kolor.value - 1 for k in KARTY], dtype=np.int64)
+_WARTOSCI = np.array(WARTOSCI_INDEKSOW, dtype=np.int64)
+_PARA = np.array([PARA_MELDUNKOWA.get(i, -1) for i in range(len(KARTY))], dtype=np.int64)
+_WZORCE = np.array([w if w is not None else (0, 0, 0, 0) for w in WZORCE_LEGALNYCH], dtype=np.int64)
+_STAWKI = np.zeros(max(k.value for k in Kontrakt) + 1, dtype=np.int64)
+for _k, _stawka in STAWKI_KONTRAKTOW.items(): _STAWKI[_k.value] = _stawka
+NORMALNA, BEZ_PYTANIA, GORSZA, LEPSZA = (k.value for k in (Kontrakt.NORMALNA, Kontrakt.BEZ_PYTANIA, Kontrakt.GORSZA, Kontrakt.LEPSZA))
+
+Polityka = Callable[['PartieWektorowe', np.ndarray, np.ndarray], np.ndarray]
+
+
+def _rozpakuj(maski: np.ndarray) -> np.ndarray:
+    """Maski (N,) -> macierz bitów (N, 24)."""
+    return (maski[:, None] & _BITY) != 0
+
+def polityka_losowa(partie: 'PartieWektorowe', wiersze: np.ndarray, legalne: np.ndarray) -> np.ndarray:
+    """Jednostajnie losowa legalna karta w każdym rozdaniu."""
+    priorytety = np.where(_rozpakuj(legalne), partie.rng.random((len(wiersze), len(KARTY))), -1.0)
+    return priorytety.argmax(axis=1)
+
+def polityka_najnizsza(partie: 'PartieWektorowe', wiersze: np.ndarray, legalne: np.ndarray) -> np.ndarray:
+    """Zawsze najniższy indeks spośród legalnych kart (deterministyczna, przydatna w testach)."""
+    return _rozpakuj(legalne).argmax(axis=1)
+
+
+class PartieWektorowe:
+    """N rozdań w fazie ROZGRYWKA. Drużyna gracza na miejscu s to s % 2 (jak w Mecz: My = 0 i 2)."""
+    def __init__(self, reki: np.ndarray, kontrakt: np.ndarray, atut: np.ndarray, grajacy: np.ndarray,
+                 mnoznik_lufy: Optional[np.ndarray] = None, rng: Optional[np.random.Generator] = None):
+        n = len(reki)
+        self.rng = rng or np.random.default_rng()
+        self.reki = np.asarray(reki, dtype=np.int64).copy()
+        self.kontrakt = np.broadcast_to(np.asarray(kontrakt, dtype=np.int64), (n,)).copy()
+        self.atut = np.broadcast_to(np.asarray(atut, dtype=np.int64), (n,)).copy()  # 0..3 albo BRAK_ATUTU
+        self.grajacy = np.broadcast_to(np.asarray(grajacy, dtype=np.int64), (n,)).copy()
+        self.mnoznik_lufy = np.ones(n, dtype=np.int64) if mnoznik_lufy is None else np.broadcast_to(np.asarray(mnoznik_lufy, dtype=np.int64), (n,)).copy()
+
+        # Jak w Rozdanie._ustaw_kontrakt: Gorsza/Lepsza bez atutu i bez partnera grającego
+        trzyosobowe = (self.kontrakt == GORSZA) | (self.kontrakt == LEPSZA)
+        self.atut[trzyosobowe] = BRAK_ATUTU
+        self.nieaktywny = np.where(trzyosobowe, (self.grajacy + 2) % 4, -1)
+        self.liczba_aktywnych = np.where(trzyosobowe, 3, 4)
+        self.maska_atutu = np.where(self.atut == BRAK_ATUTU, 0, np.int64(0b111111) << (6 * np.minimum(self.atut, 3)))
+        self.z_meldunkami = (self.kontrakt == NORMALNA) | (self.kontrakt == BEZ_PYTANIA)
+
+        self.kolej = self.grajacy.copy()
+        self.punkty = np.zeros((n, 2), dtype=np.int64)
+        self.wziete = np.zeros((n, 2), dtype=bool)
+        self.zakonczone = np.zeros(n, dtype=bool)
+        self.zwyciezca = np.full(n, -1, dtype=np.int64)                # drużyna, gdy rozdanie skończyło się przed czasem
+        self.zwyciezca_ostatniej_lewy = np.full(n, -1, dtype=np.int64) # miejsce gracza
+        # Stan lewy (jak pola Rozdanie.najwyzsza_wiodaca, najwyzszy_atut, prowadzacy_w_lewie, punkty_w_lewie)
+        self.w_lewie = np.zeros(n, dtype=np.int64)
+        self.lewa_maska = np.zeros(n, dtype=np.int64)
+        self.najwyzsza_wiodaca = np.full(n, -1, dtype=np.int64)
+        self.najwyzszy_atut = np.full(n, -1, dtype=np.int64)
+        self.prowadzacy = np.full(n, -1, dtype=np.int64)
+        self.punkty_w_lewie = np.zeros(n, dtype=np.int64)
+
+    @classmethod
+    def losowe(cls, n: int, kontrakt: Kontrakt, atut: Optional[Kolor], grajacy: int = 0,
+               reka_grajacego: Optional[int] = None, rng: Optional[np.random.Generator] = None) -> 'PartieWektorowe':
+        """N losowych rozdań z tym samym kontraktem; opcjonalnie z ustaloną ręką grającego (maska 6 kart)."""
+        rng = rng or np.random.default_rng()
+        if reka_grajacego is None:
+            talie = np.argsort(rng.random((n, len(KARTY))), axis=1)
+            reki = np.stack([_BITY[talie[:, 6 * s:6 * s + 6]].sum(axis=1) for s in range(4)], axis=1)
+        else:
+            reszta = np.array([i for i in range(len(KARTY)) if not reka_grajacego >> i & 1], dtype=np.int64)
+            talie = reszta[np.argsort(rng.random((n, len(reszta))), axis=1)]
+            inni = [s for s in range(4) if s != grajacy]
+            reki = np.zeros((n, 4), dtype=np.int64)
+            reki[:, grajacy] = reka_grajacego
+            for nr, s in enumerate(inni):
+                reki[:, s] = _BITY[talie[:, 6 * nr:6 * nr + 6]].sum(axis=1)
+        atut_idx = BRAK_ATUTU if atut is None else atut.value - 1
+        return cls(reki, kontrakt.value, atut_idx, grajacy, rng=rng)
+
+    @classmethod
+    def dobrane(cls, znane: np.ndarray, miejsce: int, kontrakt: Kontrakt, atut: Optional[Kolor], grajacy: int = 0,
+                rng: Optional[np.random.Generator] = None) -> 'PartieWektorowe':
+        """Rozdania, w których gracz na `miejsce` ma znane karty (maska na rozdanie, do 6 kart) dobrane losowo do 6."""
+        rng = rng or np.random.default_rng()
+        priorytety = rng.random((len(znane), len(KARTY)))
+        priorytety[_rozpakuj(np.asarray(znane, dtype=np.int64))] = -1.0 # Znane karty na początek talii
+        talie = np.argsort(priorytety, axis=1)
+        reki = np.zeros((len(znane), 4), dtype=np.int64)
+        for nr, s in enumerate([miejsce] + [s for s in range(4) if s != miejsce]):
+            reki[:, s] = _BITY[talie[:, 6 * nr:6 * nr + 6]].sum(axis=1)
+        atut_idx = BRAK_ATUTU if atut is None else atut.value - 1
+        return cls(reki, kontrakt.value, atut_idx, grajacy, rng=rng)
+
+    @classmethod
+    def z_rozdan(cls, rozdania: list[Rozdanie], rng: Optional[np.random.Generator] = None) -> 'PartieWektorowe':
+        """Kopiuje stan rozdań z silnika obiektowego (faza ROZGRYWKA, także w trakcie lewy)."""
+        partie = cls(np.array([[g.reka_maska for g in r.gracze] for r in rozdania], dtype=np.int64),
+                     np.array([r.kontrakt.value for r in rozdania]), np.array([r.atut_idx for r in rozdania]),
+                     np.array([r.gracze.index(r.grajacy) for r in rozdania]), np.array([r.mnoznik_lufy for r in rozdania]), rng)
+        for i, r in enumerate(rozdania):
+            partie.kolej[i] = r.kolej_gracza_idx
+            for t, d in enumerate(r.druzyny):
+                partie.punkty[i, t] = r.punkty_w_rozdaniu[d.nazwa]
+                partie.wziete[i, t] = r.wziete_lewy[d.nazwa]
+            partie.w_lewie[i] = len(r.aktualna_lewa)
+            partie.lewa_maska[i] = r.lewa_maska
+            partie.najwyzsza_wiodaca[i] = r.najwyzsza_wiodaca
+            partie.najwyzszy_atut[i] = -1 if r.najwyzszy_atut is None else r.najwyzszy_atut
+            partie.prowadzacy[i] = -1 if r.prowadzacy_w_lewie is None else r.gracze.index(r.prowadzacy_w_lewie)
+            partie.punkty_w_lewie[i] = r.punkty_w_lewie
+        return partie
+
+    def legalne_maski(self, wiersze: np.ndarray) -> np.ndarray:
+        """Odpowiednik Rozdanie._legalne_maska dla gracza na ruchu w podanych rozdaniach."""
+        reka = self.reki[wiersze, self.kolej[wiersze]]
+        indeks = (self.atut[wiersze] * 25 + self.najwyzszy_atut[wiersze] + 1) * 24 + np.maximum(self.najwyzsza_wiodaca[wiersze], 0)
+        wzorzec = _WZORCE[indeks]
+        legalne = reka
+        # Łańcuch "pierwsza niepusta maska" liczony od końca, żeby wcześniejsze maski wygrywały
+        for j in (3, 2, 1, 0):
+            czesc = reka & wzorzec[:, j]
+            legalne = np.where(czesc != 0, czesc, legalne)
+        return np.where(self.w_lewie[wiersze] == 0, reka, legalne)
+
+    def krok(self, polityka: Polityka = polityka_losowa) -> bool:
+        """Jedna karta w każdym niezakończonym rozdaniu. Zwraca False, gdy wszystkie są zakończone."""
+        wiersze = np.flatnonzero(~self.zakonczone)
+        if not len(wiersze):
+            return False
+        kolej = self.kolej[wiersze]
+        reka = self.reki[wiersze, kolej]
+        karta = polityka(self, wiersze, self.legalne_maski(wiersze))
+        bit = _BITY[karta]
+        druzyna = kolej % 2
+        pusta_lewa = self.w_lewie[wiersze] == 0
+
+        # Meldunek: wyjście Królem lub Damą, gdy druga karta pary jest w ręce
+        para = _PARA[karta]
+        meldunek = pusta_lewa & self.z_meldunkami[wiersze] & (para >= 0) & ((reka >> np.maximum(para, 0)) & 1 == 1)
+        self.punkty[wiersze, druzyna] += meldunek * np.where(_KOLOR_KARTY[karta] == self.atut[wiersze], 40, 20)
+
+        self.reki[wiersze, kolej] = reka & ~bit
+        self.lewa_maska[wiersze] |= bit
+        wiodaca = self.najwyzsza_wiodaca[wiersze]
+        wiodaca = np.where(pusta_lewa | (((_MASKA_KOLORU[np.maximum(wiodaca, 0)] & bit) != 0) & (karta > wiodaca)), karta, wiodaca)
+        atut = self.najwyzszy_atut[wiersze]
+        atut = np.where(((self.maska_atutu[wiersze] & bit) != 0) & (karta > atut), karta, atut)
+        self.najwyzsza_wiodaca[wiersze], self.najwyzszy_atut[wiersze] = wiodaca, atut
+        self.prowadzacy[wiersze] = np.where(np.where(atut >= 0, atut, wiodaca) == karta, kolej, self.prowadzacy[wiersze])
+        self.punkty_w_lewie[wiersze] += _WARTOSCI[karta]
+        self.w_lewie[wiersze] += 1
+
+        pelna = self.w_lewie[wiersze] == self.liczba_aktywnych[wiersze]
+        nastepny = (kolej + 1) % 4
+        nastepny = np.where(nastepny == self.nieaktywny[wiersze], (nastepny + 1) % 4, nastepny)
+        self.kolej[wiersze[~pelna]] = nastepny[~pelna]
+        if pelna.any():
+            self._zakoncz_lewe(wiersze[pelna])
+        return True
+
+    def _zakoncz_lewe(self, wiersze: np.ndarray):
+        zwyciezca = self.prowadzacy[wiersze]
+        druzyna = zwyciezca % 2
+        self.punkty[wiersze, druzyna] += self.punkty_w_lewie[wiersze]
+        self.wziete[wiersze, druzyna] = True
+        kontrakt, grajacy = self.kontrakt[wiersze], self.grajacy[wiersze]
+        przeciwnicy_grajacego = 1 - grajacy % 2
+
+        po_66 = ((kontrakt == NORMALNA) | (kontrakt == BEZ_PYTANIA)) & (self.punkty[wiersze, druzyna] >= 66)
+        przegrana_grajacego = ~po_66 & (((kontrakt == BEZ_PYTANIA) & (zwyciezca != grajacy))
+                                         | ((kontrakt == LEPSZA) & (druzyna != grajacy % 2))
+                                         | ((kontrakt == GORSZA) & (zwyciezca == grajacy)))
+        koniec_kart = ~po_66 & ~przegrana_grajacego & (self._karty_aktywnych(wiersze) == 0)
+
+        self.zwyciezca[wiersze] = np.where(po_66, druzyna, np.where(przegrana_grajacego, przeciwnicy_grajacego, -1))
+        self.zwyciezca_ostatniej_lewy[wiersze] = np.where(koniec_kart, zwyciezca, self.zwyciezca_ostatniej_lewy[wiersze])
+        self.zakonczone[wiersze] = po_66 | przegrana_grajacego | koniec_kart
+        self.kolej[wiersze] = zwyciezca
+        self.w_lewie[wiersze] = 0
+        self.lewa_maska[wiersze] = 0
+        self.najwyzsza_wiodaca[wiersze] = -1
+        self.najwyzszy_atut[wiersze] = -1
+        self.prowadzacy[wiersze] = -1
+        self.punkty_w_lewie[wiersze] = 0
+
+    def _karty_aktywnych(self, wiersze: np.ndarray) -> np.ndarray:
+        reki = self.reki[wiersze]
+        aktywni = np.arange(4)[None, :] != self.nieaktywny[wiersze][:, None]
+        return np.bitwise_or.reduce(np.where(aktywni, reki, 0), axis=1)
+
+    def rozegraj(self, polityka: Polityka = polityka_losowa) -> 'PartieWektorowe':
+        """Gra wszystkie rozdania do końca (najwyżej 24 kroki)."""
+        while self.krok(polityka):
+            pass
+        return self
+
+    def wyniki(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Odpowiednik Rozdanie.oblicz_wynik: (wygrana drużyna, punkty meczowe, mnożnik) dla każdego rozdania."""
+        kontrakt = self.kontrakt
+        druzyna_grajacego = self.grajacy % 2
+        n = np.arange(len(kontrakt))
+        zwyciezca = self.zwyciezca.copy()
+        trzyosobowe = (kontrakt == GORSZA) | (kontrakt == LEPSZA)
+        zwyciezca = np.where((zwyciezca < 0) & trzyosobowe & (self._karty_aktywnych(n) == 0), druzyna_grajacego, zwyciezca)
+        zwyciezca = np.where((zwyciezca < 0) & (self.zwyciezca_ostatniej_lewy >= 0), self.zwyciezca_ostatniej_lewy % 2, zwyciezca)
+        punkty_grajacego, punkty_przeciwnikow = self.punkty[n, druzyna_grajacego], self.punkty[n, 1 - druzyna_grajacego]
+        zwyciezca = np.where(zwyciezca < 0, np.where(punkty_grajacego >= punkty_przeciwnikow, druzyna_grajacego, 1 - druzyna_grajacego), zwyciezca)
+
+        przegrani = 1 - zwyciezca
+        mnoznik = np.where(self.wziete[n, przegrani], np.where(self.punkty[n, przegrani] < 33, 2, 1), 3)
+        mnoznik = np.where((kontrakt == NORMALNA) & (zwyciezca == druzyna_grajacego), mnoznik, 1)
+        return zwyciezca, _STAWKI[kontrakt] * mnoznik * self.mnoznik_lufy, mnoznik
+
+
+def szansa_kontraktu(kontrakt: Kontrakt, atut: Optional[Kolor], reka_grajacego: Optional[int] = None, liczba_rozdan: int = 1_000_000,
+                     polityka: Polityka = polityka_losowa, rng: Optional[np.random.Generator] = None) -> float:
+    """Odsetek losowych rozdań, które wygrywa drużyna grającego (paczkami po ROZMIAR_PACZKI)."""
+    rng = rng or np.random.default_rng()
+    wygrane = 0
+    for poczatek in range(0, liczba_rozdan, ROZMIAR_PACZKI):
+        n = min(ROZMIAR_PACZKI, liczba_rozdan - poczatek)
+        partie = PartieWektorowe.losowe(n, kontrakt, atut, 0, reka_grajacego, rng).rozegraj(polityka)
+        zwyciezca, _, _ = partie.wyniki()
+        wygrane += int((zwyciezca == 0).sum())
+    return wygrane / liczba_rozdan
@@ -0,0 +1,146 @@
+import random
+from typing import Optional
+from silnik_gry import Rozdanie, Gracz, Karta, Druzyna, FazaGry, KARTY, karty_z_maski
+
+# Flagi wpisów w tablicy transpozycji
+DOKLADNA, DOLNA, GORNA = 0, 1, 2
+LIMIT_TABLICY = 2_000_000 # Po przekroczeniu tablica transpozycji jest czyszczona
+
+# --- Klucze Zobrista ---
+# Każda para (miejsce, karta) ma losowy 64-bitowy klucz. Klucze kart w rękach są zsumowane (XOR)
+# blokami po 6 bitów (jeden kolor), więc hash całej ręki to cztery odczyty z tablicy zamiast 24.
+_rng = random.Random(66)
+_KLUCZE_REKI = [[_rng.getrandbits(64) for _ in KARTY] for _ in range(4)]
+_KLUCZE_STOLU = [[_rng.getrandbits(64) for _ in KARTY] for _ in range(4)]
+_KLUCZE_KOLEJKI = [_rng.getrandbits(64) for _ in range(4)]
+_KLUCZE_PUNKTOW = [[_rng.getrandbits(64) for _ in range(512)] for _ in range(2)]
+_KLUCZE_WZIETYCH = [_rng.getrandbits(64) for _ in range(2)]
+
+def _klucze_blokow(klucze_kart: list[int]) -> list[list[int]]:
+    bloki = []
+    for kolor in range(4):
+        blok = [0] * 64
+        for wartosc in range(64):
+            for bit in range(6):
+                if wartosc >> bit & 1: blok[wartosc] ^= klucze_kart[6 * kolor + bit]
+        bloki.append(blok)
+    return bloki
+
+_KLUCZE_REKI_BLOKAMI = [_klucze_blokow(klucze) for klucze in _KLUCZE_REKI]
+
+
+class SolverDD:
+    """Dokładny solver rozgrywki przy znanych wszystkich rękach (double dummy).
+
+    Przeszukuje drzewo alfa-beta bezpośrednio na obiekcie Rozdanie (zagraj_karte/cofnij_karte),
+    więc stosuje dokładnie te same zasady co silnik: dokładanie do koloru, atuty, meldunki,
+    koniec po 66 punktach i warunki końca BEZ_PYTANIA/LEPSZA/GORSZA. Wartość pozycji to punkty
+    meczowe z `oblicz_wynik` - dodatnie, gdy rozdanie wygrywa druzyny[0], ujemne w przeciwnym razie.
+    """
+    def __init__(self, limit_tablicy: int = LIMIT_TABLICY):
+        self.limit_tablicy = limit_tablicy
+        self.tablica: dict[int, tuple[int, int, int]] = {}
+        self.odwiedzone_wezly = 0
+        self._rozdanie: Optional[Rozdanie] = None
+        self._miejsca: dict[Gracz, int] = {}
+        self._druzyna_max: Optional[Druzyna] = None
+
+    def _przygotuj(self, rozdanie: Rozdanie):
+        if rozdanie.faza != FazaGry.ROZGRYWKA:
+            raise ValueError("Solver działa tylko w fazie ROZGRYWKA")
+        if rozdanie is not self._rozdanie:
+            # Klucze nie zawierają kontraktu ani atutu, więc tablica jest ważna tylko dla jednego rozdania
+            self.tablica.clear()
+            self._rozdanie = rozdanie
+            self._miejsca = {g: i for i, g in enumerate(rozdanie.gracze)}
+            self._druzyna_max = rozdanie.druzyny[0]
+
+    def rozwiaz(self, rozdanie: Rozdanie) -> int:
+        """Wartość pozycji przy optymalnej grze obu drużyn (z perspektywy rozdanie.druzyny[0])."""
+        self._przygotuj(rozdanie)
+        bylo_logowanie, rozdanie.logowanie = rozdanie.logowanie, False
+        try:
+            return self._szukaj(rozdanie, -10**9, 10**9)
+        finally:
+            rozdanie.logowanie = bylo_logowanie
+
+    def ocen_ruchy(self, rozdanie: Rozdanie) -> dict[Karta, int]:
+        """Dokładna wartość każdej legalnej karty gracza, który ma ruch (perspektywa jego drużyny)."""
+        self._przygotuj(rozdanie)
+        gracz = rozdanie.gracze[rozdanie.kolej_gracza_idx]
+        znak = 1 if gracz.druzyna is self._druzyna_max else -1
+        wyniki = {}
+        bylo_logowanie, rozdanie.logowanie = rozdanie.logowanie, False
+        try:
+            for karta in karty_z_maski(rozdanie.get_legalne_maska(gracz)):
+                rozdanie.zagraj_karte(gracz, karta)
+                wyniki[karta] = znak * self._szukaj(rozdanie, -10**9, 10**9)
+                rozdanie.cofnij_karte()
+        finally:
+            rozdanie.logowanie = bylo_logowanie
+        return wyniki
+
+    def _hash(self, r: Rozdanie) -> int:
+        h = _KLUCZE_KOLEJKI[r.kolej_gracza_idx]
+        for miejsce, g in enumerate(r.gracze):
+            m, bloki = g.reka_maska, _KLUCZE_REKI_BLOKAMI[miejsce]
+            h ^= bloki[0][m & 63] ^ bloki[1][m >> 6 & 63] ^ bloki[2][m >> 12 & 63] ^ bloki[3][m >> 18 & 63]
+        for g, k in r.aktualna_lewa:
+            h ^= _KLUCZE_STOLU[self._miejsca[g]][k.indeks]
+        for i, d in enumerate(r.druzyny):
+            h ^= _KLUCZE_PUNKTOW[i][r.punkty_w_rozdaniu[d.nazwa] & 511]
+            if r.wziete_lewy[d.nazwa]: h ^= _KLUCZE_WZIETYCH[i]
+        return h
+
+    def _ruchy(self, r: Rozdanie, maska: int, ruch_z_tablicy: int) -> list[int]:
+        """Kolejność ruchów: najpierw ruch z tablicy transpozycji, potem atuty i wysokie karty."""
+        ruchy = [k.indeks for k in karty_z_maski(maska)]
+        ruchy.sort(key=lambda i: (i != ruch_z_tablicy, not (r.maska_atutu >> i & 1), -(i % 6)))
+        return ruchy
+
+    def _szukaj(self, r: Rozdanie, alfa: int, beta: int) -> int:
+        self.odwiedzone_wezly += 1
+        if r.rozdanie_zakonczone:
+            druzyna, punkty, _ = r.oblicz_wynik()
+            return punkty if druzyna is self._druzyna_max else -punkty
+
+        klucz = self._hash(r)
+        wpis = self.tablica.get(klucz)
+        ruch_z_tablicy = -1
+        if wpis is not None:
+            wartosc, flaga, ruch_z_tablicy = wpis
+            if flaga == DOKLADNA: return wartosc
+            if flaga == DOLNA and wartosc >= beta: return wartosc
+            if flaga == GORNA and wartosc <= alfa: return wartosc
+
+        gracz = r.gracze[r.kolej_gracza_idx]
+        maksymalizuje = gracz.druzyna is self._druzyna_max
+        alfa_poczatkowa, beta_poczatkowa = alfa, beta
+        najlepsza, najlepszy_ruch = (-10**9 if maksymalizuje else 10**9), -1
+        for idx in self._ruchy(r, r.get_legalne_maska(gracz), ruch_z_tablicy):
+            r.zagraj_karte(gracz, KARTY[idx])
+            wartosc = self._szukaj(r, alfa, beta)
+            r.cofnij_karte()
+            if maksymalizuje:
+                if wartosc > najlepsza: najlepsza, najlepszy_ruch = wartosc, idx
+                if najlepsza > alfa: alfa = najlepsza
+            else:
+                if wartosc < najlepsza: najlepsza, najlepszy_ruch = wartosc, idx
+                if najlepsza < beta: beta = najlepsza
+            if alfa >= beta: break
+
+        if najlepsza <= alfa_poczatkowa: flaga = GORNA
+        elif najlepsza >= beta_poczatkowa: flaga = DOLNA
+        else: flaga = DOKLADNA
+        if len(self.tablica) >= self.limit_tablicy: self.tablica.clear()
+        self.tablica[klucz] = (najlepsza, flaga, najlepszy_ruch)
+        return najlepsza
+
+
+def analizuj_ruch(rozdanie: Rozdanie, karta: Karta, solver: Optional[SolverDD] = None) -> tuple[int, int]:
+    """Ocena zagrania `karta` przez gracza, który ma ruch: (wartość tej karty, wartość najlepszej karty).
+
+    Różnica większa od zera oznacza błąd kosztujący tyle punktów meczowych przy najlepszej grze.
+    """
+    wyniki = (solver or SolverDD()).ocen_ruchy(rozdanie)
+    return wyniki[karta], max(wyniki.values())
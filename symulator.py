@@ -0,0 +1,174 @@
+import os
+import sys
+import json
+import random
+import logging
+import argparse
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from silnik_gry import Mecz, FazaGry, KARTY, Kontrakt, losowa_karta_z_maski, rozegraj_rozdanie_kompaktowo
+from boty import Bot, BotTabelaSily
+
+# --- KONFIGURACJA ---
+MECZE_NA_ZADANIE = 500     # Tyle meczów rozgrywa jeden worker w ramach jednego zadania
+LIMIT_RUCHOW_W_ROZDANIU = 200 # Zabezpieczenie przed zapętleniem licytacji (rozdanie to 24 karty i zwykle kilka akcji)
+
+
+@dataclass
+class WynikiSymulacji:
+    """Zagregowane statystyki z wielu meczów. Klucze to nazwy kontraktów, żeby wynik łatwo łączyć i zapisywać do JSON."""
+    liczba_meczow: int = 0
+    liczba_rozdan: int = 0
+    przerwane_mecze: int = 0
+    wygrane_meczow: Counter = field(default_factory=Counter)     # nazwa drużyny -> liczba wygranych meczów
+    rozegrane_kontrakty: Counter = field(default_factory=Counter) # kontrakt -> liczba rozdań
+    wygrane_grajacego: Counter = field(default_factory=Counter)   # kontrakt -> rozdania wygrane przez drużynę grającego
+    wyniki_kontraktow: Counter = field(default_factory=Counter)   # (kontrakt, punkty meczowe z perspektywy grającego) -> liczba
+    rozdania_z_lufa: Counter = field(default_factory=Counter)     # kontrakt -> rozdania, w których padła lufa/kontra
+    mnozniki_lufy: Counter = field(default_factory=Counter)       # mnożnik lufy -> liczba rozdań
+    # (kontrakt, mnożnik punktowy, mnożnik lufy, wygrał grający, grający z drużyny zaczynającej licytację) -> liczba
+    wyniki_rozdan: Counter = field(default_factory=Counter)
+
+    def polacz(self, inne: 'WynikiSymulacji') -> 'WynikiSymulacji':
+        self.liczba_meczow += inne.liczba_meczow
+        self.liczba_rozdan += inne.liczba_rozdan
+        self.przerwane_mecze += inne.przerwane_mecze
+        for nazwa in ('wygrane_meczow', 'rozegrane_kontrakty', 'wygrane_grajacego', 'wyniki_kontraktow', 'rozdania_z_lufa', 'mnozniki_lufy', 'wyniki_rozdan'):
+            getattr(self, nazwa).update(getattr(inne, nazwa))
+        return self
+
+    def jako_slownik(self) -> dict:
+        """Podsumowanie gotowe do wypisania lub zapisu jako JSON."""
+        kontrakty = {}
+        for k in Kontrakt:
+            rozegrane = self.rozegrane_kontrakty[k.name]
+            rozklad = {pkt: n for (nazwa, pkt), n in sorted(self.wyniki_kontraktow.items()) if nazwa == k.name}
+            kontrakty[k.name] = {
+                "rozegrane": rozegrane,
+                "procent_wygranych": round(100 * self.wygrane_grajacego[k.name] / rozegrane, 2) if rozegrane else None,
+                "procent_z_lufa": round(100 * self.rozdania_z_lufa[k.name] / rozegrane, 2) if rozegrane else None,
+                "rozklad_wynikow": rozklad,
+            }
+        return {
+            "liczba_meczow": self.liczba_meczow,
+            "liczba_rozdan": self.liczba_rozdan,
+            "przerwane_mecze": self.przerwane_mecze,
+            "wygrane_meczow": dict(self.wygrane_meczow),
+            "procent_rozdan_z_lufa": round(100 * sum(self.rozdania_z_lufa.values()) / self.liczba_rozdan, 2) if self.liczba_rozdan else None,
+            "mnozniki_lufy": dict(sorted(self.mnozniki_lufy.items())),
+            "kontrakty": kontrakty,
+        }
+
+
+# Bot licytujący w workerze (z --tabela); bez niego licytacja jest losowa jak rozgrywka
+_bot_licytacji: Optional[Bot] = None
+
+def _dopisz_rozdanie(wyniki: WynikiSymulacji, kontrakt: str, punkty: int, mnoznik: int, mnoznik_lufy: int, wygral_grajacy: bool, inicjatywa: bool):
+    wyniki.liczba_rozdan += 1
+    wyniki.rozegrane_kontrakty[kontrakt] += 1
+    wyniki.wygrane_grajacego[kontrakt] += wygral_grajacy
+    wyniki.wyniki_kontraktow[(kontrakt, punkty if wygral_grajacy else -punkty)] += 1
+    wyniki.rozdania_z_lufa[kontrakt] += mnoznik_lufy > 1 # Każda lufa i kontra podwaja mnożnik
+    wyniki.mnozniki_lufy[mnoznik_lufy] += 1
+    wyniki.wyniki_rozdan[(kontrakt, mnoznik, mnoznik_lufy, wygral_grajacy, inicjatywa)] += 1
+
+def rozegraj_mecz_kompaktowo(wyniki: WynikiSymulacji):
+    """Mecz z losową licytacją w trybie kompaktowym silnika (rozegraj_rozdanie_kompaktowo).
+
+    Zużywa globalny generator random tak samo jak rozegraj_mecz bez bota, więc daje te same statystyki, tylko szybciej.
+    """
+    punkty_meczu, rozdajacy = [0, 0], 3 # Jak w Mecz: pierwsze rozdanie rozdaje gracz 0
+    while punkty_meczu[0] < 66 and punkty_meczu[1] < 66:
+        rozdajacy = (rozdajacy + 1) % 4
+        kontrakt, grajacy, zwyciezca, punkty, mnoznik, mnoznik_lufy = rozegraj_rozdanie_kompaktowo(rozdajacy, tuple(punkty_meczu))
+        punkty_meczu[zwyciezca] += punkty
+        _dopisz_rozdanie(wyniki, kontrakt.name, punkty, mnoznik, mnoznik_lufy, zwyciezca == grajacy % 2, grajacy % 2 == (rozdajacy + 1) % 2)
+    wyniki.liczba_meczow += 1
+    wyniki.wygrane_meczow["My" if punkty_meczu[0] >= 66 else "Oni"] += 1
+
+def rozegraj_mecz(wyniki: WynikiSymulacji, bot_licytacji: Optional[Bot] = None):
+    """Rozgrywa jeden mecz losowymi kartami (licytuje `bot_licytacji` albo los) i dopisuje jego statystyki do `wyniki`."""
+    mecz = Mecz(nazwy_graczy=["Gracz1", "Gracz2", "Gracz3", "Gracz4"])
+    mecz.rozpocznij_mecz()
+    licznik_ruchow = 0 # Ruchy w aktualnym rozdaniu - mecz ma ich tyle więcej, ile trwa rozdań
+    while not mecz.zwyciezca_meczu:
+        licznik_ruchow += 1
+        if licznik_ruchow > LIMIT_RUCHOW_W_ROZDANIU:
+            wyniki.przerwane_mecze += 1
+            return
+        rozdanie = mecz.rozdanie
+
+        if rozdanie.rozdanie_zakonczone:
+            zwyciezca, punkty, mnoznik = rozdanie.rozlicz_rozdanie()
+            inicjatywa = rozdanie.miejsca[rozdanie.grajacy] % 2 == (rozdanie.rozdajacy_idx + 1) % 2
+            _dopisz_rozdanie(wyniki, rozdanie.kontrakt.name, punkty, mnoznik, rozdanie.mnoznik_lufy, zwyciezca is rozdanie.grajacy.druzyna, inicjatywa)
+            mecz.sprawdz_koniec_meczu()
+            if not mecz.zwyciezca_meczu:
+                mecz.przygotuj_nastepne_rozdanie()
+            licznik_ruchow = 0
+            continue
+
+        aktualny_gracz = rozdanie.gracze[rozdanie.kolej_gracza_idx]
+        if rozdanie.faza == FazaGry.ROZGRYWKA:
+            rozdanie.zagraj_karte(aktualny_gracz, KARTY[losowa_karta_z_maski(rozdanie.get_legalne_maska(aktualny_gracz))])
+        elif bot_licytacji:
+            rozdanie.wykonaj_akcje(aktualny_gracz, bot_licytacji.wybierz_akcje(rozdanie, aktualny_gracz))
+        else:
+            rozdanie.wykonaj_akcje(aktualny_gracz, random.choice(rozdanie.get_mozliwe_akcje(aktualny_gracz)))
+
+    wyniki.liczba_meczow += 1
+    wyniki.wygrane_meczow[mecz.zwyciezca_meczu.nazwa] += 1
+
+def _przygotuj_workera(plik_tabeli: Optional[str]):
+    global _bot_licytacji
+    logging.disable(logging.CRITICAL)
+    if plik_tabeli:
+        from sila_reki import TabelaSily # numpy potrzebny tylko z tabelą
+        _bot_licytacji = BotTabelaSily(TabelaSily.wczytaj(plik_tabeli))
+
+def _symuluj_zadanie(zadanie: tuple[int, int]) -> WynikiSymulacji:
+    """Kod workera: rozgrywa `liczba_meczow` meczów z własnym ziarnem."""
+    ziarno, liczba_meczow = zadanie
+    random.seed(ziarno)
+    wyniki = WynikiSymulacji()
+    for _ in range(liczba_meczow):
+        if _bot_licytacji: rozegraj_mecz(wyniki, _bot_licytacji)
+        else: rozegraj_mecz_kompaktowo(wyniki)
+    return wyniki
+
+def symuluj(liczba_meczow: int, liczba_procesow: Optional[int] = None, ziarno: int = 0, plik_tabeli: Optional[str] = None) -> WynikiSymulacji:
+    """Rozkłada `liczba_meczow` meczów na pulę procesów i zwraca połączone wyniki.
+
+    Z `plik_tabeli` (sila_reki.py) wszyscy gracze licytują według tabeli siły rąk zamiast losowo.
+
+    Każde zadanie dostaje własne ziarno (ziarno bazowe + numer zadania), więc wynik
+    zależy tylko od argumentów, a nie od kolejności wykonania zadań.
+    """
+    zadania = []
+    for nr, poczatek in enumerate(range(0, liczba_meczow, MECZE_NA_ZADANIE)):
+        zadania.append((ziarno * 1_000_003 + nr, min(MECZE_NA_ZADANIE, liczba_meczow - poczatek)))
+
+    wyniki = WynikiSymulacji()
+    with ProcessPoolExecutor(max_workers=liczba_procesow, initializer=_przygotuj_workera, initargs=(plik_tabeli,)) as pula:
+        for wynik_zadania in pula.map(_symuluj_zadanie, zadania):
+            wyniki.polacz(wynik_zadania)
+    return wyniki
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bezgłowa symulacja meczów 66 z losowymi graczami.")
+    parser.add_argument("--mecze", type=int, default=10_000, help="liczba meczów do rozegrania")
+    parser.add_argument("--procesy", type=int, default=os.cpu_count(), help="liczba procesów w puli")
+    parser.add_argument("--ziarno", type=int, default=0, help="ziarno bazowe generatora losowego")
+    parser.add_argument("--json", help="ścieżka pliku, do którego zapisać wyniki")
+    parser.add_argument("--tabela", help="licytacja z tabeli siły rąk (np. sila_reki.npz) zamiast losowej")
+    args = parser.parse_args()
+
+    wyniki = symuluj(args.mecze, args.procesy, args.ziarno, args.tabela).jako_slownik()
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(wyniki, f, ensure_ascii=False, indent=2)
+    json.dump(wyniki, sys.stdout, ensure_ascii=False, indent=2)
+    print()
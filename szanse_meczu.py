@@ -0,0 +1,149 @@
+"""Szanse wygrania meczu i progi lufy zależne od wyniku meczu (programowanie dynamiczne po wynikach).
+
+Stan meczu to (nasze punkty, ich punkty, czy licytujemy pierwsi) z siatki 0..66 x 0..66 x 2: licytację
+zaczyna gracz po lewej rozdającego, a rozdający zmienia się co rozdanie, więc drużyny zaczynają na
+zmianę. Rozdanie kończy się wynikiem (kontrakt, mnożnik punktowy, mnożnik lufy, czy wygrał grający,
+czy grający jest z drużyny zaczynającej licytację) z rozkładu zmierzonego w symulacji (symulator.py)
+albo w zbiorze rozdań z logów (dane_rozdan.py). Drużyna zaczynająca gra większość rozdań, więc to,
+jak często grający wygrywa, przesuwa szanse w stronę drużyny, która zaczyna. Lufę przycinamy w
+każdym stanie tak jak silnik (Rozdanie._czy_lufa_mozliwa: stawka x mnożnik <= 66 - punkty drużyny,
+która ma ich mniej).
+
+Każde rozdanie daje komuś co najmniej punkt, więc siatka stanów jest acykliczna i iteracja wartości
+zbiega w jednym przejściu od wyników końcowych w dół - `rozwiaz` liczy ją raz dla całej siatki.
+Próg lufy dla stawki s to najmniejsza szansa wygrania rozdania, przy której podwojenie s -> 2s nie
+zmniejsza szansy wygrania meczu (bez odpowiedzi przeciwnika). Tabela `TabelaMeczu` odpowiada w O(1).
+
+Użycie:
+    python szanse_meczu.py --mecze 2000 --procesy 8        # symulacja z licytacją z sila_reki.npz
+    python szanse_meczu.py --dane dane_rozdan              # rozkład ze zbioru rozdań z logów
+"""
+import os
+import time
+import argparse
+from typing import Optional
+import numpy as np
+from silnik_gry import Kontrakt, STAWKI_KONTRAKTOW
+
+# --- KONFIGURACJA ---
+PLIK_TABELI = 'szanse_meczu.npz'
+LIMIT_PUNKTOW = 66 # Jak w Mecz.sprawdz_koniec_meczu
+
+# Kolumny tablicy rozkładu: kontrakt (Kontrakt.value), mnożnik punktowy, mnożnik lufy, wygrał grający,
+# grający z drużyny zaczynającej licytację, liczba rozdań
+ROZKLAD_KOLUMNY = ('kontrakt', 'mnoznik', 'mnoznik_lufy', 'wygrana', 'inicjatywa', 'liczba')
+
+
+def rozklad_z_symulacji(wyniki) -> np.ndarray:
+    """Rozkład wyników rozdań z symulator.WynikiSymulacji (licznik wyniki_rozdan)."""
+    return np.array([(Kontrakt[k].value, m, l, int(w), int(i), n) for (k, m, l, w, i), n in sorted(wyniki.wyniki_rozdan.items())],
+                    dtype=np.int64).reshape(-1, len(ROZKLAD_KOLUMNY))
+
+def rozklad_z_danych(zbior) -> np.ndarray:
+    """Rozkład wyników rozdań ze zbioru dane_rozdan.ZbiorRozdan (rozdania, w których wiadomo, kto grał)."""
+    znane = np.asarray(zbior.kolumna('wygrana_grajacego')) >= 0
+    kolumny = [np.asarray(zbior.kolumna(nazwa))[znane].astype(np.int64)
+               for nazwa in ('kontrakt', 'mnoznik', 'mnoznik_lufy', 'wygrana_grajacego', 'druzyna_grajacego', 'rozdajacy')]
+    # Licytację zaczyna drużyna gracza po lewej rozdającego (miejsca 0 i 2 to drużyna 0)
+    kolumny[4] = (kolumny[4] == (kolumny.pop() + 1) % 2).astype(np.int64)
+    wiersze = np.stack(kolumny, axis=1)
+    wartosci, liczby = np.unique(wiersze, axis=0, return_counts=True)
+    return np.column_stack([wartosci, liczby])
+
+
+def _mnoznik_lufy(stawka: int, mnoznik_lufy: int, limit: int) -> int:
+    """Mnożnik lufy po przycięciu do limitu stawki (kolejne podwojenia, dopóki stawka x mnożnik <= limit)."""
+    wynik = 1
+    while wynik < mnoznik_lufy and stawka * wynik * 2 <= limit:
+        wynik *= 2
+    return wynik
+
+def rozwiaz(rozklad: np.ndarray, limit_punktow: int = LIMIT_PUNKTOW) -> np.ndarray:
+    """Szansa wygrania meczu przez drużynę z `a` punktami przy wyniku (a, b), gdy zaczyna (z = 1) albo nie
+    zaczyna (z = 0) licytacji następnego rozdania: tablica (limit+1) x (limit+1) x 2, gdzie indeks `limit`
+    oznacza 'limit albo więcej'."""
+    prawdopodobienstwa = rozklad[:, -1] / rozklad[:, -1].sum()
+    wyniki = [(STAWKI_KONTRAKTOW[Kontrakt(int(k))], int(m), int(l), bool(w), int(i), p)
+              for (k, m, l, w, i, _), p in zip(rozklad, prawdopodobienstwa)]
+    szanse = np.zeros((limit_punktow + 1, limit_punktow + 1, 2))
+    szanse[limit_punktow, :limit_punktow] = 1.0
+    for a in range(limit_punktow - 1, -1, -1):
+        for b in range(limit_punktow - 1, -1, -1):
+            limit = limit_punktow - min(a, b)
+            for z in (0, 1):
+                wartosc = 0.0
+                for stawka, mnoznik, mnoznik_lufy, wygrana, inicjatywa, p in wyniki:
+                    punkty = stawka * mnoznik * _mnoznik_lufy(stawka, mnoznik_lufy, limit)
+                    # Po rozdaniu licytację zaczyna druga drużyna
+                    nasze, ich = szanse[min(a + punkty, limit_punktow), b, 1 - z], szanse[a, min(b + punkty, limit_punktow), 1 - z]
+                    if inicjatywa == z: # Gramy my: wygrana to punkty dla nas, przegrana - dla nich
+                        wartosc += p * (nasze if wygrana else ich)
+                    else: # Grają oni: ich wygrana to punkty dla nich, przegrana - dla nas
+                        wartosc += p * (ich if wygrana else nasze)
+                szanse[a, b, z] = wartosc
+    return szanse
+
+def progi_lufy(szanse: np.ndarray) -> np.ndarray:
+    """Próg lufy [a, b, z, s]: najmniejsza szansa wygrania rozdania o stawce s, przy której podwojenie się opłaca
+    (z = 1, gdy po tym rozdaniu licytację zaczynamy my)."""
+    limit = szanse.shape[0] - 1
+    a, b, z = np.meshgrid(np.arange(limit), np.arange(limit), np.arange(2), indexing='ij')
+    progi = np.zeros((limit, limit, 2, limit + 1), dtype=np.float32)
+    for s in range(1, limit + 1):
+        wygrana, wygrana_x2 = szanse[np.minimum(a + s, limit), b, z], szanse[np.minimum(a + 2 * s, limit), b, z]
+        przegrana, przegrana_x2 = szanse[a, np.minimum(b + s, limit), z], szanse[a, np.minimum(b + 2 * s, limit), z]
+        zysk, strata = wygrana_x2 - wygrana, przegrana - przegrana_x2
+        # Bez zysku i straty (np. każdy wynik rozdania kończy mecz) podwojenie niczego nie zmienia
+        progi[..., s] = np.where(zysk + strata > 0, strata / np.maximum(zysk + strata, 1e-12), 0.0)
+    return progi
+
+
+class TabelaMeczu:
+    """Szanse meczu i progi lufy policzone z rozkładu wyników rozdań; zapytania w O(1)."""
+    def __init__(self, rozklad: np.ndarray, szanse: Optional[np.ndarray] = None):
+        self.rozklad = rozklad
+        self.szanse = rozwiaz(rozklad) if szanse is None else szanse
+        self.progi = progi_lufy(self.szanse)
+        self.limit = self.szanse.shape[0] - 1
+
+    @classmethod
+    def wczytaj(cls, sciezka: str = PLIK_TABELI) -> 'TabelaMeczu':
+        with np.load(sciezka) as dane:
+            return cls(dane['rozklad'], dane['szanse'])
+
+    def zapisz(self, sciezka: str = PLIK_TABELI):
+        np.savez_compressed(sciezka, rozklad=self.rozklad, szanse=self.szanse)
+
+    def szansa(self, nasze: int, ich: int, zaczynamy: bool) -> float:
+        """Szansa wygrania meczu przez drużynę z `nasze` punktami przed rozdaniem, w którym (nie) zaczyna licytacji."""
+        return float(self.szanse[min(nasze, self.limit), min(ich, self.limit), int(zaczynamy)])
+
+    def prog_lufy(self, nasze: int, ich: int, stawka: int, zaczynamy_nastepne: bool) -> float:
+        """Najmniejsza szansa wygrania rozdania, przy której warto podwoić `stawka` punktów meczowych."""
+        return float(self.progi[min(nasze, self.limit - 1), min(ich, self.limit - 1), int(zaczynamy_nastepne), min(max(stawka, 1), self.limit)])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Liczy tabelę szans meczu i progów lufy z rozkładu wyników rozdań.")
+    parser.add_argument("--mecze", type=int, default=2000, help="liczba meczów symulacji")
+    parser.add_argument("--procesy", type=int, default=os.cpu_count(), help="liczba procesów symulacji")
+    parser.add_argument("--ziarno", type=int, default=0, help="ziarno bazowe symulacji")
+    parser.add_argument("--tabela", default='sila_reki.npz', help="tabela siły rąk do licytacji w symulacji (pusty napis: losowo)")
+    parser.add_argument("--dane", default=None, help="katalog zbioru dane_rozdan.py zamiast symulacji")
+    parser.add_argument("--plik", default=PLIK_TABELI, help="ścieżka pliku wynikowego (.npz)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.dane:
+        from dane_rozdan import ZbiorRozdan
+        rozklad = rozklad_z_danych(ZbiorRozdan(args.dane))
+    else:
+        from symulator import symuluj
+        rozklad = rozklad_z_symulacji(symuluj(args.mecze, args.procesy, args.ziarno, args.tabela or None))
+    tabela = TabelaMeczu(rozklad)
+    tabela.zapisz(args.plik)
+    print(f"✅ Zapisano {args.plik}: {int(rozklad[:, -1].sum())} rozdań w rozkładie, {time.perf_counter() - start:.0f} s")
+    for wynik in ((0, 0), (33, 33), (60, 30), (30, 60)):
+        for zaczynamy in (True, False):
+            progi = ", ".join(f"s={s}: {tabela.prog_lufy(*wynik, s, not zaczynamy):.2f}" for s in (1, 6, 12))
+            print(f"  {wynik[0]:>2}:{wynik[1]:<2} {'zaczynamy' if zaczynamy else 'zaczynają'}  szansa meczu {tabela.szansa(*wynik, zaczynamy):.3f}  progi lufy {progi}")
@@ -0,0 +1,11 @@
+"""Interfejs botów (python -m pytest -q)."""
+import pytest
+from boty import Bot, BotLosowy
+
+
+def test_bot_bez_metody_nie_powstaje():
+    class BezAkcji(Bot):
+        def wybierz_karte(self, rozdanie, gracz): return None
+    with pytest.raises(TypeError):
+        BezAkcji()
+    assert isinstance(BotLosowy(), Bot)
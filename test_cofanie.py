@@ -0,0 +1,58 @@
+"""Cofanie ruchów (cofnij_karte / cofnij_akcje / cofnij_do) przywraca cały stan rozdania (python -m pytest -q)."""
+import copy
+import random
+import logging
+import pytest
+from silnik_gry import Mecz, FazaGry, KARTY, AKCJE_LICYTACJI, WPIS_KARTA, losowa_karta_z_maski, ruchy_z_dziennika
+from zapis_binarny import wykonaj_ruch
+
+logging.disable(logging.CRITICAL)
+
+
+def stan(r) -> tuple:
+    """Głęboka kopia wszystkich pól rozdania; gracze, drużyny, talia, karty i akcje są porównywane jako te same obiekty."""
+    wspolne = {id(o): o for o in (*r.gracze, *r.druzyny, r.talia, *KARTY, *AKCJE_LICYTACJI)}
+    return (copy.deepcopy(vars(r), wspolne), [(g.reka_maska, g.wygrane_maska) for g in r.gracze],
+            [d.punkty_meczu for d in r.druzyny], r.talia.pozostale, list(r.talia.karty))
+
+def nowe_rozdanie(ziarno: int):
+    mecz = Mecz(["Ty", "Lewy", "Partner", "Prawy"], ziarno=ziarno)
+    mecz.rozpocznij_mecz()
+    mecz.rozdanie.logowanie = False
+    return mecz.rozdanie
+
+def losowy_ruch(r, los: random.Random):
+    g = r.gracze[r.kolej_gracza_idx]
+    if r.faza == FazaGry.ROZGRYWKA: r.zagraj_karte(g, KARTY[losowa_karta_z_maski(r.get_legalne_maska(g), los)])
+    else: r.wykonaj_akcje(g, los.choice(r.get_mozliwe_akcje(g)))
+
+
+@pytest.mark.parametrize('ziarno', range(30))
+def test_cofniecie_ruchu_przywraca_stan(ziarno):
+    los, r = random.Random(ziarno), nowe_rozdanie(ziarno)
+    stany = [stan(r)] # stany[n]: stan przy n wpisach na stosie cofania
+    while not r.rozdanie_zakonczone:
+        losowy_ruch(r, los)
+        assert len(r.stos_cofania) == len(stany)
+        stany.append(stan(r))
+        if los.random() < 0.3: # Cofnięcie ruchu i (zwykle) inny ruch w jego miejsce
+            if r.stos_cofania[-1][0] == WPIS_KARTA: r.cofnij_karte()
+            else: r.cofnij_akcje()
+            stany.pop()
+            assert stan(r) == stany[-1]
+    for dlugosc in sorted(random.Random(ziarno).sample(range(len(stany)), min(5, len(stany))), reverse=True):
+        r.cofnij_do(dlugosc)
+        assert stan(r) == stany[dlugosc]
+    r.cofnij_do(0)
+    assert stan(r) == stany[0]
+
+@pytest.mark.parametrize('ziarno', range(10))
+def test_ponowienie_po_cofnieciu_daje_ten_sam_koniec(ziarno):
+    los, r = random.Random(ziarno), nowe_rozdanie(ziarno)
+    while not r.rozdanie_zakonczone:
+        losowy_ruch(r, los)
+    koniec, ruchy = stan(r), ruchy_z_dziennika(r.dziennik)
+    r.cofnij_do(0)
+    for ruch in ruchy:
+        wykonaj_ruch(r, ruch)
+    assert stan(r) == koniec
@@ -0,0 +1,74 @@
+"""Magazyn sesji: migawki w SQLite zachowują cały mecz, także ziarno i stan generatora talii (python -m pytest -q)."""
+import random
+import logging
+import threading
+from silnik_gry import Mecz
+from sesje import Sesja, MagazynSesji
+from zapis_binarny import ruchy_meczu
+from test_zapis_binarny import NAZWY, krok
+
+logging.disable(logging.CRITICAL)
+
+
+def rozegrany_mecz(ziarno: int, ruchy: int) -> Mecz:
+    los, mecz = random.Random(ziarno), Mecz(NAZWY, ziarno=ziarno)
+    mecz.rozpocznij_mecz()
+    for _ in range(ruchy):
+        if mecz.zwyciezca_meczu: break
+        krok(mecz, los)
+    return mecz
+
+def test_wspoldzielona_migawka_zachowuje_ziarno_i_generator(tmp_path):
+    sciezka = str(tmp_path / 'sesje.db')
+    pierwszy, drugi = MagazynSesji(sciezka, wspoldzielony=True), MagazynSesji(sciezka, wspoldzielony=True)
+    sesja = Sesja(rozegrany_mecz(5, 0))
+    pierwszy.dodaj('stol', sesja)
+    los = random.Random(1)
+    with sesja.blokada:
+        for _ in range(150): krok(sesja.mecz, los)
+        sesja.oznacz_zmiane()
+    assert pierwszy.zatwierdz('stol', sesja)
+    wczytana = drugi.pobierz('stol').mecz
+    assert wczytana.ziarno == 5 and wczytana.rng.getstate() == sesja.mecz.rng.getstate()
+    assert ruchy_meczu(wczytana) == ruchy_meczu(sesja.mecz)
+
+def test_wygaszona_sesja_wraca_z_migawki(tmp_path):
+    magazyn = MagazynSesji(str(tmp_path / 'sesje.db'), maks_sesji=1)
+    mecz = rozegrany_mecz(7, 200)
+    magazyn.dodaj('a', Sesja(mecz))
+    magazyn.dodaj('b', Sesja(rozegrany_mecz(8, 0))) # Wypycha 'a' z pamięci do bazy
+    assert len(magazyn) == 1
+    wczytany = magazyn.pobierz('a').mecz
+    assert wczytany is not mecz and wczytany.rng.getstate() == mecz.rng.getstate()
+    assert ruchy_meczu(wczytany) == ruchy_meczu(mecz)
+
+def w_watku(funkcja, *argumenty):
+    """Wynik funkcji z osobnego wątku; AssertionError, jeśli nie skończyła się w 5 s (zakleszczenie)."""
+    wynik = []
+    watek = threading.Thread(target=lambda: wynik.append(funkcja(*argumenty)), daemon=True)
+    watek.start(); watek.join(timeout=5)
+    assert not watek.is_alive(), f"{funkcja.__name__} czeka na blokadę"
+    return wynik[0]
+
+def test_porzadkuj_nie_blokuje_magazynu_zajeta_sesja(tmp_path):
+    magazyn = MagazynSesji(str(tmp_path / 'sesje.db'), ttl_s=0)
+    zajeta, wolna = Sesja(rozegrany_mecz(1, 10)), Sesja(rozegrany_mecz(2, 10))
+    magazyn.dodaj('zajeta', zajeta); magazyn.dodaj('wolna', wolna)
+    zajeta.blokada.acquire()
+    porzadkowanie = threading.Thread(target=magazyn.porzadkuj, daemon=True)
+    porzadkowanie.start()
+    assert w_watku(magazyn.pobierz, 'wolna') is wolna # Porządkowanie czeka na sesję, ale nie trzyma magazynu
+    zajeta.blokada.release()
+    porzadkowanie.join(timeout=5)
+    assert not porzadkowanie.is_alive() and not zajeta.zmieniona
+
+def test_wypychanie_pomija_zajeta_sesje(tmp_path):
+    magazyn = MagazynSesji(str(tmp_path / 'sesje.db'), maks_sesji=1)
+    zajeta = Sesja(rozegrany_mecz(1, 10))
+    magazyn.dodaj('zajeta', zajeta)
+    with zajeta.blokada:
+        w_watku(magazyn.dodaj, 'nowa', Sesja(rozegrany_mecz(2, 0)))
+        assert len(magazyn) == 2 and zajeta.zmieniona # Zajęta sesja zostaje w pamięci
+    w_watku(magazyn.dodaj, 'kolejna', Sesja(rozegrany_mecz(3, 0)))
+    assert len(magazyn) == 1 and not zajeta.zmieniona
+    assert magazyn.pobierz('zajeta') is not zajeta # Wróciła z migawki
@@ -0,0 +1,54 @@
+"""Silnik gry: karty i akcje licytacji (python -m pytest -q)."""
+import copy
+import pickle
+import random
+import logging
+import pytest
+from silnik_gry import (Mecz, FazaGry, KARTY, AKCJE_LICYTACJI, Kontrakt, Kolor, akcja, kod_akcji, losowa_karta_z_maski,
+                        rozegraj_rozdanie_kompaktowo)
+
+logging.disable(logging.CRITICAL)
+LICZBA_ROZDAN = 200
+
+
+def test_rownosc_akcji_to_tozsamosc():
+    pytanie = akcja('pytanie')
+    assert pytanie == akcja('pytanie') and copy.copy(pytanie) is pytanie and pickle.loads(pickle.dumps(pytanie)) is pytanie
+    # Słownik nie jest równy akcji w żadną stronę; na akcję zamienia go kod_akcji
+    for slownik in ({'typ': 'pytanie'}, {'typ': 'pytanie', 'kontrakt': None}):
+        assert pytanie != slownik and slownik != pytanie and not pytanie == slownik
+        assert AKCJE_LICYTACJI[kod_akcji(slownik)] is pytanie
+    assert akcja('deklaracja', Kontrakt.NORMALNA, Kolor.CZERWIEN) != akcja('deklaracja', Kontrakt.NORMALNA, Kolor.WINO)
+
+def rozdania_obiektowo(rng: random.Random) -> list[tuple]:
+    """Losowe rozdania przez Mecz/Rozdanie (kolejne mecze na tym samym generatorze), w formacie rozegraj_rozdanie_kompaktowo."""
+    wyniki, mecz = [], None
+    while len(wyniki) < LICZBA_ROZDAN:
+        if mecz is None or mecz.zwyciezca_meczu:
+            mecz = Mecz(["a", "b", "c", "d"], rng=rng)
+            mecz.rozpocznij_mecz()
+        r = mecz.rozdanie
+        if r.rozdanie_zakonczone:
+            zwyciezca, punkty, mnoznik = r.rozlicz_rozdanie()
+            wyniki.append((r.kontrakt, r.miejsca[r.grajacy], r.druzyny.index(zwyciezca), punkty, mnoznik, r.mnoznik_lufy))
+            mecz.sprawdz_koniec_meczu()
+            if not mecz.zwyciezca_meczu: mecz.przygotuj_nastepne_rozdanie()
+            continue
+        g = r.gracze[r.kolej_gracza_idx]
+        if r.faza == FazaGry.ROZGRYWKA: r.zagraj_karte(g, KARTY[losowa_karta_z_maski(r.get_legalne_maska(g), rng)])
+        else: r.wykonaj_akcje(g, rng.choice(r.get_mozliwe_akcje(g)))
+    return wyniki
+
+def rozdania_kompaktowo(rng: random.Random) -> list[tuple]:
+    wyniki, punkty_meczu, rozdajacy = [], [0, 0], 3
+    while len(wyniki) < LICZBA_ROZDAN:
+        rozdajacy = (rozdajacy + 1) % 4
+        wyniki.append(rozegraj_rozdanie_kompaktowo(rozdajacy, tuple(punkty_meczu), rng))
+        punkty_meczu[wyniki[-1][2]] += wyniki[-1][3]
+        if max(punkty_meczu) >= 66: punkty_meczu, rozdajacy = [0, 0], 3
+    return wyniki
+
+@pytest.mark.parametrize('ziarno', range(10))
+def test_tryb_kompaktowy_gra_jak_rozdanie(ziarno):
+    # Ten sam generator daje te same talie i ruchy, więc rozdania muszą się zgadzać co do wyniku
+    assert rozdania_kompaktowo(random.Random(ziarno)) == rozdania_obiektowo(random.Random(ziarno))
@@ -0,0 +1,36 @@
+"""Szanse meczu z programowania dynamicznego po wynikach (python -m pytest -q)."""
+import numpy as np
+from silnik_gry import Kontrakt
+from szanse_meczu import rozwiaz, progi_lufy, TabelaMeczu
+
+LIMIT = 20
+# kontrakt, mnożnik, mnożnik lufy, wygrał grający, grający z drużyny zaczynającej, liczba rozdań
+ROZKLAD = np.array([
+    (Kontrakt.NORMALNA.value, 1, 1, 1, 1, 40), (Kontrakt.NORMALNA.value, 2, 1, 1, 1, 20),
+    (Kontrakt.NORMALNA.value, 1, 1, 0, 1, 25), (Kontrakt.NORMALNA.value, 1, 2, 0, 1, 5),
+    (Kontrakt.GORSZA.value, 1, 1, 1, 0, 6), (Kontrakt.GORSZA.value, 1, 1, 0, 0, 4),
+], dtype=np.int64)
+
+
+def test_wynik_rozdania_zmienia_szanse():
+    szanse = rozwiaz(ROZKLAD, LIMIT)
+    odwrocony = ROZKLAD.copy()
+    odwrocony[:, 3] ^= 1 # Grający przegrywa tam, gdzie wygrywał
+    assert not np.allclose(rozwiaz(odwrocony, LIMIT), szanse)
+    # Grający wygrywa częściej, więc zaczynanie licytacji przy równym wyniku pomaga
+    assert szanse[0, 0, 1] > 0.5 > szanse[0, 0, 0]
+
+def test_szanse_obu_druzyn_sumuja_sie_do_jedynki():
+    szanse = rozwiaz(ROZKLAD, LIMIT)
+    a, b = np.meshgrid(np.arange(LIMIT), np.arange(LIMIT), indexing='ij')
+    for z in (0, 1):
+        assert np.allclose(szanse[a, b, z] + szanse[b, a, 1 - z], 1.0)
+    assert (szanse[LIMIT, :LIMIT] == 1).all() and (szanse[:LIMIT, LIMIT] == 0).all()
+
+def test_progi_lufy():
+    tabela = TabelaMeczu(ROZKLAD, rozwiaz(ROZKLAD, LIMIT))
+    progi = progi_lufy(tabela.szanse)
+    assert ((progi >= 0) & (progi <= 1)).all()
+    # Przy 19:0 każda wygrana kończy mecz, więc podwojenie tylko zwiększa możliwą stratę
+    assert tabela.prog_lufy(19, 0, 3, True) > 0.5
+    assert tabela.szansa(19, 0, True) > tabela.szansa(0, 19, True)
@@ -0,0 +1,88 @@
+"""Zapis binarny meczu: zakodowanie, odkodowanie i powtórka dają ten sam mecz (python -m pytest -q)."""
+import random
+import logging
+import pytest
+from silnik_gry import Mecz, FazaGry, KARTY, losowa_karta_z_maski, ruchy_z_dziennika
+from zapis_binarny import zakoduj_mecz, odkoduj_mecz, ruchy_meczu, czytaj_podsumowanie
+from powtorka import Powtorka
+
+logging.disable(logging.CRITICAL)
+NAZWY = ["Ty", "Lewy", "Partner", "Prawy"]
+
+
+def krok(mecz: Mecz, los: random.Random):
+    """Losowy legalny ruch albo rozliczenie rozdania - tak jak serwer."""
+    r = mecz.rozdanie
+    if r.rozdanie_zakonczone:
+        r.rozlicz_rozdanie()
+        mecz.sprawdz_koniec_meczu()
+        if not mecz.zwyciezca_meczu: mecz.przygotuj_nastepne_rozdanie()
+        return
+    g = r.gracze[r.kolej_gracza_idx]
+    if r.faza == FazaGry.ROZGRYWKA: r.zagraj_karte(g, KARTY[losowa_karta_z_maski(r.get_legalne_maska(g), los)])
+    else: r.wykonaj_akcje(g, los.choice(r.get_mozliwe_akcje(g)))
+
+def mecz_w_stanie(stan: str, ziarno: int) -> Mecz:
+    """Mecz rozegrany losowo do licytacji / rozgrywki w drugim albo dalszym rozdaniu, albo do końca."""
+    los, mecz = random.Random(ziarno), Mecz(NAZWY, ziarno=ziarno)
+    mecz.rozpocznij_mecz()
+    while not mecz.zwyciezca_meczu:
+        krok(mecz, los)
+        r = mecz.rozdanie
+        # Powtórka nie odróżni początku rozdania od końca poprzedniego, więc stajemy po ruchu w rozdaniu
+        if mecz.numer_rozdania >= 2 and ruchy_z_dziennika(r.dziennik) and not r.rozdanie_zakonczone and los.random() < 0.2:
+            if stan == 'licytacja' and r.faza != FazaGry.ROZGRYWKA: return mecz
+            if stan == 'rozgrywka' and r.faza == FazaGry.ROZGRYWKA and r.aktualna_lewa: return mecz
+    assert stan == 'koniec'
+    return mecz
+
+def stan_meczu(mecz: Mecz) -> tuple:
+    r = mecz.rozdanie
+    return (zakoduj_mecz(mecz), mecz.numer_rozdania, bytes(mecz.ruchy_rozdan), r.dziennik, len(r.stos_cofania),
+            [g.reka_maska for g in r.gracze], [g.wygrane_maska for g in r.gracze], r.kolej_gracza_idx, r.faza)
+
+
+@pytest.mark.parametrize('ziarno', range(5))
+@pytest.mark.parametrize('stan', ['licytacja', 'rozgrywka', 'koniec'])
+def test_odkodowany_mecz_jest_taki_sam(stan, ziarno):
+    mecz = mecz_w_stanie(stan, ziarno)
+    odkodowany = odkoduj_mecz(zakoduj_mecz(mecz))
+    assert stan_meczu(odkodowany) == stan_meczu(mecz)
+    assert odkodowany.ziarno == ziarno
+    assert odkodowany.rng.getstate() == mecz.rng.getstate()
+    assert ruchy_meczu(odkodowany) == ruchy_meczu(mecz)
+    powtorka = Powtorka.z_meczu(odkodowany).mecz_po()
+    if mecz.zwyciezca_meczu: # Powtórka kończy się na ostatnim ruchu, przed rozliczeniem rozdania
+        powtorka.rozdanie.rozlicz_rozdanie(); powtorka.sprawdz_koniec_meczu()
+    assert stan_meczu(powtorka) == stan_meczu(mecz)
+
+@pytest.mark.parametrize('stan', ['licytacja', 'rozgrywka'])
+def test_odkodowany_mecz_gra_dalej_tak_samo(stan):
+    mecz = mecz_w_stanie(stan, 11)
+    odkodowany = odkoduj_mecz(zakoduj_mecz(mecz))
+    los_a, los_b = random.Random(3), random.Random(3)
+    while not mecz.zwyciezca_meczu:
+        krok(mecz, los_a); krok(odkodowany, los_b)
+    assert stan_meczu(odkodowany) == stan_meczu(mecz)
+
+def test_mecz_bez_ziarna():
+    mecz = Mecz(NAZWY)
+    mecz.rozpocznij_mecz()
+    for _ in range(5): krok(mecz, random.Random(1))
+    odkodowany = odkoduj_mecz(zakoduj_mecz(mecz))
+    assert odkodowany.ziarno is None and odkodowany.rng is None
+    assert stan_meczu(odkodowany) == stan_meczu(mecz)
+
+def test_podsumowanie_bez_silnika():
+    mecz = mecz_w_stanie('rozgrywka', 2)
+    podsumowanie = czytaj_podsumowanie(zakoduj_mecz(mecz))
+    assert podsumowanie.reki == tuple(g.reka_maska for g in mecz.rozdanie.gracze)
+    assert podsumowanie.faza == FazaGry.ROZGRYWKA
+
+def test_uszkodzony_zapis():
+    dane = bytearray(zakoduj_mecz(mecz_w_stanie('licytacja', 4)))
+    with pytest.raises(ValueError):
+        odkoduj_mecz(b'xx' + bytes(dane[2:]))
+    dane[-1] ^= 0xFF # Ostatni ruch zamieniony na nielegalny
+    with pytest.raises(ValueError):
+        odkoduj_mecz(bytes(dane))
@@ -5,6 +5,7 @@ from silnik_gry import Mecz, FazaGry
 
 # --- KONFIGURACJA ---
 LICZBA_PARTII = 30
+ZIARNO = 66 # Ten sam plik logu przy każdym uruchomieniu; zmień, żeby dostać inne partie
 NAZWA_PLIKU_LOGU = "log_finalny.txt"
 
 # --- Konfiguracja Logowania ---
@@ -36,13 +37,14 @@ def formatuj_akcje_dla_logu(akcje: list[dict]) -> str:
 
 def uruchom_symulacje():
     """Główna funkcja, która uruchamia i loguje symulację N partii."""
-    
+    rng = random.Random(ZIARNO)
     for i in range(1, LICZBA_PARTII + 1):
         logger.info("\n" + "#"*40)
-        logger.info(f"### ROZPOCZYNAMY PARTIĘ #{i} ###")
+        ziarno_partii = rng.randrange(2**32)
+        logger.info(f"### ROZPOCZYNAMY PARTIĘ #{i} (ziarno: {ziarno_partii}) ###")
         logger.info("#"*40)
         
-        mecz = Mecz(nazwy_graczy=["Jakub", "Przeciwnik1", "Nasz", "Przeciwnik2"])
+        mecz = Mecz(nazwy_graczy=["Jakub", "Przeciwnik1", "Nasz", "Przeciwnik2"], ziarno=ziarno_partii)
         mecz.rozpocznij_mecz()
         
         licznik_ruchow_w_partii = 0
@@ -91,7 +93,7 @@ def uruchom_symulacje():
                 if not mozliwe_karty:
                     logger.error(f"BŁĄD KRYTYCZNY: Gracz {aktualny_gracz.nazwa} nie ma żadnego legalnego ruchu!")
                     break
-                wybrana_karta = random.choice(mozliwe_karty)
+                wybrana_karta = rng.choice(mozliwe_karty)
                 rozdanie.zagraj_karte(aktualny_gracz, wybrana_karta)
             else: 
                 # Logowanie faz licytacji
@@ -103,7 +105,7 @@ def uruchom_symulacje():
                 if not mozliwe_akcje:
                     logger.error(f"BŁĄD KRYTYCZNY: Brak możliwych akcji dla gracza {aktualny_gracz} w fazie {rozdanie.faza.name}!")
                     break
-                wybrana_akcja = random.choice(mozliwe_akcje)
+                wybrana_akcja = rng.choice(mozliwe_akcje)
                 
                 logger.info(f"  Tura gracza: {aktualny_gracz.nazwa}")
                 logger.info(f"    Możliwe akcje: {formatuj_akcje_dla_logu(mozliwe_akcje)}")
@@ -0,0 +1,215 @@
+"""Powtarzalne pomiary wydajności silnika i serwera.
+
+Pomiary silnika rozgrywają te same rozdania przy każdym uruchomieniu (stałe ziarna, losowa polityka),
+więc różnica względem bazy wynika ze zmian w kodzie, a nie z innych rozdań. Wyniki zapisujemy do JSON
+i porównujemy z bazą - np. zapisaną przed zmianą w silniku.
+
+Użycie:
+    python wydajnosc.py --zapisz-baze          # przed zmianą: zapisuje wydajnosc_baza.json
+    python wydajnosc.py                        # po zmianie: porównuje z bazą (kod wyjścia 1 przy regresji)
+    python wydajnosc.py --tylko silnik --json wyniki.json
+"""
+import sys
+import json
+import time
+import random
+import logging
+import platform
+import argparse
+import threading
+from collections import defaultdict
+from contextlib import ExitStack
+from typing import Callable, Optional
+from silnik_gry import Mecz, Rozdanie, Gracz, FazaGry, rozegraj_rozdanie_kompaktowo
+from boty import BotLosowy
+
+# --- KONFIGURACJA ---
+ZIARNO = 66
+LICZBA_ROZDAN = 2000             # Rozdania w pomiarze rozdań na sekundę
+LICZBA_ROZDAN_KOMPAKTOWO = 20_000 # To samo w trybie kompaktowym (ok. 10x szybszy, więc więcej rozdań)
+ROZDANIA_POZYCJI = 300           # Rozdania, w których mierzymy pojedyncze operacje na każdej pozycji
+POWTORZENIA = 20                 # Ile razy wywołujemy operację na jednej pozycji
+PRZEBIEGI = 3                    # Każdy pomiar powtarzamy i bierzemy najlepszy wynik (mniej szumu)
+LICZBA_SESJI = 8                 # Równoległe sesje w pomiarze /stan_gry
+ZAPYTANIA_NA_SESJE = 200
+PROG_REGRESJI = 0.10             # Wynik gorszy od bazy o więcej niż 10% to regresja
+PLIK_BAZY = 'wydajnosc_baza.json'
+
+NAZWY_GRACZY = ["Jakub", "Przeciwnik1", "Nasz", "Przeciwnik2"]
+
+
+def _wynik(wartosc: float, jednostka: str = 'op/s', wiecej_lepiej: bool = True) -> dict:
+    return {'wartosc': round(wartosc, 3), 'jednostka': jednostka, 'wiecej_lepiej': wiecej_lepiej}
+
+def rozegraj_rozdania(liczba_rozdan: int, ziarno: int = ZIARNO, przy_decyzji: Optional[Callable[[Rozdanie, Gracz], None]] = None):
+    """Rozgrywa `liczba_rozdan` rozdań losowymi ruchami (nowy mecz po końcu poprzedniego).
+
+    `przy_decyzji(rozdanie, gracz)` jest wołane przed każdym ruchem i nie może zmienić stanu rozdania.
+    """
+    rng, nr_meczu = random.Random(ziarno), 0
+    bot = BotLosowy(rng)
+    mecz = Mecz(NAZWY_GRACZY, ziarno=ziarno)
+    mecz.rozpocznij_mecz()
+    rozegrane = 0
+    while rozegrane < liczba_rozdan:
+        rozdanie = mecz.rozdanie
+        if rozdanie.rozdanie_zakonczone:
+            rozdanie.rozlicz_rozdanie()
+            rozegrane += 1
+            mecz.sprawdz_koniec_meczu()
+            if mecz.zwyciezca_meczu:
+                nr_meczu += 1
+                mecz = Mecz(NAZWY_GRACZY, ziarno=ziarno + nr_meczu)
+                mecz.rozpocznij_mecz()
+            else:
+                mecz.przygotuj_nastepne_rozdanie()
+            continue
+        gracz = rozdanie.gracze[rozdanie.kolej_gracza_idx]
+        if przy_decyzji: przy_decyzji(rozdanie, gracz)
+        if rozdanie.faza == FazaGry.ROZGRYWKA: rozdanie.zagraj_karte(gracz, bot.wybierz_karte(rozdanie, gracz))
+        else: rozdanie.wykonaj_akcje(gracz, bot.wybierz_akcje(rozdanie, gracz))
+
+def rozegraj_rozdania_kompaktowo(liczba_rozdan: int, ziarno: int = ZIARNO):
+    """Jak rozegraj_rozdania, ale przez rozegraj_rozdanie_kompaktowo (symulator z losową licytacją)."""
+    rng, punkty_meczu, rozdajacy = random.Random(ziarno), [0, 0], 3
+    for _ in range(liczba_rozdan):
+        rozdajacy = (rozdajacy + 1) % 4
+        _, _, zwyciezca, punkty, _, _ = rozegraj_rozdanie_kompaktowo(rozdajacy, tuple(punkty_meczu), rng)
+        punkty_meczu[zwyciezca] += punkty
+        if max(punkty_meczu) >= 66: punkty_meczu, rozdajacy = [0, 0], 3
+
+def pomiar_rozdan() -> dict:
+    """Całe rozdania (licytacja, rozgrywka, rozliczenie) przez Mecz/Rozdanie i w trybie kompaktowym."""
+    start = time.perf_counter()
+    rozegraj_rozdania(LICZBA_ROZDAN)
+    obiektowo = LICZBA_ROZDAN / (time.perf_counter() - start)
+    start = time.perf_counter()
+    rozegraj_rozdania_kompaktowo(LICZBA_ROZDAN_KOMPAKTOWO)
+    kompaktowo = LICZBA_ROZDAN_KOMPAKTOWO / (time.perf_counter() - start)
+    return {'rozdania': _wynik(obiektowo), 'rozdania (tryb kompaktowy)': _wynik(kompaktowo),
+            'tryb kompaktowy / Mecz': _wynik(kompaktowo / obiektowo, 'x')}
+
+def pomiar_operacji() -> dict:
+    """Pojedyncze operacje silnika mierzone na każdej pozycji z `ROZDANIA_POZYCJI` rozdań."""
+    czasy, liczby = defaultdict(float), defaultdict(int)
+
+    def zmierz(nazwa: str, operacja: Callable[[], None], liczba_wywolan: int):
+        start = time.perf_counter()
+        for _ in range(POWTORZENIA): operacja()
+        czasy[nazwa] += time.perf_counter() - start
+        liczby[nazwa] += POWTORZENIA * liczba_wywolan
+
+    def przy_decyzji(rozdanie: Rozdanie, gracz: Gracz):
+        zmierz(f'get_mozliwe_akcje[{rozdanie.faza.name}]', lambda: rozdanie.get_mozliwe_akcje(gracz), 1)
+        if rozdanie.faza != FazaGry.ROZGRYWKA:
+            return
+        zmierz('get_legalne_karty', lambda: rozdanie.get_legalne_karty(gracz), 1)
+        reka = gracz.reka
+        zmierz('_waliduj_ruch', lambda: [rozdanie._waliduj_ruch(gracz, k) for k in reka], len(reka))
+        if len(rozdanie.aktualna_lewa) == rozdanie.liczba_aktywnych_graczy - 1:
+            # _zakoncz_lewe nie da się wywołać w oderwaniu od ruchu: mierzymy zamykające lewę zagranie z cofnięciem
+            karta = rozdanie.get_legalne_karty(gracz)[0]
+            zmierz('_zakoncz_lewe (zagranie + cofnięcie)', lambda: (rozdanie.zagraj_karte(gracz, karta), rozdanie.cofnij_karte()), 1)
+
+    rozegraj_rozdania(ROZDANIA_POZYCJI, przy_decyzji=przy_decyzji)
+    return {nazwa: _wynik(liczby[nazwa] / czasy[nazwa]) for nazwa in sorted(czasy)}
+
+def pomiar_serwera() -> dict:
+    """Opóźnienie i przepustowość /stan_gry przy `LICZBA_SESJI` sesjach odpytywanych równolegle."""
+    try:
+        from fastapi.testclient import TestClient
+        import app
+    except ImportError as e:
+        print(f"Pomijam pomiar serwera: {e}", file=sys.stderr)
+        return {}
+    from sesje import MagazynSesji
+
+    # Szybki bot bez pauz i magazyn w pamięci - mierzymy obsługę zapytania, nie AI ani dysk
+    app.OPOZNIENIE_AI_S = 0
+    app.bot_ai = BotLosowy(random.Random(ZIARNO))
+    app.aktywne_gry = MagazynSesji()
+    with ExitStack() as stos:
+        klienci = [stos.enter_context(TestClient(app.app)) for _ in range(LICZBA_SESJI)]
+        for nr, klient in enumerate(klienci):
+            klient.get("/stan_gry")
+            sesja = app.aktywne_gry.pobierz(klient.cookies.get("session_id"))
+            sesja.mecz = Mecz(["Ty", "Lewy", "Partner", "Prawy"], ziarno=ZIARNO + nr)
+            sesja.mecz.rozpocznij_mecz()
+            klient.get("/stan_gry") # Komputer dochodzi do tury człowieka, dalsze odczyty nie zmieniają stanu
+
+        opoznienia: list[float] = []
+        blokada = threading.Lock()
+        def odpytuj(klient):
+            wlasne = []
+            for _ in range(ZAPYTANIA_NA_SESJE):
+                start = time.perf_counter()
+                klient.get("/stan_gry").raise_for_status()
+                wlasne.append(time.perf_counter() - start)
+            with blokada: opoznienia.extend(wlasne)
+
+        watki = [threading.Thread(target=odpytuj, args=(k,)) for k in klienci]
+        start = time.perf_counter()
+        for w in watki: w.start()
+        for w in watki: w.join()
+        czas = time.perf_counter() - start
+
+    opoznienia.sort()
+    centyl = lambda p: opoznienia[min(len(opoznienia) - 1, int(p * len(opoznienia)))] * 1000
+    return {
+        f'/stan_gry x{LICZBA_SESJI} sesji': _wynik(len(opoznienia) / czas, 'zapytań/s'),
+        f'/stan_gry x{LICZBA_SESJI} sesji p50': _wynik(centyl(0.50), 'ms', False),
+        f'/stan_gry x{LICZBA_SESJI} sesji p95': _wynik(centyl(0.95), 'ms', False),
+    }
+
+POMIARY = {'silnik': [pomiar_rozdan, pomiar_operacji], 'serwer': [pomiar_serwera]}
+
+def uruchom_pomiary(grupy: list[str]) -> dict:
+    logging.disable(logging.CRITICAL) # Logowanie jest osobnym kosztem; tu mierzymy sam silnik
+    wyniki = {}
+    for grupa in grupy:
+        for pomiar in POMIARY[grupa]:
+            for _ in range(PRZEBIEGI):
+                for nazwa, w in pomiar().items():
+                    najlepszy = wyniki.setdefault(nazwa, w)
+                    if (w['wartosc'] > najlepszy['wartosc']) == w['wiecej_lepiej']: wyniki[nazwa] = w
+    return {'python': platform.python_version(), 'maszyna': platform.machine(), 'wyniki': wyniki}
+
+def porownaj(wyniki: dict, baza: dict) -> tuple[list[str], int]:
+    """Linie raportu (wynik, baza, zmiana) i liczba regresji większych niż PROG_REGRESJI."""
+    linie, regresje = [], 0
+    for nazwa, w in wyniki['wyniki'].items():
+        b = baza['wyniki'].get(nazwa)
+        if not b or not b['wartosc']:
+            linie.append(f"  {nazwa:<45} {w['wartosc']:>12,.1f} {w['jednostka']:<10} (brak w bazie)")
+            continue
+        zmiana = w['wartosc'] / b['wartosc'] - 1
+        lepiej = zmiana if w['wiecej_lepiej'] else -zmiana
+        znacznik = ""
+        if lepiej < -PROG_REGRESJI: znacznik, regresje = "  <-- REGRESJA", regresje + 1
+        linie.append(f"  {nazwa:<45} {w['wartosc']:>12,.1f} {w['jednostka']:<10} baza {b['wartosc']:>12,.1f}  {zmiana:+.1%}{znacznik}")
+    return linie, regresje
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pomiary wydajności silnika 66 i serwera.")
+    parser.add_argument("--tylko", choices=sorted(POMIARY), action='append', help="uruchom tylko wybraną grupę pomiarów")
+    parser.add_argument("--json", help="ścieżka pliku, do którego zapisać wyniki")
+    parser.add_argument("--baza", default=PLIK_BAZY, help="plik z wynikami bazowymi do porównania")
+    parser.add_argument("--zapisz-baze", action='store_true', help="zapisz wyniki jako nową bazę")
+    args = parser.parse_args()
+
+    wyniki = uruchom_pomiary(args.tylko or list(POMIARY))
+    for sciezka in filter(None, [args.json, args.baza if args.zapisz_baze else None]):
+        with open(sciezka, 'w', encoding='utf-8') as f:
+            json.dump(wyniki, f, ensure_ascii=False, indent=2)
+
+    try:
+        with open(args.baza, encoding='utf-8') as f:
+            baza = json.load(f)
+    except FileNotFoundError:
+        baza = {'wyniki': {}}
+    linie, regresje = porownaj(wyniki, baza)
+    print("\n".join(linie))
+    if regresje and not args.zapisz_baze:
+        print(f"❌ Regresje względem {args.baza}: {regresje}")
+        sys.exit(1)
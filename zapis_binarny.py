@@ -0,0 +1,146 @@
+"""Zwarty, wersjonowany zapis binarny meczu.
+
+Mecz zapisujemy jako kolejność kart w talii aktualnego rozdania i listę ruchów (po bajcie na ruch),
+a przy wczytywaniu rozgrywamy ruchy od nowa na silniku - dzięki temu odtwarzany jest cały stan
+(licytacja, lewa, meldunki, dziennik zdarzeń i stos cofania) bez utrwalania grafu obiektów. Nagłówek
+rozdania (maski rąk, kontrakt, lufa, punkty) da się odczytać bez silnika: `czytaj_podsumowanie`.
+
+Układ (wersja 2, little-endian):
+    b'66', wersja, flagi (bit 0: jest rozdanie, bity 1-2: zwycięzca meczu 0/1/2, bit 3: jest ziarno), rozdający,
+    punkty meczu obu drużyn (2 x u16), 4 nazwy graczy (u8 długość + UTF-8),
+    ziarno (u64), numer rozdania (u16), ruchy zakończonych rozdań (u32 długość + ruchy)
+    jeśli jest rozdanie: talia (24 indeksy kart), 4 maski rąk (po 3 bajty), kontrakt, atut, grający,
+    faza, mnożnik lufy (u16), punkty w rozdaniu (2 x u16), liczba ruchów (u16), ruchy.
+Ruch to bajt `miejsce << 6 | kod`: kod < 24 to indeks karty, kod >= 24 to 24 + kod akcji licytacji.
+Ziarno i numer rozdania odtwarzają stan generatora talii (po jednym tasowaniu na rozdanie), a ruchy
+zakończonych rozdań - powtórkę całego meczu. Wersja 1 (bez nich) jest nadal czytana.
+"""
+import random
+import struct
+from dataclasses import dataclass
+from typing import Optional
+from silnik_gry import Mecz, Rozdanie, Kontrakt, Kolor, FazaGry, KARTY, AKCJE_LICYTACJI, ruchy_z_dziennika
+
+SYGNATURA = b'66'
+WERSJA = 2
+BRAK = 0xFF # Brak grającego / kontraktu / atutu w nagłówku
+
+_POCZATEK = struct.Struct('<2sBBBHH')
+_NAGLOWEK_ROZDANIA = struct.Struct('<24s12sBBBBHHHH')
+_DANE_MECZU = struct.Struct('<QHI')
+
+
+@dataclass
+class PodsumowanieRozdania:
+    """Nagłówek rozdania odczytany bez odtwarzania gry (do analiz dużych zbiorów zapisów)."""
+    talia: tuple[int, ...]
+    reki: tuple[int, int, int, int]
+    kontrakt: Optional[Kontrakt]
+    atut: Optional[Kolor]
+    grajacy: Optional[int]
+    faza: FazaGry
+    mnoznik_lufy: int
+    punkty_w_rozdaniu: tuple[int, int]
+    ruchy: bytes
+
+
+def ruchy_meczu(mecz: Mecz) -> bytes:
+    """Ruchy wszystkich rozdań meczu po kolei - razem z ziarnem meczu wystarczają do jego powtórki."""
+    return bytes(mecz.ruchy_rozdan + ruchy_z_dziennika(mecz.rozdanie.dziennik) if mecz.rozdanie else mecz.ruchy_rozdan)
+
+def wykonaj_ruch(rozdanie: Rozdanie, ruch: int):
+    """Wykonuje ruch zapisany jednym bajtem; ValueError, jeśli silnik uznał go za nielegalny."""
+    gracz, kod = rozdanie.gracze[ruch >> 6], ruch & 63
+    dlugosc_stosu = len(rozdanie.stos_cofania)
+    if kod < len(KARTY): rozdanie.zagraj_karte(gracz, KARTY[kod])
+    else: rozdanie.wykonaj_akcje(gracz, AKCJE_LICYTACJI[kod - len(KARTY)])
+    if len(rozdanie.stos_cofania) == dlugosc_stosu:
+        raise ValueError(f"Zapisany ruch {ruch} jest nielegalny")
+
+def zakoduj_mecz(mecz: Mecz) -> bytes:
+    r = mecz.rozdanie
+    zwyciezca = 0 if mecz.zwyciezca_meczu is None else 1 + (mecz.zwyciezca_meczu is mecz.druzyna_b)
+    if mecz.ziarno is not None and not 0 <= mecz.ziarno < 2**64:
+        raise ValueError(f"Ziarno meczu {mecz.ziarno} nie mieści się w 64 bitach")
+    czesci = [_POCZATEK.pack(SYGNATURA, WERSJA, (r is not None) | zwyciezca << 1 | (mecz.ziarno is not None) << 3,
+                             mecz.rozdajacy_idx, mecz.druzyna_a.punkty_meczu, mecz.druzyna_b.punkty_meczu)]
+    for g in mecz.gracze:
+        nazwa = g.nazwa.encode('utf-8')
+        czesci.append(bytes([len(nazwa)]) + nazwa)
+    czesci.append(_DANE_MECZU.pack(mecz.ziarno or 0, mecz.numer_rozdania, len(mecz.ruchy_rozdan)))
+    czesci.append(bytes(mecz.ruchy_rozdan))
+    if r is not None:
+        ruchy = ruchy_z_dziennika(r.dziennik)
+        czesci.append(_NAGLOWEK_ROZDANIA.pack(
+            bytes(k.indeks for k in r.talia.karty), b''.join(g.reka_maska.to_bytes(3, 'little') for g in r.gracze),
+            r.kontrakt.value if r.kontrakt else BRAK, r.atut.value if r.atut else BRAK,
+            r.gracze.index(r.grajacy) if r.grajacy else BRAK, r.faza.value, r.mnoznik_lufy,
+            r.punkty_w_rozdaniu[r.druzyny[0].nazwa], r.punkty_w_rozdaniu[r.druzyny[1].nazwa], len(ruchy)))
+        czesci.append(bytes(ruchy))
+    return b''.join(czesci)
+
+def _czytaj_poczatek(dane: bytes) -> tuple[tuple, list[str], tuple[Optional[int], int, bytes], int]:
+    """Nagłówek meczu, nazwy graczy, (ziarno, numer rozdania, ruchy zakończonych rozdań) i pozycja rozdania."""
+    if len(dane) < _POCZATEK.size:
+        raise ValueError("Zapis meczu jest za krótki")
+    poczatek = _POCZATEK.unpack_from(dane)
+    if poczatek[0] != SYGNATURA:
+        raise ValueError("To nie jest zapis meczu")
+    if poczatek[1] not in (1, WERSJA):
+        raise ValueError(f"Nieobsługiwana wersja zapisu: {poczatek[1]}")
+    pozycja, nazwy = _POCZATEK.size, []
+    for _ in range(4):
+        dlugosc = dane[pozycja]
+        nazwy.append(dane[pozycja + 1:pozycja + 1 + dlugosc].decode('utf-8'))
+        pozycja += 1 + dlugosc
+    if poczatek[1] == 1:
+        return poczatek, nazwy, (None, 0, b''), pozycja
+    ziarno, numer_rozdania, liczba_ruchow = _DANE_MECZU.unpack_from(dane, pozycja)
+    pozycja += _DANE_MECZU.size
+    ruchy = dane[pozycja:pozycja + liczba_ruchow]
+    return poczatek, nazwy, (ziarno if poczatek[2] & 8 else None, numer_rozdania, ruchy), pozycja + liczba_ruchow
+
+def czytaj_podsumowanie(dane: bytes) -> Optional[PodsumowanieRozdania]:
+    """Nagłówek aktualnego rozdania bez budowania obiektów silnika (None, jeśli mecz nie ma rozdania)."""
+    (_, _, flagi, _, _, _), _, _, pozycja = _czytaj_poczatek(dane)
+    if not flagi & 1:
+        return None
+    talia, reki, kontrakt, atut, grajacy, faza, mnoznik, punkty_a, punkty_b, liczba_ruchow = _NAGLOWEK_ROZDANIA.unpack_from(dane, pozycja)
+    pozycja += _NAGLOWEK_ROZDANIA.size
+    return PodsumowanieRozdania(
+        tuple(talia), tuple(int.from_bytes(reki[3 * i:3 * i + 3], 'little') for i in range(4)),
+        None if kontrakt == BRAK else Kontrakt(kontrakt), None if atut == BRAK else Kolor(atut),
+        None if grajacy == BRAK else grajacy, FazaGry(faza), mnoznik, (punkty_a, punkty_b), dane[pozycja:pozycja + liczba_ruchow])
+
+def odkoduj_mecz(dane: bytes) -> Mecz:
+    """Odtwarza mecz z zapisu: ustawia wynik meczu i rozgrywa zapisane ruchy aktualnego rozdania.
+
+    Mecz z ziarnem dostaje generator w tym samym stanie, co oryginał - kolejne rozdania i powtórka
+    (`ruchy_meczu`) są takie same. Bez ziarna talie dalej tasuje globalny moduł random.
+    """
+    (_, _, flagi, rozdajacy_idx, punkty_a, punkty_b), nazwy, (ziarno, numer_rozdania, ruchy_rozdan), _ = _czytaj_poczatek(dane)
+    mecz = Mecz(nazwy_graczy=nazwy, ziarno=ziarno)
+    mecz.rozdajacy_idx, mecz.numer_rozdania, mecz.ruchy_rozdan = rozdajacy_idx, numer_rozdania, bytearray(ruchy_rozdan)
+    mecz.druzyna_a.punkty_meczu, mecz.druzyna_b.punkty_meczu = punkty_a, punkty_b
+    mecz.zwyciezca_meczu = (None, mecz.druzyna_a, mecz.druzyna_b)[flagi >> 1 & 3]
+    podsumowanie = czytaj_podsumowanie(dane)
+    if mecz.rng is not None:
+        # Każde rozdanie tasuje talię raz; tasowania sprzed aktualnego rozdania przewijamy na pustej talii
+        for _ in range(numer_rozdania - (podsumowanie is not None)): mecz.rng.shuffle(list(KARTY))
+    if podsumowanie is None:
+        return mecz
+
+    r = Rozdanie(gracze=mecz.gracze, druzyny=[mecz.druzyna_a, mecz.druzyna_b], rozdajacy_idx=rozdajacy_idx, rng=mecz.rng or random)
+    if mecz.rng is None:
+        r.talia.karty = [KARTY[i] for i in podsumowanie.talia]
+    elif tuple(k.indeks for k in r.talia.karty) != podsumowanie.talia:
+        raise ValueError("Talia rozdania nie zgadza się z ziarnem meczu")
+    r.logowanie = False
+    r.rozpocznij_nowe_rozdanie()
+    for ruch in podsumowanie.ruchy:
+        wykonaj_ruch(r, ruch)
+    r.logowanie = True
+    if tuple(g.reka_maska for g in r.gracze) != podsumowanie.reki or r.mnoznik_lufy != podsumowanie.mnoznik_lufy:
+        raise ValueError("Odtworzone rozdanie nie zgadza się z nagłówkiem zapisu")
+    mecz.rozdanie = r
+    return mecz